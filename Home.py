@@ -1,19 +1,21 @@
 import streamlit as st
 import uuid
-import json
-import os
 from datetime import datetime, timedelta
-import time
 from collections import defaultdict, Counter
 
+from app_config import SESSION_PAGE_SIZE, get_storage, get_users
+from llm_backend import get_runner
+from streaming import coalesce
+
 st.set_page_config(page_title="SCM Chatbot")
 
-# --- Simulated Assistant Response Stream ---
+# --- Assistant Response Stream ---
+@st.cache_resource
+def get_chat_backend():
+    return get_runner()
+
 def chat_stream(prompt):
-    response = f'You said, "{prompt}" ...interesting.'
-    for char in response:
-        yield char
-        time.sleep(0.02)
+    yield from coalesce(get_chat_backend().stream(prompt))
 
 # --- Feedback persistence ---
 def save_feedback(index):
@@ -21,57 +23,36 @@ def save_feedback(index):
     save_chat_to_json()
 
 # --- Paths and User Config ---
-with open("users.json", "r") as f:
-    USERS = json.load(f)
+USERS = get_users()
+STORE, WRITER = get_storage()
 
-CHAT_LOG_DIR = "chat_logs"
-os.makedirs(CHAT_LOG_DIR, exist_ok=True)
-
-# --- Save chat to JSON file ---
+# --- Save chat session ---
 def save_chat_to_json():
     if st.session_state.get("username") and st.session_state.get("chat_history"):
-        filename = f"chat_{st.session_state.username}_{st.session_state.session_id}.json"
-        filepath = os.path.join(CHAT_LOG_DIR, filename)
-        data = {
-            "username": st.session_state.username,
-            "session_id": st.session_state.session_id,
-            "timestamp": datetime.now().isoformat(),
-            "chat_history": st.session_state.chat_history,
-        }
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=4)
+        WRITER.submit(st.session_state.username, st.session_state.session_id, st.session_state.chat_history)
 
 # --- Session Preview Loaders ---
-def get_all_session_previews():
-    previews = []
-    for filename in os.listdir(CHAT_LOG_DIR):
-        if filename.endswith(".json"):
-            filepath = os.path.join(CHAT_LOG_DIR, filename)
-            with open(filepath, "r") as f:
-                data = json.load(f)
-                if data["chat_history"]:
-                    first_user_msg = next((msg["message"] for msg in data["chat_history"] if msg["role"] == "user"), "No message")
-                    previews.append({
-                        "username": data["username"],
-                        "session_id": data["session_id"],
-                        "preview": first_user_msg,
-                        "full_data": data,
-                        "filename": filename
-                    })
-    return previews
-
-def get_user_session_previews(username):
-    return [s for s in get_all_session_previews() if s["username"] == username]
+def get_session_page(username=None, sort="date", page=0):
+    return STORE.browse_sessions(username=username, sort=sort, offset=page * SESSION_PAGE_SIZE,
+                                 limit=SESSION_PAGE_SIZE)
+
+def get_user_session_previews(username, since=None):
+    return STORE.list_sessions(username=username, start=since)
+
+def load_chat_session(session_id):
+    WRITER.flush()
+    data = STORE.load_session(session_id)
+    st.session_state.session_id = session_id
+    st.session_state.chat_history = data["chat_history"] if data else []
 
 # --- Sidebar: Admin Chat Sessions ---
 def render_sidebar_chat_history_admin():
-    st.sidebar.markdown("## 💬 All Chat Sessions")
-    sessions = get_all_session_previews()
+    st.sidebar.markdown("## 💬 Latest Chat Sessions")
+    sessions, _ = get_session_page()
     for s in sessions:
         label = f"{s['username']}: {s['preview'][:30]}"
         if st.sidebar.button(label, key=s["session_id"], use_container_width=True, help="Click to load this chat session"):
-            st.session_state.session_id = s["session_id"]
-            st.session_state.chat_history = s["full_data"]["chat_history"]
+            load_chat_session(s["session_id"])
             st.rerun()
 
 # --- Sidebar: User Sessions (Today + Past 7 Days) ---
@@ -83,14 +64,14 @@ def render_sidebar_chat_history_users():
         st.session_state.chat_history = []
         st.rerun()
 
-    sessions = get_user_session_previews(st.session_state.username)
     today = datetime.now().date()
     past_7_days = today - timedelta(days=7)
+    sessions = get_user_session_previews(st.session_state.username, since=past_7_days)
 
     today_sessions, recent_sessions = [], []
 
     for s in sessions:
-        session_time = datetime.fromisoformat(s["full_data"]["timestamp"]).date()
+        session_time = datetime.fromisoformat(s["timestamp"]).date()
         if session_time == today:
             today_sessions.append(s)
         elif session_time >= past_7_days:
@@ -101,8 +82,7 @@ def render_sidebar_chat_history_users():
         for s in today_sessions:
             label = f"{s['preview'][:40]}"
             if st.sidebar.button(label, key="today_" + s["session_id"], use_container_width=True):
-                st.session_state.session_id = s["session_id"]
-                st.session_state.chat_history = s["full_data"]["chat_history"]
+                load_chat_session(s["session_id"])
                 st.rerun()
 
     if recent_sessions:
@@ -110,8 +90,7 @@ def render_sidebar_chat_history_users():
         for s in recent_sessions:
             label = f"{s['preview'][:40]}"
             if st.sidebar.button(label, key="past_" + s["session_id"], use_container_width=True):
-                st.session_state.session_id = s["session_id"]
-                st.session_state.chat_history = s["full_data"]["chat_history"]
+                load_chat_session(s["session_id"])
                 st.rerun()
 
 # --- Session State Defaults ---
@@ -170,26 +149,40 @@ if st.session_state.username:
 if st.session_state.username == "admin":
     st.title("🛠 Admin Feedback Dashboard")
 
-    all_sessions = get_all_session_previews()
-    user_list = sorted(set(s["username"] for s in all_sessions))
-    selected_user = st.selectbox("Filter by user", ["All"] + user_list)
-
-    filtered_sessions = all_sessions if selected_user == "All" else get_user_session_previews(selected_user)
-
-    session_ids = [s["session_id"] for s in filtered_sessions]
-    selected_session_id = st.selectbox("Select a session", session_ids)
-
-    selected_session = next(s for s in filtered_sessions if s["session_id"] == selected_session_id)
+    # Filtering, sorting and paging run in the store; only one page of sessions is listed
+    col1, col2, col3 = st.columns(3)
+    selected_user = col1.text_input("Filter by user").strip() or None
+    sort_options = {"Newest first": "date", "User": "user", "Most 👎 first": "negative"}
+    selected_sort = sort_options[col2.selectbox("Sort by", list(sort_options))]
+    page = col3.number_input("Page", min_value=1, value=1) - 1
+    page_sessions, total = get_session_page(selected_user, selected_sort, page)
+    st.caption(f"Page {page + 1} of {max(1, -(-total // SESSION_PAGE_SIZE))} · {total} sessions")
+
+    if not page_sessions:
+        st.info("No chat sessions found.")
+        st.stop()
+    selected_session = st.selectbox(
+        "Select a session",
+        page_sessions,
+        format_func=lambda s: f"{s['username']} · {s['timestamp'][:16]} · 👎 {s['negative']} · {s['preview'][:40]}",
+    )
+    selected_session_id = selected_session["session_id"]
     st.subheader(f"Session by `{selected_session['username']}`")
 
-    thumbs_up = sum(1 for m in selected_session["full_data"]["chat_history"] if m["role"] == "assistant" and m.get("feedback") == 1)
-    thumbs_down = sum(1 for m in selected_session["full_data"]["chat_history"] if m["role"] == "assistant" and m.get("feedback") == 0)
+    # Only the selected session is loaded
+    WRITER.flush()
+    selected_data = STORE.load_session(selected_session_id)
+    if selected_data is None:
+        # Moved or rewritten by another replica since the page was listed.
+        st.warning("This session is no longer available. Refresh the page to reload the list.")
+        st.stop()
+    selected_history = selected_data["chat_history"]
 
-    st.metric("👍 Positive Feedback", thumbs_up)
-    st.metric("👎 Negative Feedback", thumbs_down)
+    st.metric("👍 Positive Feedback", selected_session["positive"])
+    st.metric("👎 Negative Feedback", selected_session["negative"])
 
     st.markdown("### Chat with Feedback")
-    for i, msg in enumerate(selected_session["full_data"]["chat_history"]):
+    for i, msg in enumerate(selected_history):
         with st.chat_message(msg["role"]):
             st.markdown(msg["message"])
             if msg["role"] == "assistant":
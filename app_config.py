@@ -0,0 +1,55 @@
+"""
+Configuration and shared resources loaded once per process.
+
+Streamlit executes a page script from the top on every rerun of every
+session, so work done at module level in ``main.py`` or ``Home.py`` (reading
+the user accounts, creating the chat log directory, opening the store) is
+repeated for each interaction. The loaders here are ``st.cache_resource``
+functions instead: the first session to need them pays the cost and every
+later rerun gets the same objects back.
+
+Settings (environment variables):
+- USERS_FILE: JSON file with the user accounts (default users.json)
+- SESSION_PAGE_SIZE: sessions per page of the admin session browser (default 20)
+"""
+
+import json
+import os
+
+import streamlit as st
+
+from chat_store import CHAT_LOG_DIR, get_store, get_writer
+
+USERS_FILE = os.environ.get("USERS_FILE", "users.json")
+SESSION_PAGE_SIZE = int(os.environ.get("SESSION_PAGE_SIZE", "20"))
+
+
+@st.cache_resource(show_spinner=False)
+def _read_users(path: str, mtime_ns: int) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def get_users() -> dict:
+    """
+    Get the user accounts, parsed once per version of the users file.
+
+    The cache is keyed by the file's modification time, so edits to the
+    file are picked up on the next rerun at the cost of one ``stat()``.
+
+    Returns:
+        dict: Accounts keyed by username, each with "password" and "role"
+    """
+    return _read_users(USERS_FILE, os.stat(USERS_FILE).st_mtime_ns)
+
+
+@st.cache_resource(show_spinner=False)
+def get_storage() -> tuple:
+    """
+    Create the chat log directory and open the store and its write-behind queue.
+
+    Returns:
+        tuple: (store, writer) shared by every session
+    """
+    os.makedirs(CHAT_LOG_DIR, exist_ok=True)
+    return get_store(), get_writer()
@@ -0,0 +1 @@
+"""Benchmarks for the SCM Chatbot storage and analytics paths."""
@@ -0,0 +1,107 @@
+"""
+Measure the response cache hit rate with and without the context in the key.
+
+Synthetic sessions ask questions drawn from a small pool of popular SCM
+questions (a few are asked far more often than the rest), the way repeat
+questions reach the app. The context of every prompt is built with the
+token-budgeted ``ContextBuilder`` and the prompt is looked up in two
+``ResponseCache`` instances:
+
+- prompt: keyed on the prompt alone, as for a backend whose replies do not
+  depend on the conversation (``ChatBackend.uses_context`` is False)
+- context: keyed on the prompt and a digest of the context messages, as for a
+  backend whose replies do
+
+Hit rates are reported for the first message of a session and for the later
+ones. The run fails if the prompt key misses a question that was asked
+before; the context key hits mostly on first messages, where the context
+is still empty.
+
+Usage:
+    python -m benchmarks.bench_cache [--sessions 500] [--turns 6]
+"""
+
+import argparse
+import random
+import sys
+
+from chat_history import ChatHistory
+from llm_backend.cache import ResponseCache, cache_key
+from llm_backend.context import ContextBuilder, RollingSummary
+
+QUESTIONS = [
+    f"{template} {n}"
+    for template in ("Where is order", "What is the lead time for SKU", "Why is shipment", "Who supplies part")
+    for n in range(1, 11)
+]
+
+
+def reply(prompt: str) -> list:
+    """Chunks of the stand-in reply to a prompt."""
+    return [f'You said, "{prompt}" ', "...interesting."]
+
+
+def run(sessions: int, turns: int, seed: int = 0) -> tuple:
+    """
+    Replay synthetic sessions through both caches.
+
+    Args:
+        sessions (int): Number of sessions
+        turns (int): Questions per session
+        seed (int): Random seed
+
+    Returns:
+        tuple: (counts, problems) with hit and lookup counts per key and
+            position ("first" or "later") and any check failures
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(QUESTIONS) + 1)]
+    builder = ContextBuilder()
+    # Large enough that nothing is evicted: only the key decides whether a lookup hits.
+    caches = {key: ResponseCache(max_entries=sessions * turns) for key in ("prompt", "context")}
+    counts = {(key, position): [0, 0] for key in caches for position in ("first", "later")}
+    asked, problems = set(), []
+    for session in range(sessions):
+        history, summary = ChatHistory(), RollingSummary(f"bench-{session}")
+        for turn in range(turns):
+            prompt = rng.choices(QUESTIONS, weights)[0]
+            context = builder.build(history, prompt, summary).messages
+            position = "first" if turn == 0 else "later"
+            for key, cache in caches.items():
+                hits = cache.hits
+                chunks = cache.stream(cache_key("echo", prompt, context if key == "context" else None),
+                                      lambda: iter(reply(prompt)))
+                response = "".join(chunks)
+                hit = cache.hits > hits
+                counts[key, position][0] += hit
+                counts[key, position][1] += 1
+                if key == "prompt" and hit != (prompt in asked):
+                    problems.append(f"session {session} turn {turn}: prompt key {'hit' if hit else 'missed'} {prompt!r}")
+            asked.add(prompt)
+            history.append({"role": "user", "message": prompt})
+            history.append({"role": "assistant", "message": response})
+    return counts, problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the response cache hit rate of both cache keys.")
+    parser.add_argument("--sessions", type=int, default=500, help="Sessions to replay (default: %(default)s)")
+    parser.add_argument("--turns", type=int, default=6, help="Questions per session (default: %(default)s)")
+    args = parser.parse_args()
+
+    counts, problems = run(args.sessions, args.turns)
+    print(f"{'key':<8} {'first msg':>10} {'later msgs':>11} {'overall':>8}")
+    for key in ("prompt", "context"):
+        (first_hits, first), (later_hits, later) = counts[key, "first"], counts[key, "later"]
+        print(f"{key:<8} {first_hits / first:>10.0%} {later_hits / max(later, 1):>11.0%} "
+              f"{(first_hits + later_hits) / (first + later):>8.0%}")
+
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {args.sessions * args.turns} lookups, every repeated question hit the prompt key")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark and check the token-budgeted context builder on long conversations.
+
+A synthetic conversation of ``--turns`` turns with random message lengths is
+replayed the way the chat pane does it: the context for each prompt is built
+from a ``ChatHistory`` with a bounded resident window, then the turn is added
+and older messages are spilled to a list standing in for the store. Token
+counts use ``WhitespaceTokenizer``, the local stand-in for a model tokenizer.
+
+Checked on every turn:
+
+- the request (prompt, summary and recent messages) stays within the budget,
+  unless the prompt alone exceeds it
+- the reported sizes match a recount of the messages actually produced
+- the verbatim window starts on a user message
+- nothing is summarized while the whole conversation fits in the budget,
+  so the window is sized by the budget and not by the resident messages
+- every older message is folded into the rolling summary exactly once
+- a reopened session (a new ``RollingSummary``) reads its non-resident
+  messages back and sends the same verbatim window as the running one
+
+Build time is reported per block of turns, so growth with conversation
+length shows up; it should stay flat. The default resident window is smaller
+than what the budget sends verbatim. A running session keeps the window's
+messages from when they were resident, so only the reopened session reads
+them back through ``load``; the number of reads is reported.
+
+Usage:
+    python -m benchmarks.bench_context [--turns 2000] [--budget 2048] [--summary-budget 256] [--resident 16]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from chat_history import ChatHistory
+from llm_backend.context import MESSAGE_OVERHEAD, ContextBuilder, RollingSummary, WhitespaceTokenizer
+
+
+def words(rng: random.Random, low: int, high: int) -> str:
+    """Random text of ``low`` to ``high`` words."""
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(rng.randint(low, high)))
+
+
+def run(turns: int, budget: int, summary_budget: int, resident: int, seed: int = 0) -> tuple:
+    """
+    Replay a synthetic conversation through the context builder.
+
+    Args:
+        turns (int): Number of user/assistant turns
+        budget (int): Token budget of a request
+        summary_budget (int): Token budget of the rolling summary
+        resident (int): Messages kept resident in the ChatHistory
+        seed (int): Random seed
+
+    Returns:
+        tuple: (timings, sizes, loads, problems) with the build time in
+            seconds and the request size in tokens of each turn, the number of
+            load() calls and any check failures
+    """
+    rng = random.Random(seed)
+    tokenizer = WhitespaceTokenizer()
+    builder = ContextBuilder(tokenizer, budget=budget, summary_budget=summary_budget)
+    folded = []
+
+    def summarize(messages: list) -> list:
+        # Each message carries its position as its timestamp, to tell which ones were folded.
+        folded.extend(msg["timestamp"] for msg in messages)
+        return [f"{msg['role']}: {' '.join(msg['message'].split()[:24])}" for msg in messages]
+
+    builder.summarize = summarize
+    history, stored, summary = ChatHistory(resident=resident), [], RollingSummary("bench")
+    timings, sizes, problems, loads = [], [], [], []
+
+    def load(start: int, end: int) -> list:
+        loads.append((start, end))
+        return stored[start:end]
+
+    conversation_tokens = 0
+    for turn in range(turns):
+        prompt = words(rng, 3, 60)
+        started = time.perf_counter()
+        context = builder.build(history, prompt, summary, load=load)
+        timings.append(time.perf_counter() - started)
+        sizes.append(context.total_tokens)
+        recount = tokenizer.count(prompt) + sum(tokenizer.count(m["message"]) for m in context.messages)
+        recount += MESSAGE_OVERHEAD * (len(context.messages) + 1)
+        if recount != context.total_tokens:
+            problems.append(f"turn {turn}: reported {context.total_tokens} tokens, recounted {recount}")
+        if context.total_tokens > budget and context.prompt_tokens <= budget:
+            problems.append(f"turn {turn}: {context.total_tokens} tokens > budget {budget}")
+        if context.summarized and context.prompt_tokens + conversation_tokens <= budget:
+            problems.append(f"turn {turn}: {context.summarized} messages summarized although all fit in the budget")
+        recent = [m for m in context.messages if m["role"] != "system"]
+        if recent and recent[0]["role"] != "user":
+            problems.append(f"turn {turn}: the verbatim window starts on an {recent[0]['role']} message")
+        for msg in ({"role": "user", "message": prompt, "timestamp": str(len(stored))},
+                    {"role": "assistant", "message": words(rng, 5, 200), "timestamp": str(len(stored) + 1)}):
+            history.append(msg)
+            stored.append(msg)
+            conversation_tokens += builder.message_tokens(msg)
+        history.spill()
+    if len(folded) != len(set(folded)):
+        problems.append(f"{len(folded) - len(set(folded))} messages were summarized more than once")
+    if sorted(folded) != sorted(msg["timestamp"] for msg in stored[:summary.upto]):
+        problems.append("the summary does not cover exactly the messages before the verbatim window")
+    prompt = words(rng, 3, 60)
+    running = builder.build(history, prompt, summary, load=load)
+    resumed = builder.build(history, prompt, RollingSummary("bench"), load=load)
+    recent = [context.messages[len(context.messages) - context.verbatim:] for context in (running, resumed)]
+    if recent[0] != recent[1]:
+        problems.append("a reopened session sends a different verbatim window")
+    return timings, sizes, len(loads), problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark and check the token-budgeted context builder.")
+    parser.add_argument("--turns", type=int, default=2000, help="Conversation turns (default: %(default)s)")
+    parser.add_argument("--budget", type=int, default=2048, help="Request token budget (default: %(default)s)")
+    parser.add_argument("--summary-budget", type=int, default=256,
+                        help="Rolling summary token budget (default: %(default)s)")
+    parser.add_argument("--resident", type=int, default=16, help="Resident messages (default: %(default)s)")
+    args = parser.parse_args()
+
+    timings, sizes, loads, problems = run(args.turns, args.budget, args.summary_budget, args.resident)
+    block = max(1, args.turns // 5)
+    print(f"{'turns':>13} {'build p50':>10} {'build p95':>10} {'tokens avg':>11} {'tokens max':>11}")
+    for first in range(0, args.turns, block):
+        chunk = sorted(timings[first:first + block])
+        size = sizes[first:first + block]
+        print(f"{first:>6}-{first + len(chunk) - 1:<6} {statistics.median(chunk) * 1000:>8.3f}ms "
+              f"{chunk[int(len(chunk) * 0.95)] * 1000:>8.3f}ms {statistics.mean(size):>11.0f} {max(size):>11}")
+
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {args.turns} turns within {args.budget} tokens, each older message summarized once, "
+          f"{loads} reads of non-resident messages")
+
+
+if __name__ == "__main__":
+    main()
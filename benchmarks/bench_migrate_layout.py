@@ -0,0 +1,122 @@
+"""
+Check and time ``migrate_layout()`` on synthetic logs with legacy file names.
+
+A flat chat log directory is generated (see ``generate_chat_logs``) and
+sessions of users whose names need encoding ("john doe", "zoë", ".hidden",
+"50%") are added under the raw, unencoded file names written before
+``safe_name()`` existed. The directory is then migrated to the sharded
+layout, back to flat and to sharded again. Checked after every migration:
+
+- every session file is named after its ``session_key()``, in the
+  ``safe_name()`` directory of its user when sharded
+- no session is lost or duplicated, and each one loads through the store
+- saving a migrated legacy session rewrites its file instead of creating
+  a second one
+- migrating again moves nothing
+
+Usage:
+    python -m benchmarks.bench_migrate_layout [--sessions 1000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.generate_chat_logs import generate
+from chat_store.file_store import FileChatStore
+from chat_store.files import iter_session_files, load_session, migrate_layout, safe_name, session_key
+
+LEGACY_USERNAMES = ["john doe", "zoë", ".hidden", "50%"]
+
+
+def write_legacy_sessions(log_dir: str) -> dict:
+    """
+    Write one session per legacy username under its unencoded flat file name.
+
+    Returns:
+        dict: Username keyed by session id
+    """
+    sessions = {}
+    for username in LEGACY_USERNAMES:
+        session_id = str(uuid.uuid4())
+        data = {"username": username, "session_id": session_id, "timestamp": "2024-01-02T03:04:05",
+                "chat_history": [{"role": "user", "message": f"Legacy question from {username}"}]}
+        with open(os.path.join(log_dir, f"chat_{username}_{session_id}.json"), "w") as f:
+            json.dump(data, f)
+        sessions[session_id] = username
+    return sessions
+
+
+def check_layout(log_dir: str, layout: str, expected: int) -> list:
+    """
+    Check every session file's name and directory against the layout.
+
+    Returns:
+        list: Problems found
+    """
+    problems, seen = [], set()
+    for filename in iter_session_files(log_dir):
+        data = load_session(filename, log_dir)
+        if not data:
+            problems.append(f"{filename}: unreadable")
+            continue
+        stem, _ = os.path.splitext(os.path.basename(filename))
+        if stem != session_key(data["username"], data["session_id"]):
+            problems.append(f"{filename}: not named after session_key({data['username']!r}, ...)")
+        directory = os.path.dirname(filename)
+        if layout == "flat" and directory:
+            problems.append(f"{filename}: not at the top of the log directory")
+        if layout == "sharded" and os.path.basename(directory) != safe_name(data["username"]):
+            problems.append(f"{filename}: not in the directory of {data['username']!r}")
+        if data["session_id"] in seen:
+            problems.append(f"{filename}: session {data['session_id']} is stored twice")
+        seen.add(data["session_id"])
+    if len(seen) != expected:
+        problems.append(f"{layout}: {len(seen)} sessions after migrating, expected {expected}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check and time migrate_layout() with legacy file names.")
+    parser.add_argument("--sessions", type=int, default=1000, help="Generated sessions (default: %(default)s)")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="chat_migrate_")
+    problems = []
+    try:
+        generate(log_dir, args.sessions, layout="flat")
+        legacy = write_legacy_sessions(log_dir)
+        expected = args.sessions + len(legacy)
+        for layout in ("sharded", "flat", "sharded"):
+            started = time.perf_counter()
+            moved = migrate_layout(log_dir, layout)
+            elapsed = time.perf_counter() - started
+            print(f"{layout:<8} moved {moved:>7} files in {elapsed * 1000:9.1f} ms")
+            problems += check_layout(log_dir, layout, expected)
+            if migrate_layout(log_dir, layout):
+                problems.append(f"{layout}: migrating a second time moved files")
+        store = FileChatStore(log_dir, fmt="json")
+        for session_id, username in legacy.items():
+            data = store.load_session(session_id)
+            if data is None or data["username"] != username:
+                problems.append(f"{username!r}: session {session_id} does not load after migrating")
+                continue
+            store.save_session(username, session_id, data["chat_history"] + [{"role": "assistant", "message": "ok"}])
+        problems += check_layout(log_dir, "sharded", expected)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {expected} sessions, {len(legacy)} with legacy names, migrated and named by session_key()")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Check and time full-text search on both store backends.
+
+The same synthetic sessions are saved to a file store and a SQLite store,
+then a set of queries runs against both. Checked for every query:
+
+- both backends return the same (session, message) hits
+- every hit contains every term of the query
+- a query with a one-character term (e.g. "shipment 3") matches fewer
+  messages than the same query without it
+
+Usage:
+    python -m benchmarks.bench_search [--sessions 200]
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from chat_store.file_store import FileChatStore
+from chat_store.search_index import tokenize
+from chat_store.sqlite_store import SqliteChatStore
+
+# (narrow query, the same query without its one-character term)
+QUERIES = [
+    ("shipment 3", "shipment"),
+    ("sku 7 inventory", "sku inventory"),
+    ("vendor 1 lead times", "vendor lead times"),
+]
+TEMPLATES = [
+    "Why is shipment {n} delayed?",
+    "What is the current inventory level for SKU {n}?",
+    "Summarize lead times for vendor {n}",
+]
+
+
+def populate(stores: list, sessions: int, seed: int = 0) -> None:
+    """Save the same random sessions, mentioning numbers 1 to 12, to every store."""
+    rng = random.Random(seed)
+    for i in range(sessions):
+        history = []
+        for _ in range(rng.randint(1, 4)):
+            question = rng.choice(TEMPLATES).format(n=rng.randint(1, 12))
+            history.append({"role": "user", "message": question})
+            history.append({"role": "assistant", "message": f"Echo: {question}"})
+        for store in stores:
+            store.save_session(f"user{i % 7}", f"session-{i:05d}", history)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check and time full-text search on both store backends.")
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions to generate (default: %(default)s)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="chat_search_")
+    problems = []
+    try:
+        stores = {"files": FileChatStore(work_dir, fmt="json"), "sqlite": SqliteChatStore(f"{work_dir}/chat.db")}
+        populate(list(stores.values()), args.sessions)
+        limit = args.sessions * 8
+        print(f"{'query':<22} {'files':>7} {'sqlite':>7} {'files ms':>9} {'sqlite ms':>10}")
+        for narrow, broad in QUERIES:
+            counts = {}
+            for query in (narrow, broad):
+                hits, timings = {}, {}
+                for name, store in stores.items():
+                    started = time.perf_counter()
+                    result = store.search(query, limit=limit)
+                    timings[name] = (time.perf_counter() - started) * 1000
+                    hits[name] = {(hit["session_id"], hit["index"]) for hit in result}
+                    for hit in result:
+                        missing = set(tokenize(query)) - set(tokenize(hit["message"]))
+                        if missing:
+                            problems.append(f"{name} {query!r}: hit {hit['message']!r} lacks {sorted(missing)}")
+                print(f"{query:<22} {len(hits['files']):>7} {len(hits['sqlite']):>7} "
+                      f"{timings['files']:>9.2f} {timings['sqlite']:>10.2f}")
+                if hits["files"] != hits["sqlite"]:
+                    problems.append(f"{query!r}: the backends differ in {len(hits['files'] ^ hits['sqlite'])} hits")
+                counts[query] = len(hits["files"])
+            if not 0 < counts[narrow] < counts[broad]:
+                problems.append(f"{narrow!r} matched {counts[narrow]} messages, {broad!r} {counts[broad]}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for problem in problems[:20]:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"OK: {len(QUERIES) * 2} queries agree on both backends and one-character terms narrow the results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmark cold start and rerun latency of the app's pages.
+
+Every scenario runs in a fresh interpreter, so nothing is imported or cached
+yet, against an empty chat log directory. The page script is executed with
+Streamlit's ``AppTest`` runner, which runs it the way the server does, and
+three numbers are recorded:
+
+- ``import_ms``: ``import streamlit``, paid once per server process
+- ``first_paint_ms``: the first run of the page script, including the
+  imports and one-time work it triggers (loading users, opening the store)
+- ``rerun_ms``: the median of the following runs, what every interaction of
+  every later session pays. ``AppTest`` compiles the script again on every
+  run, which the server does once per process, so the compile time
+  (``compile_ms``) is measured separately and subtracted.
+
+The heavy optional modules (pandas, numpy, pyarrow, PIL, httpx) loaded by the
+end of the first run are listed, so a page that starts importing one of them
+on a path that does not need it shows up. Sections a page draws only after
+its first paint (the dashboard's charts) are drawn by the reruns, so they
+count towards ``rerun_ms``. The run fails if any scenario's median first
+paint or rerun exceeds its target.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 3] [--max-first-paint-ms 1500] [--max-rerun-ms 250] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "PIL", "httpx")
+
+# name -> (page script, session state set before the first run)
+SCENARIOS = {
+    "login": ("main.py", {}),
+    "chat": ("main.py", {"username": "user", "session_id": "bench-startup"}),
+    "admin": ("main.py", {"username": "admin", "session_id": "bench-startup"}),
+    "dashboard_denied": ("pages/Admin_Dashboard.py", {}),
+    "dashboard": ("pages/Admin_Dashboard.py", {"username": "admin"}),
+    "performance": ("pages/Performance.py", {"username": "admin"}),
+    "image_rendering": ("image_rendering.py", {}),
+}
+
+
+def run_scenario(name: str, reruns: int) -> dict:
+    """
+    Time one scenario in the current (fresh) interpreter.
+
+    Args:
+        name (str): Scenario name, a key of SCENARIOS
+        reruns (int): Runs after the first one
+
+    Returns:
+        dict: import_ms, first_paint_ms, rerun_ms, compile_ms, heavy_modules and error
+    """
+    started = time.perf_counter()
+    # Imported only to time it: the import_ms probe, measured before AppTest loads streamlit.
+    import streamlit  # noqa: F401
+
+    import_ms = (time.perf_counter() - started) * 1000
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest
+
+    script, state = SCENARIOS[name]
+    path = os.path.join(REPO_ROOT, script)
+    at = AppTest.from_file(path, default_timeout=120)
+    for key, value in state.items():
+        at.session_state[key] = value
+    started = time.perf_counter()
+    at.run()
+    first_paint_ms = (time.perf_counter() - started) * 1000
+    heavy = [module for module in HEAVY_MODULES if module in sys.modules]
+    timings, compiles = [], []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        ScriptCache().get_bytecode(path)
+        compiles.append((time.perf_counter() - started) * 1000)
+    compile_ms = statistics.median(compiles) if compiles else 0.0
+    return {
+        "import_ms": import_ms,
+        "first_paint_ms": first_paint_ms,
+        "rerun_ms": statistics.median(timings) - compile_ms if timings else None,
+        "compile_ms": compile_ms,
+        "heavy_modules": heavy,
+        "error": at.exception[0].message if at.exception else None,
+    }
+
+
+def measure_scenario(name: str, repeat: int, reruns: int, log_dir: str) -> dict:
+    """
+    Run a scenario in ``repeat`` fresh interpreters and summarize it.
+
+    Args:
+        name (str): Scenario name, a key of SCENARIOS
+        repeat (int): Number of cold starts
+        reruns (int): Runs after the first one in each cold start
+        log_dir (str): Chat log directory for the app
+
+    Returns:
+        dict: Median timings over the cold starts, plus the heavy modules and
+            any error of the last one
+    """
+    env = dict(os.environ, CHAT_LOG_DIR=log_dir, CHAT_DB_PATH=os.path.join(log_dir, "chat.db"))
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", name, "--reruns", str(reruns)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    summary = {"scenario": name, "script": SCENARIOS[name][0]}
+    for field in ("import_ms", "first_paint_ms", "rerun_ms", "compile_ms"):
+        summary[field] = statistics.median(sample[field] for sample in samples)
+    summary["heavy_modules"] = samples[-1]["heavy_modules"]
+    summary["error"] = samples[-1]["error"]
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cold start and rerun latency of the app's pages.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per scenario (default: %(default)s)")
+    parser.add_argument("--reruns", type=int, default=10, help="Runs after the first one (default: %(default)s)")
+    parser.add_argument("--max-first-paint-ms", type=float, default=1500,
+                        help="Target for the median first paint (default: %(default)s)")
+    parser.add_argument("--max-rerun-ms", type=float, default=250,
+                        help="Target for the median rerun (default: %(default)s)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/startup-<timestamp>.json)")
+    parser.add_argument("--child", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.reruns)))
+        return
+
+    # Imported here: the children must start with none of the app's modules loaded.
+    from benchmarks.bench_storage import RESULTS_DIR, git_revision
+
+    log_dir = tempfile.mkdtemp(prefix="chat_startup_")
+    results, problems = [], []
+    try:
+        print(f"{'scenario':<18} {'import':>9} {'first paint':>12} {'rerun':>9}  heavy modules")
+        for name in args.scenarios:
+            summary = measure_scenario(name, args.repeat, args.reruns, log_dir)
+            results.append(summary)
+            print(f"{name:<18} {summary['import_ms']:>7.0f}ms {summary['first_paint_ms']:>10.0f}ms "
+                  f"{summary['rerun_ms']:>7.1f}ms  {', '.join(summary['heavy_modules']) or '-'}")
+            if summary["error"]:
+                problems.append(f"{name}: the page raised {summary['error']!r}")
+            if summary["first_paint_ms"] > args.max_first_paint_ms:
+                problems.append(f"{name}: first paint {summary['first_paint_ms']:.0f} ms > {args.max_first_paint_ms:.0f} ms")
+            if summary["rerun_ms"] > args.max_rerun_ms:
+                problems.append(f"{name}: rerun {summary['rerun_ms']:.1f} ms > {args.max_rerun_ms:.0f} ms")
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    report = {
+        "benchmark": "startup",
+        "created": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "reruns": args.reruns,
+        "targets": {"first_paint_ms": args.max_first_paint_ms, "rerun_ms": args.max_rerun_ms},
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
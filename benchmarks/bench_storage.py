@@ -0,0 +1,230 @@
+"""
+Benchmark the chat log storage and analytics paths on synthetic data.
+
+For every requested size a chat log directory is generated (see
+``generate_chat_logs``) and the store operations behind the app's hot paths
+are timed:
+
+- ``rebuild_indexes``: first-use rebuild of the manifest, counters, rollups,
+  search index and message table
+- ``get_all_session_previews``: ``list_sessions()``
+- ``get_user_session_previews``: ``list_sessions(username, start=7 days ago)``
+- ``get_feedback_summaries``: ``feedback_summary()``
+- ``browse_sessions``: the first page of the admin session browser, newest first
+- ``browse_sessions_negative``: page 11 of the sessions with negative feedback, most first
+- ``dashboard_aggregation``: ``usage()`` over the last 30 days
+- ``dashboard_analytics``: ``message_frame()`` plus the dashboard's vectorized
+  groupbys (feedback rate by day, volume by hour, latency, retention)
+- ``search``: full-text ``search()`` for a two-term query
+- ``save_chat_to_json``: ``save_session()`` of a conversation growing by one turn
+- ``save_chat_to_json_queued``: the same save through the write-behind queue
+
+Each case reports min/median/max wall time over ``--repeat`` runs and the
+peak traced memory of one extra run. Results are written as JSON so runs can
+be compared between releases.
+
+Usage:
+    python -m benchmarks.bench_storage --sizes 1000 10000 [--backend files|sqlite] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+from benchmarks.generate_chat_logs import generate
+from chat_store.analytics import feedback_rate_by_day, latency_by_day, volume_by_hour, weekly_retention
+from chat_store.write_behind import WriteBehindQueue
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Time a callable and record its peak memory.
+
+    Args:
+        func (callable): Operation to measure, called without arguments
+        repeat (int): Number of timed runs
+
+    Returns:
+        dict: min_s, median_s and max_s wall times and peak_kib traced memory
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    # Memory is traced on a separate run so tracing overhead does not skew the timings.
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "max_s": max(timings),
+        "peak_kib": peak / 1024,
+    }
+
+
+def open_store(backend: str, log_dir: str):
+    """
+    Open a store over a generated log directory.
+
+    Args:
+        backend (str): "files" or "sqlite"
+        log_dir (str): Generated chat log directory
+
+    Returns:
+        ChatStore: Store holding the generated sessions
+    """
+    if backend == "sqlite":
+        from chat_store.sqlite_store import SqliteChatStore, migrate_from_files
+
+        db_path = os.path.join(log_dir, "chat.db")
+        migrate_from_files(log_dir, db_path)
+        return SqliteChatStore(db_path)
+    from chat_store.file_store import FileChatStore
+
+    return FileChatStore(log_dir, fmt="json")
+
+
+def rebuild_indexes(store) -> None:
+    """Rebuild every derived index of a store from the stored sessions."""
+    if hasattr(store, "manifest"):
+        store.manifest.rebuild()
+    store.rebuild_feedback_counters()
+    store.rebuild_rollups()
+    store.rebuild_search_index()
+    store.rebuild_analytics()
+
+
+def dashboard_analytics(store) -> None:
+    """Run the Admin Dashboard's message analytics over the whole table."""
+    frame = store.message_frame()
+    feedback_rate_by_day(frame)
+    volume_by_hour(frame)
+    latency_by_day(frame)
+    weekly_retention(frame)
+
+
+def bench_size(sessions: int, backend: str, repeat: int, work_dir: str) -> list:
+    """
+    Generate a log directory of the given size and run every case on it.
+
+    Args:
+        sessions (int): Number of sessions to generate
+        backend (str): "files" or "sqlite"
+        repeat (int): Timed runs per case
+        work_dir (str): Scratch directory for the generated data
+
+    Returns:
+        list: One result dictionary per case
+    """
+    log_dir = os.path.join(work_dir, f"chat_logs_{sessions}")
+    started = time.perf_counter()
+    generate(log_dir, sessions)
+    generate_s = time.perf_counter() - started
+    store = open_store(backend, log_dir)
+    # The generator gives the first user the most sessions.
+    busiest = "user0000"
+    today = date.today()
+
+    history = []
+    session_id = str(uuid.uuid4())
+
+    def save() -> None:
+        history.append({"role": "user", "message": f"Benchmark question {len(history)}"})
+        history.append({"role": "assistant", "message": "Benchmark answer " * 20, "feedback": 1})
+        store.save_session(busiest, session_id, history)
+
+    writer = WriteBehindQueue(store)
+    queued_id = str(uuid.uuid4())
+
+    def save_queued() -> None:
+        history.append({"role": "user", "message": "Queued question"})
+        writer.submit(busiest, queued_id, history)
+
+    cases = {
+        "rebuild_indexes": lambda: rebuild_indexes(store),
+        "get_all_session_previews": lambda: store.list_sessions(),
+        "get_user_session_previews": lambda: store.list_sessions(username=busiest, start=today - timedelta(days=7)),
+        "get_feedback_summaries": lambda: store.feedback_summary(),
+        "browse_sessions": lambda: store.browse_sessions(limit=20),
+        "browse_sessions_negative": lambda: store.browse_sessions(negative_only=True, sort="negative",
+                                                                  offset=200, limit=20),
+        "dashboard_aggregation": lambda: store.usage(today - timedelta(days=30), today),
+        "dashboard_analytics": lambda: dashboard_analytics(store),
+        "search": lambda: store.search("shipment delayed"),
+        "save_chat_to_json": save,
+        "save_chat_to_json_queued": save_queued,
+    }
+    results = []
+    for case, func in cases.items():
+        result = {"case": case, "sessions": sessions, "backend": backend, **measure(func, repeat)}
+        results.append(result)
+        print(f"{sessions:>7} {backend:<7} {case:<28} median {result['median_s'] * 1000:9.2f} ms"
+              f"  peak {result['peak_kib']:10.1f} KiB")
+    writer.close()
+    results.append({"case": "generate", "sessions": sessions, "backend": backend, "min_s": generate_s,
+                    "median_s": generate_s, "max_s": generate_s, "peak_kib": None})
+    return results
+
+
+def git_revision() -> str:
+    """Get the current git revision, or None outside a checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the chat log storage paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Session counts to benchmark (default: %(default)s; 100000 is supported)")
+    parser.add_argument("--backend", choices=["files", "sqlite"], default="files", help="Store backend (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: %(default)s)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/storage-<timestamp>.json)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated chat logs")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="chat_bench_")
+    try:
+        results = []
+        for sessions in args.sizes:
+            results.extend(bench_size(sessions, args.backend, args.repeat, work_dir))
+    finally:
+        if args.keep:
+            print(f"Generated chat logs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "benchmark": "storage",
+        "created": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"storage-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Generate a synthetic chat log directory for benchmarking.
+
+Sessions are written in the same layout the app produces (JSON documents or
+append-only JSONL logs, sharded by day and user or flat), with timestamps spread over the last ``days`` days,
+a skewed number of sessions per user, varied history lengths and a
+configurable share of rated answers. Generation is deterministic for a given
+seed.
+
+Usage:
+    python -m benchmarks.generate_chat_logs --sessions 10000 --out /tmp/chat_logs
+"""
+
+import argparse
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from chat_store.files import session_filename
+from chat_store.session_log import snapshot_records
+
+QUESTIONS = [
+    "What is the current inventory level for SKU {n}?",
+    "Show me open purchase orders for supplier {n}",
+    "Why is shipment {n} delayed?",
+    "Forecast demand for product line {n} next quarter",
+    "Which warehouses are below safety stock?",
+    "Summarize lead times for vendor {n}",
+]
+
+
+def synthetic_history(rng: random.Random, max_turns: int, feedback_ratio: float, started: datetime = None) -> list:
+    """
+    Build a random conversation.
+
+    Args:
+        rng (random.Random): Random source
+        max_turns (int): Maximum number of question/answer pairs
+        feedback_ratio (float): Probability that an answer was rated
+        started (datetime): Time of the first message; messages are stamped
+            with increasing times and answers with a response latency
+
+    Returns:
+        list: Chat history in the app's message format
+    """
+    # Most conversations are short; a long tail runs up to max_turns.
+    turns = min(max_turns, 1 + int(rng.expovariate(1 / 4)))
+    history = []
+    sent = started
+    for _ in range(turns):
+        question = rng.choice(QUESTIONS).format(n=rng.randint(1, 9999))
+        history.append({"role": "user", "message": question})
+        answer = {"role": "assistant", "message": f"Echo: {question} " + "lorem ipsum " * rng.randint(5, 60)}
+        if started is not None:
+            latency_ms = round(rng.lognormvariate(7, 0.5), 1)
+            history[-1]["timestamp"] = sent.isoformat()
+            sent += timedelta(milliseconds=latency_ms)
+            answer["timestamp"] = sent.isoformat()
+            answer["latency_ms"] = latency_ms
+            sent += timedelta(seconds=rng.uniform(10, 300))
+        if rng.random() < feedback_ratio:
+            answer["feedback"] = 1 if rng.random() < 0.7 else 0
+        history.append(answer)
+    return history
+
+
+def generate(log_dir: str, sessions: int, users: int = 50, days: int = 90, max_turns: int = 40,
+             feedback_ratio: float = 0.3, fmt: str = "json", seed: int = 0, layout: str = "sharded") -> int:
+    """
+    Write synthetic session files into a log directory.
+
+    Args:
+        log_dir (str): Directory to create the session files in
+        sessions (int): Number of sessions to generate
+        users (int): Number of distinct users
+        days (int): Sessions are spread over this many days before now
+        max_turns (int): Maximum question/answer pairs per session
+        feedback_ratio (float): Share of answers that carry feedback
+        fmt (str): Storage format, "json" or "jsonl"
+        seed (int): Random seed
+        layout (str): Directory layout, "sharded" or "flat"
+
+    Returns:
+        int: Number of sessions written
+    """
+    rng = random.Random(seed)
+    os.makedirs(log_dir, exist_ok=True)
+    now = datetime.now()
+    usernames = [f"user{i:04d}" for i in range(users)]
+    # Skew activity so a few users own most sessions, as in real traffic.
+    weights = [1 / (i + 1) for i in range(users)]
+    for _ in range(sessions):
+        username = rng.choices(usernames, weights)[0]
+        session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        # Leave room for the longest conversation to end before now.
+        created = now - timedelta(seconds=rng.uniform(max_turns * 310, days * 86400))
+        history = synthetic_history(rng, max_turns, feedback_ratio, created)
+        timestamp = history[-1]["timestamp"]
+        filepath = os.path.join(log_dir, session_filename(username, session_id, fmt, layout, created.date()))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w") as f:
+            if fmt == "jsonl":
+                f.writelines(json.dumps(r) + "\n" for r in snapshot_records(username, session_id, history, timestamp))
+            else:
+                json.dump({"username": username, "session_id": session_id, "timestamp": timestamp, "chat_history": history}, f, indent=4)
+    return sessions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic chat log directory.")
+    parser.add_argument("--out", required=True, help="Directory to write the session files to")
+    parser.add_argument("--sessions", type=int, default=1000, help="Number of sessions (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=50, help="Number of users (default: %(default)s)")
+    parser.add_argument("--days", type=int, default=90, help="Days of history (default: %(default)s)")
+    parser.add_argument("--max-turns", type=int, default=40, help="Maximum turns per session (default: %(default)s)")
+    parser.add_argument("--feedback-ratio", type=float, default=0.3, help="Share of rated answers (default: %(default)s)")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json", help="Session file format (default: %(default)s)")
+    parser.add_argument("--layout", choices=["sharded", "flat"], default="sharded", help="Directory layout (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    args = parser.parse_args()
+    count = generate(args.out, args.sessions, args.users, args.days, args.max_turns,
+                     args.feedback_ratio, args.format, args.seed, args.layout)
+    print(f"Wrote {count} sessions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
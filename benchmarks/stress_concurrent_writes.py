@@ -0,0 +1,191 @@
+"""
+Stress test concurrent writes from several processes sharing one log directory.
+
+Simulates app replicas behind a load balancer: every worker process opens its
+own ``FileChatStore`` over the same directory and appends messages (with
+thumbs feedback on the assistant replies) to a small set of shared sessions,
+so saves of one session from different processes constantly overlap. A
+reader process loads and lists sessions meanwhile and reports any session
+file it could not parse.
+
+Afterwards the directory is checked from a fresh process:
+
+- every message written by every worker is present exactly once (no lost updates)
+- ``verify_feedback()`` finds no counter mismatch
+- the usage rollups and the message analytics table count every session and
+  message exactly once
+- the reader never saw a partial session
+
+Run with ``--no-locks`` (``CHAT_FILE_LOCKS=0``) to see the lost updates the
+locks prevent.
+
+Usage:
+    python -m benchmarks.stress_concurrent_writes [--workers 8] [--turns 50] [--sessions 4] [--format json|jsonl] [--no-locks]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+def session_ids(sessions: int) -> list:
+    """
+    Build the shared sessions as (username, session_id) pairs.
+
+    Args:
+        sessions (int): Number of sessions
+
+    Returns:
+        list: Session owners and identifiers
+    """
+    return [(f"user{i % 2}", f"stress-{i:03d}") for i in range(sessions)]
+
+
+def write_worker(log_dir: str, fmt: str, worker: int, turns: int, sessions: int) -> None:
+    """
+    Append user/assistant turns to the shared sessions in round robin.
+
+    Args:
+        log_dir (str): Shared chat log directory
+        fmt (str): Storage format, "json" or "jsonl"
+        worker (int): Worker number, part of every message it writes
+        turns (int): Number of turns to write
+        sessions (int): Number of shared sessions
+    """
+    from chat_store.file_store import FileChatStore
+
+    store = FileChatStore(log_dir, fmt=fmt)
+    targets = session_ids(sessions)
+    for turn in range(turns):
+        username, session_id = targets[(worker + turn) % len(targets)]
+        store.append_message(username, session_id, {"role": "user", "message": f"w{worker} t{turn} question"})
+        store.append_message(username, session_id, {
+            "role": "assistant",
+            "message": f"w{worker} t{turn} answer",
+            "feedback": 1 if (worker + turn) % 3 else 0,
+        })
+
+
+def read_worker(log_dir: str, sessions: int, stop, failures) -> None:
+    """
+    Load and list the shared sessions until told to stop.
+
+    Args:
+        log_dir (str): Shared chat log directory
+        sessions (int): Number of shared sessions
+        stop (multiprocessing.Event): Set when the writers are done
+        failures (multiprocessing.Value): Incremented for every session that
+            is listed but cannot be loaded
+    """
+    from chat_store.file_store import FileChatStore
+
+    store = FileChatStore(log_dir, fmt="json")
+    while not stop.is_set():
+        listed = {entry["session_id"] for entry in store.list_sessions()}
+        for _, session_id in session_ids(sessions):
+            if session_id in listed and store.load_session(session_id) is None:
+                with failures.get_lock():
+                    failures.value += 1
+        time.sleep(0.01)
+
+
+def verify(log_dir: str, fmt: str, workers: int, turns: int, sessions: int) -> list:
+    """
+    Check the log directory after the run.
+
+    Args:
+        log_dir (str): Shared chat log directory
+        fmt (str): Storage format used by the writers
+        workers (int): Number of writer processes
+        turns (int): Turns written by each worker
+        sessions (int): Number of shared sessions
+
+    Returns:
+        list: Problems found; empty when the run lost nothing
+    """
+    from chat_store.file_store import FileChatStore
+
+    store = FileChatStore(log_dir, fmt=fmt)
+    problems = []
+    expected = {f"w{w} t{t} {kind}" for w in range(workers) for t in range(turns) for kind in ("question", "answer")}
+    found = []
+    for _, session_id in session_ids(sessions):
+        data = store.load_session(session_id)
+        found.extend(msg["message"] for msg in (data["chat_history"] if data else []))
+    missing = expected - set(found)
+    if missing:
+        problems.append(f"{len(missing)} of {len(expected)} messages lost")
+    if len(found) != len(set(found)):
+        problems.append(f"{len(found) - len(set(found))} messages duplicated")
+    mismatches = store.verify_feedback()
+    if mismatches:
+        problems.append(f"{len(mismatches)} feedback counter mismatches, e.g. {mismatches[0]}")
+    _, by_user = store.usage()
+    totals = {field: sum(row[field] for row in by_user.values()) for field in ("sessions", "messages")}
+    if totals != {"sessions": sessions, "messages": len(found)}:
+        problems.append(f"usage rollups count {totals}, expected {sessions} sessions and {len(found)} messages")
+    rows = len(store.message_frame())
+    if rows != len(found):
+        problems.append(f"message analytics table has {rows} rows, expected {len(found)}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stress test concurrent writes to a shared chat log directory.")
+    parser.add_argument("--workers", type=int, default=8, help="Writer processes (default: %(default)s)")
+    parser.add_argument("--turns", type=int, default=50, help="Turns written by each worker (default: %(default)s)")
+    parser.add_argument("--sessions", type=int, default=4, help="Shared sessions (default: %(default)s)")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json", help="Storage format (default: %(default)s)")
+    parser.add_argument("--no-locks", action="store_true", help="Disable the cross-process file locks")
+    parser.add_argument("--keep", action="store_true", help="Keep the chat log directory")
+    args = parser.parse_args()
+
+    # Child processes read the setting when they import chat_store.
+    os.environ["CHAT_FILE_LOCKS"] = "0" if args.no_locks else "1"
+    log_dir = tempfile.mkdtemp(prefix="chat_stress_")
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    failures = ctx.Value("i", 0)
+    try:
+        reader = ctx.Process(target=read_worker, args=(log_dir, args.sessions, stop, failures))
+        reader.start()
+        started = time.perf_counter()
+        writers = [
+            ctx.Process(target=write_worker, args=(log_dir, args.format, w, args.turns, args.sessions))
+            for w in range(args.workers)
+        ]
+        for p in writers:
+            p.start()
+        for p in writers:
+            p.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader.join()
+
+        saves = args.workers * args.turns * 2
+        print(f"{args.workers} writers, {saves} saves to {args.sessions} sessions in {elapsed:.2f} s"
+              f" ({saves / elapsed:.0f} saves/s), locks {'off' if args.no_locks else 'on'}")
+        problems = verify(log_dir, args.format, args.workers, args.turns, args.sessions)
+        if any(p.exitcode for p in writers):
+            problems.append("a writer process failed")
+        if failures.value:
+            problems.append(f"the reader failed to load a listed session {failures.value} times")
+    finally:
+        if args.keep:
+            print(f"Chat logs kept in {log_dir}")
+        else:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: no lost or duplicated messages, counters, rollups and analytics exact")
+
+
+if __name__ == "__main__":
+    main()
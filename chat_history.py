@@ -0,0 +1,168 @@
+"""
+Compact in-memory representation of the active conversation.
+
+Every connected session keeps its conversation in ``st.session_state``. A
+list of per-message dicts costs a dict, its keys and boxed values for every
+message, and grows for as long as the session does. ``ChatHistory`` keeps
+the messages in columns instead: role and feedback as one-byte codes in
+``array`` columns (roles interned in a shared table), latency as doubles and
+the message text and timestamps as plain string lists.
+
+Only a window of the most recent messages stays resident. After a save has
+been handed to the write-behind queue, ``spill()`` drops the messages older
+than the window from memory; they remain in the store, later saves only
+send the resident messages (``ChatStore.save_session_tail()``) and they are
+read back with ``ChatStore.load_messages()`` when the user pages up. Message
+indices are absolute, so widget keys and store indices do not change when
+messages are spilled.
+
+Settings (environment variables):
+- CHAT_RESIDENT_MESSAGES: messages kept in memory per session (default 100)
+"""
+
+import math
+import os
+import threading
+from array import array
+
+CHAT_RESIDENT_MESSAGES = int(os.environ.get("CHAT_RESIDENT_MESSAGES", "100"))
+
+# Shared role table: a message stores the index of its role here
+_ROLES = ["user", "assistant"]
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+_roles_lock = threading.Lock()
+
+# Feedback codes: 1 positive, 0 negative, -1 none
+_NO_FEEDBACK = -1
+
+
+def _role_code(role: str) -> int:
+    code = _ROLE_CODES.get(role)
+    if code is None:
+        with _roles_lock:
+            if role not in _ROLE_CODES:
+                _ROLES.append(role)
+                _ROLE_CODES[role] = len(_ROLES) - 1
+            code = _ROLE_CODES[role]
+    return code
+
+
+class ChatHistory:
+    """
+    Messages of one conversation, of which the most recent are resident.
+
+    Indices are absolute positions in the conversation: ``len()`` counts
+    every message, spilled ones included, and ``start`` is the index of the
+    first resident message. Messages are returned as dicts shaped like the
+    stored ones ("role", "message" and, when set, "timestamp", "feedback"
+    and "latency_ms").
+
+    Args:
+        messages (list): Initial messages, the conversation from ``offset`` on
+        offset (int): Index of the first of ``messages`` in the conversation
+        resident (int): Number of recent messages kept in memory
+    """
+
+    __slots__ = ("start", "resident", "_roles", "_texts", "_timestamps", "_feedback", "_latency")
+
+    def __init__(self, messages: list = (), offset: int = 0, resident: int = CHAT_RESIDENT_MESSAGES) -> None:
+        self.start = offset
+        self.resident = resident
+        self._roles = array("b")
+        self._texts = []
+        self._timestamps = []
+        self._feedback = array("b")
+        self._latency = array("d")
+        for msg in messages:
+            self.append(msg)
+
+    def __len__(self) -> int:
+        return self.start + len(self._texts)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def _position(self, index: int) -> int:
+        position = index - self.start
+        if not 0 <= position < len(self._texts):
+            raise IndexError(f"Message {index} is not resident (resident: {self.start}-{len(self) - 1})")
+        return position
+
+    def __getitem__(self, index: int) -> dict:
+        position = self._position(index)
+        msg = {"role": _ROLES[self._roles[position]], "message": self._texts[position]}
+        if self._timestamps[position] is not None:
+            msg["timestamp"] = self._timestamps[position]
+        if self._feedback[position] != _NO_FEEDBACK:
+            msg["feedback"] = self._feedback[position]
+        if not math.isnan(self._latency[position]):
+            msg["latency_ms"] = self._latency[position]
+        return msg
+
+    def append(self, message: dict) -> int:
+        """
+        Add a message at the end of the conversation.
+
+        Args:
+            message (dict): Message with "role" and "message" keys
+
+        Returns:
+            int: Index of the appended message
+        """
+        self._roles.append(_role_code(message["role"]))
+        self._texts.append(message["message"])
+        self._timestamps.append(message.get("timestamp"))
+        feedback = message.get("feedback")
+        self._feedback.append(_NO_FEEDBACK if feedback is None else int(feedback))
+        latency = message.get("latency_ms")
+        self._latency.append(math.nan if latency is None else latency)
+        return len(self) - 1
+
+    def role(self, index: int) -> str:
+        """Get the role of a resident message."""
+        return _ROLES[self._roles[self._position(index)]]
+
+    def feedback(self, index: int):
+        """Get the feedback of a resident message (1, 0 or None)."""
+        value = self._feedback[self._position(index)]
+        return None if value == _NO_FEEDBACK else value
+
+    def set_feedback(self, index: int, value) -> None:
+        """
+        Record feedback on a resident message.
+
+        Args:
+            index (int): Index of the message
+            value: 1 positive, 0 negative, None cleared
+        """
+        self._feedback[self._position(index)] = _NO_FEEDBACK if value is None else int(value)
+
+    def resident_messages(self) -> list:
+        """
+        Get the resident messages as dicts.
+
+        Returns:
+            list: Messages from ``start`` to the end of the conversation
+        """
+        return [self[i] for i in range(self.start, len(self))]
+
+    def spill(self) -> int:
+        """
+        Drop the oldest resident messages beyond the resident window.
+
+        Only call this once the messages are persisted (or queued to be):
+        spilled messages are read back from the store.
+
+        Returns:
+            int: Number of messages dropped
+        """
+        excess = len(self._texts) - self.resident
+        if excess <= 0:
+            return 0
+        del self._roles[:excess]
+        del self._texts[:excess]
+        del self._timestamps[:excess]
+        del self._feedback[:excess]
+        del self._latency[:excess]
+        self.start += excess
+        return excess
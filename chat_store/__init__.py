@@ -0,0 +1,52 @@
+"""
+Chat log persistence for the SCM Chatbot.
+
+The app talks to a ``ChatStore`` obtained from ``get_store()``. The default
+``files`` backend stores sessions in ``CHAT_LOG_DIR`` as JSON files or, with
+``CHAT_LOG_FORMAT=jsonl``, as append-only record logs, sharded by day and user
+(``CHAT_LOG_LAYOUT``); derived indexes, such as the session manifest, live in
+its ``.index`` subdirectory and can always be rebuilt from the session files. ``CHAT_STORE_BACKEND=sqlite`` selects a
+single indexed SQLite database instead. ``get_writer()`` saves sessions from
+a background thread so the UI never waits on disk.
+"""
+
+from .files import (
+    CHAT_LOG_DIR,
+    CHAT_LOG_FORMAT,
+    CHAT_LOG_LAYOUT,
+    compact_session_logs,
+    first_user_message,
+    iter_session_files,
+    load_session,
+    migrate_layout,
+    safe_name,
+    save_session,
+    session_entry,
+    session_filename,
+)
+from .manifest import SessionManifest, get_manifest
+from .store import CHAT_DB_PATH, CHAT_STORE_BACKEND, ChatStore, get_store
+from .write_behind import WriteBehindQueue, get_writer
+
+__all__ = [
+    "CHAT_DB_PATH",
+    "CHAT_LOG_DIR",
+    "CHAT_LOG_FORMAT",
+    "CHAT_LOG_LAYOUT",
+    "CHAT_STORE_BACKEND",
+    "ChatStore",
+    "SessionManifest",
+    "WriteBehindQueue",
+    "compact_session_logs",
+    "first_user_message",
+    "get_manifest",
+    "get_store",
+    "get_writer",
+    "iter_session_files",
+    "load_session",
+    "migrate_layout",
+    "safe_name",
+    "save_session",
+    "session_entry",
+    "session_filename",
+]
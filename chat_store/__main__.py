@@ -0,0 +1,129 @@
+"""
+Maintenance commands for the chat log store.
+
+Usage:
+    python -m chat_store [--log-dir chat_logs] rebuild-manifest
+    python -m chat_store [--log-dir chat_logs] compact-logs
+    python -m chat_store [--log-dir chat_logs] migrate-sqlite [--db chat_logs/chat.db]
+    python -m chat_store [--log-dir chat_logs] verify-feedback [--repair]
+    python -m chat_store [--log-dir chat_logs] rebuild-rollups
+    python -m chat_store [--log-dir chat_logs] rebuild-search
+    python -m chat_store [--log-dir chat_logs] rebuild-analytics
+    python -m chat_store [--log-dir chat_logs] archive [--days 7]
+    python -m chat_store [--log-dir chat_logs] migrate-layout [--layout sharded|flat]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from .files import CHAT_LOG_DIR, CHAT_LOG_LAYOUT, compact_session_logs, migrate_layout
+from .manifest import get_manifest
+from .store import CHAT_DB_PATH, CHAT_STORE_BACKEND, ChatStore
+
+
+def open_store(args: argparse.Namespace) -> ChatStore:
+    """Open the store selected by CHAT_STORE_BACKEND for the given log directory."""
+    if CHAT_STORE_BACKEND == "sqlite":
+        from .sqlite_store import SqliteChatStore
+
+        return SqliteChatStore(CHAT_DB_PATH)
+    from .file_store import FileChatStore
+
+    return FileChatStore(args.log_dir)
+
+
+def rebuild_manifest(args: argparse.Namespace) -> None:
+    """Rebuild the session manifest from the session files."""
+    count = get_manifest(args.log_dir).rebuild()
+    print(f"Indexed {count} sessions in {args.log_dir}")
+
+
+def compact_logs(args: argparse.Namespace) -> None:
+    """Compact every append-only session log."""
+    count = compact_session_logs(args.log_dir)
+    print(f"Compacted {count} session logs in {args.log_dir}")
+
+
+def migrate_sqlite(args: argparse.Namespace) -> None:
+    """Copy every session file into the SQLite backend."""
+    from .sqlite_store import migrate_from_files
+
+    count = migrate_from_files(args.log_dir, args.db)
+    print(f"Migrated {count} sessions from {args.log_dir} to {args.db}")
+
+
+def verify_feedback(args: argparse.Namespace) -> None:
+    """Check the materialized feedback counters against a full recount."""
+    store = open_store(args)
+    mismatches = store.verify_feedback()
+    for key, stored, recounted in mismatches:
+        print(f"{key}: stored {stored}, recounted {recounted}")
+    if not mismatches:
+        print("Feedback counters match a full recount")
+    elif args.repair:
+        store.rebuild_feedback_counters()
+        print(f"Rebuilt feedback counters ({len(mismatches)} mismatches)")
+    else:
+        raise SystemExit(1)
+
+
+def rebuild_rollups(args: argparse.Namespace) -> None:
+    """Recompute the day x user usage rollups from the stored sessions."""
+    open_store(args).rebuild_rollups()
+    print("Rebuilt usage rollups")
+
+
+def rebuild_search(args: argparse.Namespace) -> None:
+    """Rebuild the full-text search index from the stored sessions."""
+    open_store(args).rebuild_search_index()
+    print("Rebuilt search index")
+
+
+def rebuild_analytics(args: argparse.Namespace) -> None:
+    """Rebuild the columnar message table behind the dashboard analytics."""
+    open_store(args).rebuild_analytics()
+    print("Rebuilt message analytics table")
+
+
+def archive(args: argparse.Namespace) -> None:
+    """Move sessions not saved for --days days to the compressed cold archive."""
+    store = open_store(args)
+    if not store.supports_archive:
+        raise SystemExit(f"The {CHAT_STORE_BACKEND} backend does not support archiving")
+    count = store.archive_sessions(date.today() - timedelta(days=args.days))
+    print(f"Archived {count} sessions older than {args.days} days")
+
+
+def migrate_layout_cmd(args: argparse.Namespace) -> None:
+    """Move session files into the sharded or flat directory layout."""
+    count = migrate_layout(args.log_dir, args.layout)
+    print(f"Moved {count} session files in {args.log_dir} to the {args.layout} layout")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m chat_store", description="Chat log store maintenance.")
+    parser.add_argument("--log-dir", default=CHAT_LOG_DIR, help="Chat log directory (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-manifest", help="Rebuild the session manifest").set_defaults(func=rebuild_manifest)
+    commands.add_parser("compact-logs", help="Compact append-only session logs").set_defaults(func=compact_logs)
+    migrate = commands.add_parser("migrate-sqlite", help="Copy session files into the SQLite backend")
+    migrate.add_argument("--db", default=CHAT_DB_PATH, help="Target database (default: %(default)s)")
+    migrate.set_defaults(func=migrate_sqlite)
+    verify = commands.add_parser("verify-feedback", help="Check feedback counters against a full recount")
+    verify.add_argument("--repair", action="store_true", help="Rebuild the counters if they do not match")
+    verify.set_defaults(func=verify_feedback)
+    commands.add_parser("rebuild-rollups", help="Recompute the usage rollups").set_defaults(func=rebuild_rollups)
+    commands.add_parser("rebuild-search", help="Rebuild the full-text search index").set_defaults(func=rebuild_search)
+    commands.add_parser("rebuild-analytics", help="Rebuild the message analytics table").set_defaults(func=rebuild_analytics)
+    archive_cmd = commands.add_parser("archive", help="Move aged sessions to the compressed cold archive")
+    archive_cmd.add_argument("--days", type=int, default=7, help="Archive sessions not saved for this many days (default: %(default)s)")
+    archive_cmd.set_defaults(func=archive)
+    layout = commands.add_parser("migrate-layout", help="Move session files into another directory layout")
+    layout.add_argument("--layout", choices=["sharded", "flat"], default=CHAT_LOG_LAYOUT, help="Target layout (default: %(default)s)")
+    layout.set_defaults(func=migrate_layout_cmd)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
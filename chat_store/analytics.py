@@ -0,0 +1,579 @@
+"""
+Columnar message table for the Admin Dashboard analytics.
+
+The file-backed store keeps one row per message (user, session, timestamp,
+role, length, feedback, latency) in Parquet files under
+``<log_dir>/.index/analytics``, so the dashboard runs vectorized pandas
+groupbys over millions of messages instead of walking session files.
+
+The first save of a session appends one record to the ``pending.jsonl``
+journal holding the session's rows as column lists::
+
+    {"session_id": ..., "username": ..., "timestamp": [...], "role": [...],
+     "length": [...], "feedback": [...], "latency_ms": [...]}
+
+While that record is pending, later saves only append the rows from the
+first added or changed message on, with its index in ``"start"``; replaying
+the journal keeps the rows before ``start`` and replaces the rest. A save
+that changes nothing appends nothing.
+
+Once enough records are pending they are flushed into a new immutable
+Parquet part and the journal is rewritten to a single header naming the
+live parts (``{"parts": ["part-000001.parquet", ...]}``). A session's rows in
+a later part or in the journal replace its rows in earlier parts, so no
+record needs the previous state of the session. Parts are merged into one
+when there are more than ``MAX_PARTS``.
+
+pandas and pyarrow are imported on first use, so saving a session does not
+load them.
+"""
+
+import itertools
+import os
+import threading
+from datetime import date, timedelta
+
+from .archive import get_archive
+from .journal import Journal
+from .manifest import INDEX_DIR_NAME
+
+ANALYTICS_DIR_NAME = "analytics"
+PENDING_FILENAME = "pending.jsonl"
+
+MESSAGE_COLUMNS = ("username", "session_id", "index", "timestamp", "role", "length", "feedback", "latency_ms")
+RECORD_COLUMNS = ("timestamp", "role", "length", "feedback", "latency_ms")
+CATEGORY_COLUMNS = ("username", "session_id", "role")
+
+# Flush pending records into a Parquet part once the journal holds this many.
+FLUSH_RECORDS = int(os.environ.get("CHAT_ANALYTICS_FLUSH_RECORDS", "2000"))
+
+# Merge the parts into one when a flush would leave more than this many.
+MAX_PARTS = 8
+
+
+def session_record(username: str, session_id: str, chat_history: list, timestamp: str,
+                   previous: dict = None) -> dict:
+    """
+    Build the journal record holding a session's message rows.
+
+    Messages carry the time they were sent in ``timestamp``. Older messages
+    without one are dated to the session's previous save (if they were
+    already saved then) or to this save.
+
+    Args:
+        username (str): User who owns the session
+        session_id (str): Session identifier
+        chat_history (list): Messages of the session
+        timestamp (str): ISO timestamp of this save
+        previous (dict): Manifest entry of the session before this save, if any
+
+    Returns:
+        dict: Record with one list per message column
+    """
+    known = previous["messages"] if previous else 0
+    stamps = [
+        msg.get("timestamp") or (previous["timestamp"] if i < known else timestamp)
+        for i, msg in enumerate(chat_history)
+    ]
+    return {
+        "session_id": session_id,
+        "username": username,
+        "timestamp": stamps,
+        "role": [msg["role"] for msg in chat_history],
+        "length": [len(msg["message"]) for msg in chat_history],
+        "feedback": [msg.get("feedback") for msg in chat_history],
+        "latency_ms": [msg.get("latency_ms") for msg in chat_history],
+    }
+
+
+def record_changes(current: dict, record: dict) -> dict:
+    """
+    Build the journal record of what changed in a session since its pending record.
+
+    Args:
+        current (dict): Pending record of the session
+        record (dict): Record of the session's current rows
+
+    Returns:
+        dict: Record with ``"start"``, the index of the first added or changed
+            row, and the rows from there on; None if nothing changed
+    """
+    start = min(len(current["role"]), len(record["role"]))
+    for column in RECORD_COLUMNS:
+        old, new = current[column], record[column]
+        if old[:start] != new[:start]:
+            start = next(i for i in range(start) if old[i] != new[i])
+    if start == len(current["role"]) == len(record["role"]) and current["username"] == record["username"]:
+        return None
+    changes = {"session_id": record["session_id"], "username": record["username"], "start": start}
+    for column in RECORD_COLUMNS:
+        changes[column] = record[column][start:]
+    return changes
+
+
+def apply_changes(current: dict, changes: dict) -> dict:
+    """
+    Apply a journal record to a session's pending record.
+
+    Args:
+        current (dict): Pending record of the session, updated in place (None if there is none)
+        changes (dict): Record as built by ``session_record()`` or ``record_changes()``
+
+    Returns:
+        dict: The session's record after the change
+    """
+    start = changes.pop("start", 0)
+    if current is None or start == 0:
+        return changes
+    current["username"] = changes["username"]
+    for column in RECORD_COLUMNS:
+        del current[column][start:]
+        current[column].extend(changes[column])
+    return current
+
+
+def empty_frame():
+    """Return a message table with no rows and the table's column types."""
+    return records_frame([])
+
+
+def records_frame(records: list):
+    """
+    Build a typed message table from session records.
+
+    Args:
+        records (list): Session records as built by ``session_record()``
+
+    Returns:
+        pandas.DataFrame: One row per message; username, session_id and role
+            are categorical, timestamp is a datetime
+    """
+    import numpy as np
+    import pandas as pd
+
+    counts = [len(r["role"]) for r in records]
+    columns = {
+        "username": np.repeat([r["username"] for r in records], counts) if records else [],
+        "session_id": np.repeat([r["session_id"] for r in records], counts) if records else [],
+        "index": np.concatenate([np.arange(n) for n in counts]) if records else [],
+    }
+    for column in RECORD_COLUMNS:
+        columns[column] = list(itertools.chain.from_iterable(r[column] for r in records))
+    return typed_frame(pd.DataFrame(columns, columns=list(MESSAGE_COLUMNS)))
+
+
+def typed_frame(frame):
+    """
+    Convert a message table's columns to the table's types.
+
+    Args:
+        frame (pandas.DataFrame): Message columns with plain Python values and
+            ISO timestamp strings
+
+    Returns:
+        pandas.DataFrame: The same frame with username, session_id and role
+            categorical, timestamp a datetime and the numeric columns sized down
+    """
+    import pandas as pd
+
+    for column in CATEGORY_COLUMNS:
+        frame[column] = frame[column].astype(str).astype("category")
+    frame["index"] = frame["index"].astype("int32")
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="ISO8601", errors="coerce")
+    frame["length"] = frame["length"].astype("int32")
+    frame["feedback"] = pd.to_numeric(frame["feedback"], errors="coerce").astype("float32")
+    frame["latency_ms"] = pd.to_numeric(frame["latency_ms"], errors="coerce").astype("float32")
+    return frame
+
+
+def concat_frames(frames: list):
+    """
+    Concatenate message tables, keeping the categorical columns categorical.
+
+    Args:
+        frames (list): Message tables
+
+    Returns:
+        pandas.DataFrame: All rows
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return empty_frame()
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in MESSAGE_COLUMNS:
+        if column in CATEGORY_COLUMNS:
+            columns[column] = union_categoricals([f[column] for f in frames], ignore_order=True)
+        else:
+            columns[column] = np.concatenate([f[column].to_numpy() for f in frames])
+    return pd.DataFrame(columns)
+
+
+def replace_sessions(frame, rows):
+    """
+    Replace the rows of every session in ``rows``.
+
+    Args:
+        frame (pandas.DataFrame): Current message table
+        rows (pandas.DataFrame): Complete rows of the sessions to replace
+
+    Returns:
+        pandas.DataFrame: ``frame`` without those sessions' old rows, plus ``rows``
+    """
+    if not len(rows):
+        return frame
+    kept = frame[~frame["session_id"].isin(rows["session_id"].unique())]
+    return concat_frames([kept, rows])
+
+
+class MessageTable:
+    """
+    One-row-per-message table stored as Parquet parts plus a pending journal.
+
+    Args:
+        log_dir (str): Chat log directory the table describes
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, INDEX_DIR_NAME, ANALYTICS_DIR_NAME)
+        self.journal = Journal(os.path.join(self.path, PENDING_FILENAME))
+        self._lock = threading.RLock()
+        self._parts = []
+        self._pending = {}
+        self._lines = 0
+        self._base = None
+        self._base_parts = None
+        self._frame = None
+        self._loaded = False
+
+    def refresh(self) -> None:
+        """
+        Pick up records appended since the last refresh, by this or any other process.
+
+        The table is rebuilt from the session files the first time it is used
+        if no journal exists yet.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if not os.path.exists(self.journal.path):
+                    self.rebuild()
+                    return
+            records, reset = self.journal.read_new()
+            if reset:
+                self._pending.clear()
+                self._lines = 0
+            for record in records:
+                if "parts" in record:
+                    self._parts = record["parts"]
+                else:
+                    session_id = record["session_id"]
+                    self._pending[session_id] = apply_changes(self._pending.get(session_id), record)
+                    self._lines += 1
+            if records or reset:
+                self._frame = None
+
+    # --- Parts ---
+    def _part_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _next_part(self) -> str:
+        numbers = [int(n[len("part-"):-len(".parquet")]) for n in os.listdir(self.path)
+                   if n.startswith("part-") and n.endswith(".parquet")]
+        return f"part-{max(numbers, default=0) + 1:06d}.parquet"
+
+    def _write_part(self, frame) -> str:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.path, exist_ok=True)
+        name = self._next_part()
+        tmp_path = self._part_path(name) + f".{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path)
+        os.replace(tmp_path, self._part_path(name))
+        return name
+
+    def _load_parts(self, parts: list):
+        import pyarrow.parquet as pq
+
+        frame = empty_frame()
+        for name in parts:
+            frame = replace_sessions(frame, pq.read_table(self._part_path(name)).to_pandas())
+        return frame
+
+    def _publish(self, parts: list, base) -> None:
+        # The header names the live parts; parts it drops are deleted afterwards.
+        stale = set(self._parts) - set(parts)
+        self.journal.rewrite([{"parts": parts}])
+        for name in stale:
+            try:
+                os.remove(self._part_path(name))
+            except FileNotFoundError:
+                pass
+        self._pending.clear()
+        self._lines = 0
+        self._parts = list(parts)
+        self._base, self._base_parts = (base, list(parts)) if base is not None else (None, None)
+        self._frame = None
+        self.journal.read_new()
+
+    def _flush(self, merge: bool) -> None:
+        rows = records_frame(list(self._pending.values()))
+        parts = self._parts + [self._write_part(rows)]
+        base = replace_sessions(self._base, rows) if self._base_parts == self._parts else None
+        if merge and len(parts) > 1:
+            base = base if base is not None else self._load_parts(parts)
+            parts = [self._write_part(base)]
+        self._publish(parts, base)
+
+    # --- Writes ---
+    def update(self, username: str, session_id: str, chat_history: list, timestamp: str,
+               previous: dict = None) -> None:
+        """
+        Replace a session's rows with its current messages.
+
+        Only the rows added or changed since the session's pending record are
+        journaled; a session with no pending record is journaled in full.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Session identifier
+            chat_history (list): Messages of the session
+            timestamp (str): ISO timestamp of the save
+            previous (dict): Manifest entry of the session before this save, if any
+        """
+        record = session_record(username, session_id, chat_history, timestamp, previous)
+        with self._lock, self.journal.lock():
+            self.refresh()
+            current = self._pending.get(session_id)
+            if current is not None:
+                # Messages without a timestamp keep the date they were first journaled with.
+                for i in range(min(len(current["timestamp"]), len(chat_history))):
+                    if not chat_history[i].get("timestamp"):
+                        record["timestamp"][i] = current["timestamp"][i]
+                record = record_changes(current, record)
+                if record is None:
+                    return
+            self.journal.append([record])
+            self.refresh()
+            if self._lines >= FLUSH_RECORDS:
+                self._flush(merge=len(self._parts) >= MAX_PARTS)
+
+    def compact(self) -> bool:
+        """
+        Flush pending records into a Parquet part, merging parts if there are too many.
+
+        Returns:
+            bool: True if anything was written
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            if not self._pending:
+                return False
+            self._flush(merge=len(self._parts) >= MAX_PARTS)
+            return True
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the table by reading every session file and archived session.
+
+        Returns:
+            int: Number of sessions in the table
+        """
+        from .files import iter_session_files, load_session
+
+        with self._lock, self.journal.lock():
+            self._loaded = True
+            records = []
+            for filename in iter_session_files(self.log_dir):
+                data = load_session(filename, self.log_dir)
+                if data and data.get("chat_history"):
+                    records.append(_rebuild_record(data))
+            for data, _ in get_archive(self.log_dir).iter_sessions():
+                if data.get("chat_history"):
+                    records.append(_rebuild_record(data))
+            base = records_frame(records)
+            os.makedirs(self.path, exist_ok=True)
+            # Parts left behind by an earlier table are dropped along with the listed ones.
+            self._parts = [n for n in os.listdir(self.path) if n.startswith("part-") and n.endswith(".parquet")]
+            self._publish([self._write_part(base)], base)
+            return len(records)
+
+    # --- Queries ---
+    def frame(self, start: date = None, end: date = None):
+        """
+        Get the message table, optionally limited to a date range.
+
+        The full table is cached until the next write; callers must not
+        modify the returned frame.
+
+        Args:
+            start (date): First day to include (inclusive)
+            end (date): Last day to include (inclusive)
+
+        Returns:
+            pandas.DataFrame: One row per message, see ``records_frame()``
+        """
+        import pandas as pd
+
+        with self._lock:
+            self.refresh()
+            if self._frame is None:
+                for attempt in range(3):
+                    try:
+                        if self._base_parts != self._parts:
+                            self._base, self._base_parts = self._load_parts(self._parts), list(self._parts)
+                        break
+                    except FileNotFoundError:
+                        # Merged away by a concurrent compaction; its new header is in the journal.
+                        if attempt == 2:
+                            raise
+                        self.refresh()
+                self._frame = replace_sessions(self._base, records_frame(list(self._pending.values())))
+            frame = self._frame
+        if start is not None:
+            frame = frame[frame["timestamp"] >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame["timestamp"] < pd.Timestamp(end + timedelta(days=1))]
+        return frame
+
+    def stats(self) -> dict:
+        """
+        Get the size of the table.
+
+        Returns:
+            dict: Number of Parquet parts, their total bytes and pending session records
+        """
+        with self._lock:
+            self.refresh()
+            return {
+                "parts": len(self._parts),
+                "bytes": sum(os.path.getsize(self._part_path(n)) for n in self._parts if os.path.exists(self._part_path(n))),
+                "pending": self._lines,
+            }
+
+
+def _rebuild_record(data: dict) -> dict:
+    # Messages saved before they carried a timestamp are dated to the session's last save.
+    return session_record(data["username"], data["session_id"], data["chat_history"], data.get("timestamp", ""))
+
+
+# --- Vectorized dashboard queries ---
+def _days(frame):
+    return frame["timestamp"].dt.normalize()
+
+
+def feedback_rate_by_day(frame):
+    """
+    Share of rated assistant messages rated positively, per day.
+
+    Args:
+        frame (pandas.DataFrame): Message table
+
+    Returns:
+        pandas.DataFrame: Columns rated, positive and rate, indexed by day
+    """
+    rated = frame[(frame["role"] == "assistant") & frame["feedback"].notna()]
+    daily = rated.groupby(_days(rated))["feedback"].agg(rated="size", positive="sum")
+    daily["positive"] = daily["positive"].astype("int64")
+    daily["rate"] = daily["positive"] / daily["rated"]
+    return daily.rename_axis("day")
+
+
+def volume_by_hour(frame):
+    """
+    Number of messages per hour of the day and role.
+
+    Args:
+        frame (pandas.DataFrame): Message table
+
+    Returns:
+        pandas.DataFrame: One column per role, indexed by hour 0-23
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = frame[frame["timestamp"].notna()]
+    roles = frame["role"].cat.categories
+    # Count (hour, role) pairs on their integer codes instead of grouping.
+    keys = frame["timestamp"].dt.hour.to_numpy() * len(roles) + frame["role"].cat.codes.to_numpy()
+    counts = np.bincount(keys, minlength=24 * len(roles)).reshape(24, len(roles))
+    table = pd.DataFrame(counts, index=pd.RangeIndex(24, name="hour"), columns=list(roles))
+    return table.loc[:, table.sum() > 0]
+
+
+def latency_by_day(frame):
+    """
+    Median and 95th percentile response latency per day.
+
+    Args:
+        frame (pandas.DataFrame): Message table
+
+    Returns:
+        pandas.DataFrame: Columns p50_ms and p95_ms, indexed by day; empty if
+            no assistant message in ``frame`` has a latency
+    """
+    import pandas as pd
+
+    timed = frame[(frame["role"] == "assistant") & frame["latency_ms"].notna()]
+    if timed.empty:
+        return pd.DataFrame(columns=["p50_ms", "p95_ms"], index=pd.DatetimeIndex([], name="day"), dtype="float32")
+    quantiles = timed.groupby(_days(timed))["latency_ms"].quantile([0.5, 0.95]).unstack()
+    quantiles.columns = ["p50_ms", "p95_ms"]
+    return quantiles.rename_axis("day")
+
+
+def weekly_retention(frame):
+    """
+    Weekly cohort retention of users.
+
+    Users belong to the cohort of the week (starting Monday) they first sent
+    a message in ``frame``.
+
+    Args:
+        frame (pandas.DataFrame): Message table
+
+    Returns:
+        pandas.DataFrame: Share of each cohort active N weeks later, one row
+            per cohort week and one column per N (0 is always 1.0)
+    """
+    import pandas as pd
+
+    frame = frame[frame["timestamp"].notna()]
+    # Week numbers since the Monday before the epoch (1970-01-01 was a Thursday).
+    days = frame["timestamp"].to_numpy().astype("datetime64[D]").astype("int64")
+    active = pd.DataFrame({"user": frame["username"].cat.codes.to_numpy(), "week": (days + 3) // 7})
+    active = active.drop_duplicates()
+    cohort = active.groupby("user")["week"].transform("min")
+    counts = active.groupby([cohort.rename("cohort"), (active["week"] - cohort).rename("age")]).size().unstack(fill_value=0)
+    if counts.empty:
+        return counts
+    counts.index = pd.to_datetime(counts.index * 7 - 3, unit="D")
+    return counts.div(counts[0], axis=0).rename_axis(index="cohort", columns="weeks later")
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_message_table(log_dir: str) -> MessageTable:
+    """
+    Get the process-wide message table for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        MessageTable: Shared table instance
+    """
+    key = os.path.abspath(log_dir)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = MessageTable(log_dir)
+        return _tables[key]
@@ -0,0 +1,242 @@
+"""
+Compressed cold archive for aged chat sessions.
+
+Sessions not saved for a while are moved out of the log directory (see
+``files.archive_sessions``) into append-only segment files under
+``<log_dir>/archive``. Every session is one independent gzip member appended
+to the current segment
+(``segment-000001.gz``, rolled over at ``ARCHIVE_SEGMENT_BYTES``), holding the
+session file's original contents compacted: the JSON document, or the record
+lines of a ``.jsonl`` log. An offset index (``archive/index.jsonl``) records
+each session's segment, byte offset and length together with its manifest
+metadata, so a single session is read with one seek and one small
+decompression, and listings never touch the segments.
+
+Archived sessions are dropped from the session manifest, which keeps the hot
+listings (the user sidebar) independent of how much history has accumulated.
+Saving an archived session again brings it back to the log directory.
+"""
+
+import gzip
+import json
+import os
+import threading
+
+from .journal import Journal
+from .session_log import parse_records, replay
+
+ARCHIVE_DIR_NAME = "archive"
+ARCHIVE_INDEX_FILENAME = "index.jsonl"
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get("CHAT_ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+
+
+class SessionArchive:
+    """
+    Segment files of compressed sessions plus their offset index.
+
+    Index entries are manifest entries (``username``, ``session_id``,
+    ``timestamp``, ``preview``, ``messages``, ``filename``) extended with
+    ``format``, ``segment``, ``offset`` and ``length``.
+
+    Args:
+        log_dir (str): Chat log directory the archive belongs to
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, ARCHIVE_DIR_NAME)
+        self.journal = Journal(os.path.join(self.path, ARCHIVE_INDEX_FILENAME))
+        self._lock = threading.RLock()
+        self._entries = {}
+
+    def refresh(self) -> None:
+        """Pick up index records appended since the last refresh."""
+        with self._lock:
+            records, reset = self.journal.read_new()
+            if reset:
+                self._entries.clear()
+            for record in records:
+                if record.get("removed"):
+                    self._entries.pop(record["session_id"], None)
+                else:
+                    self._entries[record["session_id"]] = record
+
+    # --- Writes ---
+    def _segment(self, size: int) -> str:
+        segments = sorted(name for name in os.listdir(self.path) if name.startswith("segment-"))
+        if segments:
+            current = segments[-1]
+            if os.path.getsize(os.path.join(self.path, current)) + size <= ARCHIVE_SEGMENT_BYTES:
+                return current
+            number = int(current[len("segment-"):-len(".gz")]) + 1
+        else:
+            number = 1
+        return f"segment-{number:06d}.gz"
+
+    def add(self, entry: dict, payload: str) -> dict:
+        """
+        Append one session to the current segment and index it.
+
+        The member is flushed to disk before the index record is written, so
+        the index never points at bytes that are not there.
+
+        Args:
+            entry (dict): Manifest entry of the session
+            payload (str): Session file contents
+
+        Returns:
+            dict: The index entry
+        """
+        fmt = "jsonl" if entry["filename"].endswith(".jsonl") else "json"
+        if fmt == "json":
+            payload = json.dumps(json.loads(payload), separators=(",", ":"))
+        member = gzip.compress(payload.encode("utf-8"))
+        with self._lock, self.journal.lock():
+            os.makedirs(self.path, exist_ok=True)
+            segment = self._segment(len(member))
+            with open(os.path.join(self.path, segment), "ab") as f:
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            record = dict(entry, format=fmt, segment=segment, offset=offset, length=len(member))
+            self.journal.append([record])
+            self.refresh()
+            return record
+
+    def forget(self, session_id: str) -> None:
+        """
+        Drop a session from the index, e.g. once it is saved to the log directory again.
+
+        The bytes stay in their segment until the archive is rewritten.
+
+        Args:
+            session_id (str): Session identifier
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            if session_id in self._entries:
+                self.journal.append([{"session_id": session_id, "removed": True}])
+                self.refresh()
+
+    # --- Reads ---
+    def _read(self, entry: dict) -> str:
+        with open(os.path.join(self.path, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            return gzip.decompress(f.read(entry["length"])).decode("utf-8")
+
+    def get(self, session_id: str) -> dict:
+        """
+        Get the index entry of an archived session.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            dict: The entry, or None if the session is not archived
+        """
+        with self._lock:
+            self.refresh()
+            return self._entries.get(session_id)
+
+    def load(self, session_id: str) -> dict:
+        """
+        Read one archived session by seeking to its member.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            dict: Session data in the JSON session file shape, or None
+        """
+        entry = self.get(session_id)
+        if entry is None:
+            return None
+        text = self._read(entry)
+        if entry["format"] == "jsonl":
+            return replay(parse_records(text))
+        return json.loads(text)
+
+    def records(self, session_id: str) -> list:
+        """
+        Read the log records of a session archived from a ``.jsonl`` file.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            list: Records in file order, or None for JSON sessions and
+                sessions that are not archived
+        """
+        entry = self.get(session_id)
+        if entry is None or entry["format"] != "jsonl":
+            return None
+        return parse_records(self._read(entry))
+
+    def sessions(self, username: str = None) -> list:
+        """
+        List archived sessions from the index, newest first.
+
+        Args:
+            username (str): Only include sessions of this user
+
+        Returns:
+            list: Index entries
+        """
+        with self._lock:
+            self.refresh()
+            entries = [e for e in self._entries.values() if username is None or e["username"] == username]
+        return sorted(entries, key=lambda e: e["timestamp"], reverse=True)
+
+    def iter_sessions(self):
+        """
+        Iterate over every archived session, for rebuilding derived indexes.
+
+        Yields:
+            tuple: (data, records) with the session data and, for sessions
+                archived from ``.jsonl`` logs, their records (else None)
+        """
+        for entry in self.sessions():
+            text = self._read(entry)
+            if entry["format"] == "jsonl":
+                records = parse_records(text)
+                yield replay(records), records
+            else:
+                yield json.loads(text), None
+
+    def stats(self) -> dict:
+        """
+        Get the size of the archive.
+
+        Returns:
+            dict: Number of archived sessions and segments, and total segment bytes
+        """
+        with self._lock:
+            self.refresh()
+            segments = [n for n in os.listdir(self.path) if n.startswith("segment-")] if os.path.isdir(self.path) else []
+            return {
+                "sessions": len(self._entries),
+                "segments": len(segments),
+                "bytes": sum(os.path.getsize(os.path.join(self.path, n)) for n in segments),
+            }
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(log_dir: str) -> SessionArchive:
+    """
+    Get the process-wide archive for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        SessionArchive: Shared archive instance
+    """
+    key = os.path.abspath(log_dir)
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = SessionArchive(log_dir)
+        return _archives[key]
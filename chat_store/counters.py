@@ -0,0 +1,254 @@
+"""
+Materialized feedback counters for the file-backed store.
+
+Positive/negative feedback counts per session are kept in a journal of delta
+records (``{"session_id": ..., "positive": +1, "negative": 0}``) next to the
+session manifest. Summing the deltas gives the per-session counters, and the
+overall totals are maintained alongside, so the admin feedback summary never
+has to re-read the session files. ``recount()`` recomputes everything from the
+session files to verify or repair the counters.
+"""
+
+import os
+import threading
+
+from .archive import get_archive
+from .journal import Journal
+from .manifest import INDEX_DIR_NAME
+
+COUNTERS_FILENAME = "feedback_counters.jsonl"
+
+# Compact once the journal holds this many delta lines beyond one per session.
+COMPACT_SLACK = 1000
+
+
+def count_feedback(chat_history: list) -> tuple:
+    """
+    Count feedback on the assistant messages of a conversation.
+
+    Args:
+        chat_history (list): Messages of the session
+
+    Returns:
+        tuple: (positive, negative)
+    """
+    pos, neg = 0, 0
+    for msg in chat_history:
+        if msg.get("role") == "assistant":
+            if msg.get("feedback") == 1:
+                pos += 1
+            elif msg.get("feedback") == 0:
+                neg += 1
+    return pos, neg
+
+
+class FeedbackCounters:
+    """
+    Per-session and overall feedback counters backed by a delta journal.
+
+    Args:
+        log_dir (str): Chat log directory the counters describe
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.journal = Journal(os.path.join(log_dir, INDEX_DIR_NAME, COUNTERS_FILENAME))
+        self._lock = threading.RLock()
+        self._sessions = {}
+        self._overall = {"positive": 0, "negative": 0}
+        self._lines = 0
+        self._loaded = False
+
+    def _clear(self) -> None:
+        self._sessions.clear()
+        self._overall = {"positive": 0, "negative": 0}
+        self._lines = 0
+
+    def _apply(self, record: dict) -> None:
+        counts = self._sessions.setdefault(record["session_id"], {"positive": 0, "negative": 0})
+        for key in ("positive", "negative"):
+            counts[key] += record.get(key, 0)
+            self._overall[key] += record.get(key, 0)
+        self._lines += 1
+
+    def refresh(self) -> None:
+        """
+        Pick up deltas appended since the last refresh, by this or any other process.
+
+        The counters are recounted from the session files the first time they
+        are used if no journal exists yet.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if not os.path.exists(self.journal.path):
+                    self.rebuild()
+                    return
+            records, reset = self.journal.read_new()
+            if reset:
+                self._clear()
+            for record in records:
+                self._apply(record)
+
+    def update(self, session_id: str, positive: int, negative: int) -> tuple:
+        """
+        Bring a session's counters to the given values by appending a delta.
+
+        Args:
+            session_id (str): Session identifier
+            positive (int): Current number of positive ratings in the session
+            negative (int): Current number of negative ratings in the session
+
+        Returns:
+            tuple: (positive_delta, negative_delta) that was applied
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            current = self._sessions.get(session_id, {"positive": 0, "negative": 0})
+            delta = {
+                "session_id": session_id,
+                "positive": positive - current["positive"],
+                "negative": negative - current["negative"],
+            }
+            if not delta["positive"] and not delta["negative"]:
+                return 0, 0
+            self.journal.append([delta])
+            self.refresh()
+            if self._lines > len(self._sessions) + COMPACT_SLACK:
+                self._rewrite(self._sessions)
+            return delta["positive"], delta["negative"]
+
+    def compact(self) -> bool:
+        """
+        Fold the delta journal down to one line per rated session if it has grown.
+
+        Returns:
+            bool: True if the journal was rewritten
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            if self._lines <= len(self._sessions):
+                return False
+            self._rewrite(self._sessions)
+            return True
+
+    def _rewrite(self, sessions: dict) -> None:
+        records = [
+            {"session_id": session_id, "positive": c["positive"], "negative": c["negative"]}
+            for session_id, c in sessions.items()
+            if c["positive"] or c["negative"]
+        ]
+        self._clear()
+        self.journal.rewrite(records)
+        for record in records:
+            self._apply(record)
+
+    def get(self, session_id: str) -> dict:
+        """
+        Get the feedback counters of one session.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            dict: Positive/negative counts (zero for unrated sessions)
+        """
+        with self._lock:
+            self.refresh()
+            return dict(self._sessions.get(session_id, {"positive": 0, "negative": 0}))
+
+    def overall(self) -> dict:
+        """
+        Get the overall feedback totals.
+
+        Returns:
+            dict: Total positive/negative feedback counts
+        """
+        with self._lock:
+            self.refresh()
+            return dict(self._overall)
+
+    def sessions(self) -> dict:
+        """
+        Get the feedback counters of every rated session.
+
+        Returns:
+            dict: Positive/negative counts keyed by session id
+        """
+        with self._lock:
+            self.refresh()
+            return {session_id: dict(c) for session_id, c in self._sessions.items()}
+
+    def negatives(self) -> dict:
+        """
+        Get the negative feedback count of every session that has any.
+
+        Returns:
+            dict: Negative counts keyed by session id
+        """
+        with self._lock:
+            self.refresh()
+            return {session_id: c["negative"] for session_id, c in self._sessions.items() if c["negative"]}
+
+    def recount(self) -> tuple:
+        """
+        Count feedback from scratch by reading every session file and archived session.
+
+        Returns:
+            tuple: (overall, sessions) in the same shape as ``overall()`` and
+                ``sessions()``
+        """
+        from .files import iter_session_files, load_session
+
+        overall = {"positive": 0, "negative": 0}
+        sessions = {}
+        for filename in iter_session_files(self.log_dir):
+            data = load_session(filename, self.log_dir)
+            if data is None:
+                continue
+            pos, neg = count_feedback(data.get("chat_history", []))
+            overall["positive"] += pos
+            overall["negative"] += neg
+            sessions[data["session_id"]] = {"positive": pos, "negative": neg}
+        for data, _ in get_archive(self.log_dir).iter_sessions():
+            if data["session_id"] in sessions:
+                continue
+            pos, neg = count_feedback(data.get("chat_history", []))
+            overall["positive"] += pos
+            overall["negative"] += neg
+            sessions[data["session_id"]] = {"positive": pos, "negative": neg}
+        return overall, sessions
+
+    def rebuild(self) -> dict:
+        """
+        Replace the counters with a full recount of the session files.
+
+        Returns:
+            dict: The recounted overall totals
+        """
+        with self._lock, self.journal.lock():
+            self._loaded = True
+            overall, sessions = self.recount()
+            self._rewrite(sessions)
+            return overall
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_counters(log_dir: str) -> FeedbackCounters:
+    """
+    Get the process-wide feedback counters for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        FeedbackCounters: Shared counters instance
+    """
+    key = os.path.abspath(log_dir)
+    with _counters_lock:
+        if key not in _counters:
+            _counters[key] = FeedbackCounters(log_dir)
+        return _counters[key]
@@ -0,0 +1,196 @@
+"""
+File-backed chat store: one session file per session plus the manifest,
+feedback counters, usage rollups, full-text search index and columnar message
+table. Aged sessions
+can be moved to the compressed cold archive; they leave the hot listings but
+can still be loaded, searched and summarized.
+
+Replicas may share the log directory: every session save holds the session's
+lock (see ``locks``) from reading its previous state to updating the derived
+indexes, so concurrent saves of one session are applied one after another.
+"""
+
+import heapq
+from datetime import date
+
+from . import files
+from .analytics import get_message_table
+from .archive import get_archive
+from .counters import count_feedback, get_counters
+from .locks import session_lock
+from .manifest import get_manifest
+from .rollups import get_rollups
+from .search_index import get_search_index
+from .store import ChatStore
+
+
+class FileChatStore(ChatStore):
+    """
+    Chat store over session files in a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+        fmt (str): Storage format for new writes, "json" or "jsonl"
+    """
+
+    supports_archive = True
+
+    def __init__(self, log_dir: str, fmt: str = files.CHAT_LOG_FORMAT) -> None:
+        self.log_dir = log_dir
+        self.fmt = fmt
+        self.manifest = get_manifest(log_dir)
+        self.counters = get_counters(log_dir)
+        self.rollups = get_rollups(log_dir)
+        self.search_index = get_search_index(log_dir)
+        self.messages = get_message_table(log_dir)
+        self.archive = get_archive(log_dir)
+
+    def _lock(self, username: str, session_id: str):
+        return session_lock(self.log_dir, files.session_key(username, session_id))
+
+    def save_session(self, username: str, session_id: str, chat_history: list) -> dict:
+        with self._lock(username, session_id):
+            previous = self.manifest.get(session_id)
+            if previous is None:
+                # Saving an archived session brings it back to the log directory.
+                previous = self.archive.get(session_id)
+            # Load the counters and rollups before writing so a first-use rebuild does not count this save twice.
+            self.counters.refresh()
+            self.rollups.refresh()
+            entry = files.save_session(username, session_id, chat_history, self.log_dir, self.fmt)
+            positive, negative = self.counters.update(session_id, *count_feedback(chat_history))
+            self.rollups.record(
+                username,
+                sessions=int(previous is None),
+                messages=len(chat_history) - (previous["messages"] if previous else 0),
+                positive=positive,
+                negative=negative,
+            )
+            self.search_index.update(username, session_id, chat_history, entry["timestamp"])
+            self.messages.update(username, session_id, chat_history, entry["timestamp"], previous)
+            if previous is not None and "segment" in previous:
+                self.archive.forget(session_id)
+            return entry
+
+    def append_message(self, username: str, session_id: str, message: dict) -> int:
+        # Hold the lock across the read and the save so no concurrent append is lost.
+        with self._lock(username, session_id):
+            return super().append_message(username, session_id, message)
+
+    def set_feedback(self, username: str, session_id: str, index: int, value) -> None:
+        with self._lock(username, session_id):
+            super().set_feedback(username, session_id, index, value)
+
+    def save_session_tail(self, username: str, session_id: str, offset: int, messages: list) -> dict:
+        with self._lock(username, session_id):
+            return super().save_session_tail(username, session_id, offset, messages)
+
+    def load_session(self, session_id: str) -> dict:
+        entry = self.manifest.get(session_id)
+        if entry is None:
+            return self.archive.load(session_id)
+        return files.load_session(entry["filename"], self.log_dir)
+
+    def list_sessions(self, username: str = None, start: date = None, end: date = None) -> list:
+        return self.manifest.sessions(username, start, end)
+
+    def feedback_summary(self) -> tuple:
+        counts = self.counters.sessions()
+        zero = {"positive": 0, "negative": 0}
+        sessionwise = {}
+        entries = self.manifest.sessions() + self.archive.sessions()
+        for entry in sorted(entries, key=lambda e: e["timestamp"], reverse=True):
+            c = counts.get(entry["session_id"], zero)
+            sessionwise[entry["session_id"]] = {
+                "username": entry["username"],
+                "timestamp": entry["timestamp"],
+                "positive": c["positive"],
+                "negative": c["negative"],
+                "preview": entry["preview"],
+            }
+        return self.counters.overall(), sessionwise
+
+    def feedback_totals(self) -> dict:
+        return self.counters.overall()
+
+    def browse_sessions(self, username: str = None, start: date = None, end: date = None,
+                        negative_only: bool = False, sort: str = "date", offset: int = 0,
+                        limit: int = 20) -> tuple:
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() + "T~" if end else "~"
+        archived = [e for e in self.archive.sessions(username) if lo <= e["timestamp"] < hi]
+        entries = self.manifest.select(username, start, end) + archived
+        negatives = self.counters.negatives()
+        if negative_only:
+            entries = [e for e in entries if e["session_id"] in negatives]
+        # Ranking stops at the requested page for the single-direction orders.
+        wanted = offset + limit
+        if sort == "date":
+            ranked = heapq.nlargest(wanted, entries, key=lambda e: e["timestamp"])
+        elif sort == "negative":
+            ranked = heapq.nlargest(wanted, entries, key=lambda e: (negatives.get(e["session_id"], 0), e["timestamp"]))
+        elif sort == "user":
+            # Username ascending, newest first within a user: two stable sorts.
+            ranked = sorted(entries, key=lambda e: e["timestamp"], reverse=True)
+            ranked.sort(key=lambda e: e["username"])
+        else:
+            raise ValueError(f"Unknown session sort: {sort!r}")
+        rows = []
+        for entry in ranked[offset:wanted]:
+            counts = self.counters.get(entry["session_id"])
+            rows.append({
+                "username": entry["username"],
+                "session_id": entry["session_id"],
+                "timestamp": entry["timestamp"],
+                "preview": entry["preview"],
+                "messages": entry["messages"],
+                "positive": counts["positive"],
+                "negative": counts["negative"],
+            })
+        return rows, len(entries)
+
+    def recount_feedback(self) -> tuple:
+        return self.counters.recount()
+
+    def rebuild_feedback_counters(self) -> None:
+        self.counters.rebuild()
+
+    def usage(self, start: date = None, end: date = None) -> tuple:
+        return self.rollups.query(start, end)
+
+    def rebuild_rollups(self) -> None:
+        self.rollups.rebuild()
+
+    def search(self, query: str, username: str = None, start: date = None, end: date = None,
+               feedback=None, limit: int = 50) -> list:
+        hits = self.search_index.search(query, username, start, end, feedback, limit)
+        # Only the sessions with hits are opened, to fill in the message text.
+        sessions = {}
+        for hit in hits:
+            if hit["session_id"] not in sessions:
+                data = self.load_session(hit["session_id"])
+                sessions[hit["session_id"]] = data["chat_history"] if data else []
+            history = sessions[hit["session_id"]]
+            msg = history[hit["index"]] if hit["index"] < len(history) else {"role": "", "message": ""}
+            hit["role"] = msg["role"]
+            hit["message"] = msg["message"]
+        return hits
+
+    def rebuild_search_index(self) -> None:
+        self.search_index.rebuild()
+
+    def message_frame(self, start: date = None, end: date = None):
+        return self.messages.frame(start, end)
+
+    def rebuild_analytics(self) -> None:
+        self.messages.rebuild()
+
+    def archive_sessions(self, before: date) -> int:
+        return files.archive_sessions(self.log_dir, before)
+
+    def compact(self) -> None:
+        self.manifest.compact()
+        self.counters.compact()
+        self.rollups.compact()
+        self.search_index.compact()
+        self.messages.compact()
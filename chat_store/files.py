@@ -0,0 +1,434 @@
+"""
+Session files in the chat log directory.
+
+Every session is stored as one file, either a JSON document
+(``chat_{username}_{session_id}.json``) or, with ``CHAT_LOG_FORMAT=jsonl``, an
+append-only record log (``chat_{username}_{session_id}.jsonl``, see
+``session_log``). With the default ``CHAT_LOG_LAYOUT=sharded`` new sessions
+are filed under the day they were created and their user,
+``YYYY/MM/DD/<username>/``, so no directory grows without bound and scans for
+one user or a range of days only open the matching shards. ``flat`` keeps
+every file directly in the log directory. Readers accept both formats and
+both layouts; ``migrate_layout()`` moves existing files between layouts.
+Usernames and session ids are encoded with ``safe_name()`` wherever they
+become part of a path, and saves refuse paths that leave the log directory.
+
+Saving a session also updates the session manifest (whose ``filename`` is the
+path relative to the log directory) so that listings never need to open the
+files themselves. JSON sessions are replaced atomically, so readers never see
+a partial file, and operations that move or rewrite a session file hold its
+session lock (see ``locks``). Aged sessions can be moved to the compressed cold archive
+with ``archive_sessions()``.
+"""
+
+import json
+import os
+import re
+from datetime import date, datetime
+
+from .archive import get_archive
+from .journal import atomic_write
+from .locks import session_lock
+from .manifest import get_manifest
+from .session_log import SessionLogWriter, compact_log, load_log, read_records
+
+CHAT_LOG_DIR = os.environ.get("CHAT_LOG_DIR", "chat_logs")
+CHAT_LOG_FORMAT = os.environ.get("CHAT_LOG_FORMAT", "json")
+CHAT_LOG_LAYOUT = os.environ.get("CHAT_LOG_LAYOUT", "sharded")
+
+SESSION_EXTENSIONS = {"json": ".json", "jsonl": ".jsonl"}
+
+_log_writer = SessionLogWriter()
+
+# Characters a username or session id keeps in a file or directory name; the rest are %-encoded
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def safe_name(value: str) -> str:
+    """
+    Encode a username or session id for use as a file or directory name.
+
+    Characters other than letters, digits, ".", "_" and "-" are replaced by
+    ``%XX`` escapes of their UTF-8 bytes, as is a leading ".", so the result
+    never contains a path separator and is never "." or "..". Names made of
+    safe characters are unchanged.
+
+    Args:
+        value (str): Username or session id
+
+    Returns:
+        str: Name safe to use as a single path component
+    """
+    encoded = _UNSAFE_NAME_CHARS.sub(lambda m: "".join(f"%{b:02X}" for b in m.group().encode("utf-8")), value)
+    return "%2E" + encoded[1:] if encoded.startswith(".") else encoded
+
+
+def session_key(username: str, session_id: str) -> str:
+    """
+    Get the key of a session: its file name without directories or extension.
+
+    Args:
+        username (str): User who owns the session
+        session_id (str): Unique session identifier
+
+    Returns:
+        str: ``chat_{username}_{session_id}`` with both parts encoded by ``safe_name()``
+    """
+    return f"chat_{safe_name(username)}_{safe_name(session_id)}"
+
+
+def resolve_path(log_dir: str, filename: str) -> str:
+    """
+    Join a session file name to the log directory, refusing paths that leave it.
+
+    Args:
+        log_dir (str): Chat log directory
+        filename (str): Path relative to the log directory
+
+    Returns:
+        str: The joined path
+
+    Raises:
+        ValueError: If the path resolves outside ``log_dir``
+    """
+    filepath = os.path.join(log_dir, filename)
+    root = os.path.realpath(log_dir)
+    if os.path.commonpath([root, os.path.realpath(filepath)]) != root:
+        raise ValueError(f"Session file {filename!r} is outside the chat log directory")
+    return filepath
+
+
+def session_filename(username: str, session_id: str, fmt: str = CHAT_LOG_FORMAT,
+                     layout: str = CHAT_LOG_LAYOUT, day: date = None) -> str:
+    """
+    Build the path used for a new chat session.
+
+    The username and session id are encoded with ``safe_name()``, the same
+    way in the shard directory and in the file name.
+
+    Args:
+        username (str): User who owns the session
+        session_id (str): Unique session identifier
+        fmt (str): Storage format, "json" or "jsonl"
+        layout (str): Directory layout, "sharded" or "flat"
+        day (date): Day the session was created, for the sharded layout
+            (default: today)
+
+    Returns:
+        str: Path relative to the log directory, with "/" separators
+    """
+    name = session_key(username, session_id) + SESSION_EXTENSIONS[fmt]
+    if layout == "flat":
+        return name
+    day = day or date.today()
+    return f"{day:%Y/%m/%d}/{safe_name(username)}/{name}"
+
+
+def first_user_message(chat_history: list) -> str:
+    """
+    Get the first user message of a conversation, used as its preview.
+
+    Args:
+        chat_history (list): Messages of the session
+
+    Returns:
+        str: The first user message, or "No message"
+    """
+    return next((msg["message"] for msg in chat_history if msg["role"] == "user"), "No message")
+
+
+def session_entry(data: dict, filename: str) -> dict:
+    """
+    Build the manifest entry describing a session.
+
+    Args:
+        data (dict): Parsed session data
+        filename (str): Session file name relative to the log directory
+
+    Returns:
+        dict: Manifest entry for the session
+    """
+    return {
+        "username": data["username"],
+        "session_id": data["session_id"],
+        "timestamp": data.get("timestamp", ""),
+        "preview": first_user_message(data["chat_history"]),
+        "messages": len(data["chat_history"]),
+        "filename": filename,
+    }
+
+
+def _scan(path: str):
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda e: e.name)
+    except FileNotFoundError:
+        return []
+
+
+def _is_session_file(name: str) -> bool:
+    return name.startswith("chat_") and name.endswith((".json", ".jsonl"))
+
+
+def _session_key(filename: str) -> str:
+    # The session lock key: the file name without directories or extension.
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def iter_session_files(log_dir: str = CHAT_LOG_DIR, username: str = None, start: date = None, end: date = None):
+    """
+    Iterate over session files in the log directory, in either layout.
+
+    In the sharded layout only the shards matching the filters are listed.
+    Shard days are creation days; flat files carry no date and are always
+    included, as are flat files whose name merely starts with the user's prefix.
+
+    Args:
+        log_dir (str): Chat log directory
+        username (str): Only include sessions of this user
+        start (date): Only include shards of sessions created on or after this day
+        end (date): Only include shards of sessions created on or before this day
+
+    Yields:
+        str: Session file paths relative to the log directory, with "/" separators
+    """
+    lo = start.strftime("%Y/%m/%d") if start else ""
+    hi = end.strftime("%Y/%m/%d") if end else "9999/99/99"
+    user_dir_name = safe_name(username) if username is not None else None
+    for entry in _scan(log_dir):
+        if entry.is_file():
+            if _is_session_file(entry.name) and (username is None or entry.name.startswith(f"chat_{user_dir_name}_")):
+                yield entry.name
+            continue
+        if not (entry.name.isdigit() and len(entry.name) == 4 and lo[:4] <= entry.name <= hi[:4]):
+            continue
+        for month in _scan(entry.path):
+            prefix = f"{entry.name}/{month.name}"
+            if not (month.is_dir() and lo[:7] <= prefix <= hi[:7]):
+                continue
+            for day in _scan(month.path):
+                prefix = f"{entry.name}/{month.name}/{day.name}"
+                if not (day.is_dir() and lo <= prefix <= hi):
+                    continue
+                users = [os.path.join(day.path, user_dir_name)] if username is not None else [u.path for u in _scan(day.path)]
+                for user_dir in users:
+                    for item in _scan(user_dir):
+                        if _is_session_file(item.name):
+                            yield f"{prefix}/{os.path.basename(user_dir)}/{item.name}"
+
+
+def prune_empty_dirs(log_dir: str, filename: str) -> None:
+    """
+    Remove the shard directories of a file that has been moved away, if now empty.
+
+    Args:
+        log_dir (str): Chat log directory
+        filename (str): Former path of the file relative to the log directory
+    """
+    parent = os.path.dirname(filename)
+    while parent:
+        try:
+            os.rmdir(os.path.join(log_dir, parent))
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+
+def load_session(filename: str, log_dir: str = CHAT_LOG_DIR) -> dict:
+    """
+    Load a session file in either storage format.
+
+    Args:
+        filename (str): Session file name relative to the log directory
+        log_dir (str): Chat log directory
+
+    Returns:
+        dict: Session data, or None if the file no longer exists or cannot be parsed
+    """
+    filepath = os.path.join(log_dir, filename)
+    try:
+        if filename.endswith(".jsonl"):
+            return load_log(filepath)
+        with open(filepath, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        # Files are replaced atomically, so a parse error means a file left
+        # truncated by an older writer or an external tool; skip it.
+        return None
+
+
+def save_session(username: str, session_id: str, chat_history: list, log_dir: str = CHAT_LOG_DIR, fmt: str = CHAT_LOG_FORMAT) -> dict:
+    """
+    Write a session file and record it in the manifest.
+
+    In "json" format the whole session is rewritten. In "jsonl" format only
+    the messages and feedback changes not yet on disk are appended. A session
+    previously stored in the other format is converted. Existing sessions keep
+    their directory; new ones are placed according to ``CHAT_LOG_LAYOUT``.
+
+    Args:
+        username (str): User who owns the session
+        session_id (str): Unique session identifier
+        chat_history (list): Messages of the session
+        log_dir (str): Chat log directory
+        fmt (str): Storage format, "json" or "jsonl"
+
+    Returns:
+        dict: Manifest entry of the saved session
+    """
+    manifest = get_manifest(log_dir)
+    existing = manifest.get(session_id)
+    if existing is not None:
+        base = os.path.splitext(existing["filename"])[0]
+    else:
+        base = os.path.splitext(session_filename(username, session_id, fmt))[0]
+    filename = base + SESSION_EXTENSIONS[fmt]
+    filepath = resolve_path(log_dir, filename)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    data = {
+        "username": username,
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat(),
+        "chat_history": chat_history,
+    }
+    if fmt == "jsonl":
+        _log_writer.save(filepath, username, session_id, chat_history)
+    else:
+        # Write to a temporary file and rename it so readers never see a partial session.
+        atomic_write(filepath, json.dumps(data, indent=4))
+    for other in SESSION_EXTENSIONS:
+        if other != fmt:
+            stale = os.path.join(log_dir, base + SESSION_EXTENSIONS[other])
+            if os.path.exists(stale):
+                os.remove(stale)
+                _log_writer.forget(stale)
+    entry = session_entry(data, filename)
+    manifest.upsert(entry)
+    return entry
+
+
+def compact_session_logs(log_dir: str = CHAT_LOG_DIR) -> int:
+    """
+    Compact every append-only session log in the log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        int: Number of logs compacted
+    """
+    count = 0
+    for filename in iter_session_files(log_dir):
+        if filename.endswith(".jsonl"):
+            filepath = os.path.join(log_dir, filename)
+            with session_lock(log_dir, _session_key(filename)):
+                compact_log(filepath)
+                _log_writer.forget(filepath)
+            count += 1
+    return count
+
+
+def archive_sessions(log_dir: str, before: date) -> int:
+    """
+    Move sessions last saved before a day from the log directory into the archive.
+
+    Args:
+        log_dir (str): Chat log directory
+        before (date): Sessions last saved before this day are archived
+
+    Returns:
+        int: Number of sessions archived
+    """
+    manifest = get_manifest(log_dir)
+    archive = get_archive(log_dir)
+    cutoff = before.isoformat()
+    archived = []
+    for entry in manifest.sessions():
+        if entry["timestamp"] >= cutoff:
+            continue
+        filepath = os.path.join(log_dir, entry["filename"])
+        with session_lock(log_dir, _session_key(entry["filename"])):
+            # Another replica may have saved the session since the listing.
+            current = manifest.get(entry["session_id"])
+            if current is None or current["timestamp"] >= cutoff:
+                continue
+            try:
+                with open(filepath, "r") as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                continue
+            archive.add(current, payload)
+            os.remove(filepath)
+            _log_writer.forget(filepath)
+            manifest.remove([entry["session_id"]])
+        prune_empty_dirs(log_dir, entry["filename"])
+        archived.append(entry["session_id"])
+    return len(archived)
+
+
+def session_created(filename: str, log_dir: str = CHAT_LOG_DIR) -> date:
+    """
+    Get the day a session was created, for filing it into a shard.
+
+    Append-only logs carry their creation time in the header record; JSON
+    files only know when they were last saved.
+
+    Args:
+        filename (str): Session file path relative to the log directory
+        log_dir (str): Chat log directory
+
+    Returns:
+        date: Creation day, or None if the file cannot be read
+    """
+    filepath = os.path.join(log_dir, filename)
+    if filename.endswith(".jsonl"):
+        records = read_records(filepath)
+        timestamp = records[0].get("timestamp") if records else None
+    else:
+        data = load_session(filename, log_dir)
+        timestamp = data.get("timestamp") if data else None
+    return datetime.fromisoformat(timestamp).date() if timestamp else None
+
+
+def migrate_layout(log_dir: str = CHAT_LOG_DIR, layout: str = CHAT_LOG_LAYOUT) -> int:
+    """
+    Move every session file into the given directory layout and rebuild the manifest.
+
+    Files are moved with an atomic rename and renamed to their
+    ``session_key()``, so files written before usernames were encoded get
+    the same names as new ones. Running the migration again only moves files
+    that are not yet in place.
+
+    Args:
+        log_dir (str): Chat log directory
+        layout (str): Target layout, "sharded" or "flat"
+
+    Returns:
+        int: Number of files moved
+    """
+    moved = 0
+    for filename in list(iter_session_files(log_dir)):
+        data = load_session(filename, log_dir)
+        if not data:
+            continue
+        key = session_key(data["username"], data["session_id"])
+        name = key + os.path.splitext(filename)[1]
+        if layout == "flat":
+            target = name
+        else:
+            created = session_created(filename, log_dir)
+            if created is None:
+                continue
+            target = f"{created:%Y/%m/%d}/{safe_name(data['username'])}/{name}"
+        if target == filename:
+            continue
+        source_path = os.path.join(log_dir, filename)
+        target_path = resolve_path(log_dir, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with session_lock(log_dir, key):
+            os.replace(source_path, target_path)
+            _log_writer.forget(source_path)
+        prune_empty_dirs(log_dir, filename)
+        moved += 1
+    get_manifest(log_dir).rebuild()
+    return moved
@@ -0,0 +1,135 @@
+"""
+Append-only JSON Lines journal used by the derived chat log indexes.
+
+A journal is a ``.jsonl`` file that writers only ever append to. Readers keep
+their byte offset and pick up new records on the next call to ``read_new()``,
+so refreshing an in-memory index costs proportional to what changed rather
+than to the size of the log directory. Compaction replaces the file
+atomically; readers notice the new inode and start over from the top.
+
+Writers that derive a record from the journal's current state hold
+``lock()``, which also excludes other processes sharing the log directory,
+around their refresh and append (or rewrite).
+"""
+
+import json
+import os
+import threading
+
+from .locks import get_lock
+
+
+def atomic_write(path: str, text: str) -> None:
+    """
+    Replace a file's contents atomically.
+
+    The text is written and synced to a temporary file next to the target,
+    unique to this process and thread, which is then renamed over it, so
+    readers see either the old or the new contents, never a partial file.
+
+    Args:
+        path (str): File to write
+        text (str): New contents
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Journal:
+    """
+    Tail-able, append-only JSON Lines file.
+
+    Args:
+        path (str): Location of the ``.jsonl`` file. Parent directories are
+            created on first write.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._offset = 0
+        self._inode = None
+
+    def lock(self):
+        """
+        Get the lock serializing writers of this journal across threads and processes.
+
+        Returns:
+            FileLock: Re-entrant lock; use as a context manager
+        """
+        return get_lock(self.path + ".lock")
+
+    def append(self, records: list) -> None:
+        """
+        Append records to the journal, one JSON document per line.
+
+        Args:
+            records (list): JSON-serializable dictionaries to append
+        """
+        if not records:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        with self.lock(), open(self.path, "a", encoding="utf-8") as f:
+            f.write(payload)
+
+    def read_new(self) -> tuple:
+        """
+        Read records appended since the previous call.
+
+        Returns:
+            tuple: (records, reset)
+                - records: Newly appended records, in file order
+                - reset: True when the file was replaced or truncated and the
+                  records are the full journal rather than a tail
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            reset = self._inode is not None
+            self._offset, self._inode = 0, None
+            return [], reset
+
+        reset = False
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            reset = self._inode is not None
+            self._offset, self._inode = 0, st.st_ino
+        if st.st_size == self._offset:
+            return [], reset
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        # A concurrent writer may be mid-line; leave the partial tail for later.
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        records = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records, reset
+
+    def rewrite(self, records: list) -> None:
+        """
+        Atomically replace the journal with the given records.
+
+        Args:
+            records (list): Complete set of records the journal should hold
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock():
+            atomic_write(self.path, "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+            st = os.stat(self.path)
+            self._offset, self._inode = st.st_size, st.st_ino
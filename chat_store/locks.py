@@ -0,0 +1,121 @@
+"""
+Cross-process locks for the file-backed store.
+
+Several app replicas may share one log directory. Writes that read state
+before appending (a session file, the feedback and rollup deltas derived from
+it, journal compaction) are serialized with ``flock`` on small lock files in
+``<log_dir>/.index/locks``:
+
+- one lock per journal (``<journal>.lock``), held while appending or rewriting
+- striped per-session locks, held for a whole session save, so concurrent
+  saves of one session from different processes are applied one at a time
+
+Locks are re-entrant within a thread. Where ``fcntl`` is unavailable
+(Windows) or ``CHAT_FILE_LOCKS=0``, they only serialize threads of the current
+process.
+"""
+
+import os
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+CHAT_FILE_LOCKS = os.environ.get("CHAT_FILE_LOCKS", "1") != "0"
+
+LOCK_DIR_NAME = "locks"
+
+# Session locks are striped over this many lock files to bound their number.
+SESSION_LOCK_STRIPES = 64
+
+
+class FileLock:
+    """
+    Exclusive lock shared by threads and processes through a lock file.
+
+    Args:
+        path (str): Lock file to ``flock``; created on first use
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        """Block until this thread holds the lock."""
+        self._lock.acquire()
+        if self._depth == 0 and CHAT_FILE_LOCKS and fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self) -> None:
+        """Release one level of the lock."""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def get_lock(path: str) -> FileLock:
+    """
+    Get the process-wide lock for a lock file.
+
+    Args:
+        path (str): Lock file path
+
+    Returns:
+        FileLock: Shared lock instance
+    """
+    key = os.path.abspath(path)
+    with _locks_lock:
+        if key not in _locks:
+            _locks[key] = FileLock(path)
+        return _locks[key]
+
+
+def session_lock(log_dir: str, key: str) -> FileLock:
+    """
+    Get the lock guarding one session's file and derived index updates.
+
+    Args:
+        log_dir (str): Chat log directory
+        key (str): Session key, the session file name without its extension
+            (see ``files.session_key()``)
+
+    Returns:
+        FileLock: Lock for the session's stripe
+    """
+    # Imported here to avoid a cycle: the manifest's journal uses these locks.
+    from .manifest import INDEX_DIR_NAME
+
+    stripe = zlib.crc32(key.encode("utf-8")) % SESSION_LOCK_STRIPES
+    return get_lock(os.path.join(log_dir, INDEX_DIR_NAME, LOCK_DIR_NAME, f"session-{stripe:02d}.lock"))
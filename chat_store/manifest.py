@@ -0,0 +1,232 @@
+"""
+Session manifest: an on-disk index of chat session metadata.
+
+The manifest answers "which sessions exist for this user / on these days" from
+a single journal file instead of opening every session file in the log
+directory. Each save appends the session's latest metadata; the in-memory view
+keeps the newest entry per session plus lookups by username and by date.
+Sessions moved to the cold archive are dropped with a ``{"session_id": ...,
+"removed": true}`` record.
+"""
+
+import os
+import threading
+from datetime import date
+
+from .journal import Journal
+
+INDEX_DIR_NAME = ".index"
+MANIFEST_FILENAME = "manifest.jsonl"
+
+# Compact once the journal holds this many superseded lines beyond the live entries.
+COMPACT_SLACK = 1000
+
+
+class SessionManifest:
+    """
+    Incrementally maintained index of session metadata.
+
+    Entries are dictionaries with the keys ``username``, ``session_id``,
+    ``timestamp``, ``preview``, ``messages`` and ``filename``.
+
+    Args:
+        log_dir (str): Chat log directory the manifest describes
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.journal = Journal(os.path.join(log_dir, INDEX_DIR_NAME, MANIFEST_FILENAME))
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._by_user = {}
+        self._by_date = {}
+        self._lines = 0
+        self._loaded = False
+
+    # --- In-memory index maintenance ---
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_date.clear()
+        self._lines = 0
+
+    def _apply(self, entry: dict) -> None:
+        session_id = entry["session_id"]
+        old = self._entries.pop(session_id, None)
+        if old is not None:
+            self._by_user.get(old["username"], set()).discard(session_id)
+            self._by_date.get(old["timestamp"][:10], set()).discard(session_id)
+        self._lines += 1
+        if entry.get("removed"):
+            return
+        self._entries[session_id] = entry
+        self._by_user.setdefault(entry["username"], set()).add(session_id)
+        self._by_date.setdefault(entry["timestamp"][:10], set()).add(session_id)
+
+    def refresh(self) -> None:
+        """
+        Pick up entries appended since the last refresh, by this or any other process.
+
+        The manifest is rebuilt from the log directory the first time it is
+        used if no journal exists yet.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if not os.path.exists(self.journal.path):
+                    self.rebuild()
+                    return
+            records, reset = self.journal.read_new()
+            if reset:
+                self._clear()
+            for entry in records:
+                self._apply(entry)
+
+    # --- Writes ---
+    def upsert(self, entry: dict) -> None:
+        """
+        Record the latest metadata for a session.
+
+        Args:
+            entry (dict): Manifest entry for the session
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            self.journal.append([entry])
+            self.refresh()
+            if self._lines > len(self._entries) + COMPACT_SLACK:
+                self.compact()
+
+    def remove(self, session_ids: list) -> None:
+        """
+        Drop sessions from the manifest.
+
+        Args:
+            session_ids (list): Sessions to drop; unknown ids are ignored
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            records = [{"session_id": sid, "removed": True} for sid in session_ids if sid in self._entries]
+            self.journal.append(records)
+            self.refresh()
+
+    def compact(self) -> bool:
+        """
+        Rewrite the journal so it holds exactly one line per session.
+
+        Returns:
+            bool: True if the journal had superseded lines and was rewritten
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            if self._lines <= len(self._entries):
+                return False
+            entries = sorted(self._entries.values(), key=lambda e: e["timestamp"])
+            self.journal.rewrite(entries)
+            self._lines = len(entries)
+            return True
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the manifest by reading every session file in the log directory.
+
+        Returns:
+            int: Number of sessions indexed
+        """
+        # Imported here to avoid a cycle: files.py updates the manifest on save.
+        from .files import iter_session_files, load_session, session_entry
+
+        with self._lock, self.journal.lock():
+            self._loaded = True
+            self._clear()
+            for filename in iter_session_files(self.log_dir):
+                data = load_session(filename, self.log_dir)
+                if data and data.get("chat_history"):
+                    self._apply(session_entry(data, filename))
+            entries = sorted(self._entries.values(), key=lambda e: e["timestamp"])
+            self.journal.rewrite(entries)
+            self._lines = len(entries)
+            return len(entries)
+
+    # --- Lookups ---
+    def get(self, session_id: str) -> dict:
+        """
+        Get the manifest entry for a session.
+
+        Args:
+            session_id (str): Session identifier
+
+        Returns:
+            dict: The entry, or None if the session is unknown
+        """
+        with self._lock:
+            self.refresh()
+            return self._entries.get(session_id)
+
+    def sessions(self, username: str = None, start: date = None, end: date = None) -> list:
+        """
+        List sessions, newest first, optionally filtered by user and date range.
+
+        Args:
+            username (str): Only include sessions for this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+
+        Returns:
+            list: Manifest entries matching the filters
+        """
+        return sorted(self.select(username, start, end), key=lambda e: e["timestamp"], reverse=True)
+
+    def select(self, username: str = None, start: date = None, end: date = None) -> list:
+        """
+        Look up the sessions matching a user and date range, in no particular order.
+
+        Uses the by-user and by-date lookups instead of testing every entry.
+
+        Args:
+            username (str): Only include sessions for this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+
+        Returns:
+            list: Manifest entries matching the filters
+        """
+        with self._lock:
+            self.refresh()
+            if username is not None:
+                ids = set(self._by_user.get(username, ()))
+            else:
+                ids = None
+            if start is not None or end is not None:
+                lo = start.isoformat() if start else ""
+                hi = end.isoformat() if end else "9999-12-31"
+                in_range = set()
+                for day, day_ids in self._by_date.items():
+                    if lo <= day <= hi:
+                        in_range |= day_ids
+                ids = in_range if ids is None else ids & in_range
+            if ids is None:
+                return list(self._entries.values())
+            return [self._entries[i] for i in ids]
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(log_dir: str) -> SessionManifest:
+    """
+    Get the process-wide manifest for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        SessionManifest: Shared manifest instance
+    """
+    key = os.path.abspath(log_dir)
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = SessionManifest(log_dir)
+        return _manifests[key]
+
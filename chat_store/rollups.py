@@ -0,0 +1,238 @@
+"""
+Pre-aggregated usage rollups keyed by day and user.
+
+Every write to the file-backed store appends a delta record
+(``{"day": "YYYY-MM-DD", "username": ..., "sessions": 1, "messages": 2, ...}``)
+to a journal next to the manifest. The in-memory view holds one counter row
+per (day, user), so dashboard queries over any date range cost proportional
+to the number of days and active users in the range, not to the size of the
+chat logs. A background compactor folds the journal down to one line per row.
+"""
+
+import os
+import threading
+from datetime import date, datetime
+
+from .archive import get_archive
+from .counters import count_feedback
+from .journal import Journal
+from .manifest import INDEX_DIR_NAME
+
+ROLLUPS_FILENAME = "rollups.jsonl"
+ROLLUP_FIELDS = ("sessions", "messages", "positive", "negative")
+
+
+def empty_rollup() -> dict:
+    """Return a rollup row with every counter at zero."""
+    return {field: 0 for field in ROLLUP_FIELDS}
+
+
+def sum_rollups(rows: dict, start: date = None, end: date = None) -> tuple:
+    """
+    Total rollup rows over a date range.
+
+    Args:
+        rows (dict): Rollup rows as {day: {username: counters}}
+        start (date): First day to include (inclusive)
+        end (date): Last day to include (inclusive)
+
+    Returns:
+        tuple: (by_day, by_user)
+            - by_day: Counters per ISO day
+            - by_user: Counters per username
+    """
+    lo = start.isoformat() if start else ""
+    hi = end.isoformat() if end else "9999-12-31"
+    by_day, by_user = {}, {}
+    for day, users in rows.items():
+        if not lo <= day <= hi:
+            continue
+        day_total = by_day.setdefault(day, empty_rollup())
+        for username, counters in users.items():
+            user_total = by_user.setdefault(username, empty_rollup())
+            for field in ROLLUP_FIELDS:
+                day_total[field] += counters[field]
+                user_total[field] += counters[field]
+    return by_day, by_user
+
+
+class UsageRollups:
+    """
+    Day x user usage counters backed by a delta journal.
+
+    Args:
+        log_dir (str): Chat log directory the rollups describe
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.journal = Journal(os.path.join(log_dir, INDEX_DIR_NAME, ROLLUPS_FILENAME))
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._lines = 0
+        self._loaded = False
+
+    def _apply(self, record: dict) -> None:
+        row = self._rows.setdefault(record["day"], {}).setdefault(record["username"], empty_rollup())
+        for field in ROLLUP_FIELDS:
+            row[field] += record.get(field, 0)
+        self._lines += 1
+
+    def refresh(self) -> None:
+        """
+        Pick up deltas appended since the last refresh, by this or any other process.
+
+        The rollups are rebuilt from the session files the first time they are
+        used if no journal exists yet.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if not os.path.exists(self.journal.path):
+                    self.rebuild()
+                    return
+            records, reset = self.journal.read_new()
+            if reset:
+                self._rows.clear()
+                self._lines = 0
+            for record in records:
+                self._apply(record)
+
+    def record(self, username: str, day: str = None, **deltas) -> None:
+        """
+        Add deltas to a user's counters for a day.
+
+        Args:
+            username (str): User the activity belongs to
+            day (str): ISO day; defaults to today
+            **deltas: Changes to any of "sessions", "messages", "positive", "negative"
+        """
+        deltas = {field: value for field, value in deltas.items() if field in ROLLUP_FIELDS and value}
+        if not deltas:
+            return
+        record = {"day": day or datetime.now().date().isoformat(), "username": username, **deltas}
+        with self._lock, self.journal.lock():
+            self.refresh()
+            self.journal.append([record])
+            self.refresh()
+
+    def query(self, start: date = None, end: date = None) -> tuple:
+        """
+        Total usage over a date range.
+
+        Args:
+            start (date): First day to include (inclusive)
+            end (date): Last day to include (inclusive)
+
+        Returns:
+            tuple: (by_day, by_user), see ``sum_rollups()``
+        """
+        with self._lock:
+            self.refresh()
+            return sum_rollups(self._rows, start, end)
+
+    def compact(self) -> bool:
+        """
+        Rewrite the journal with one line per (day, user) if it has grown.
+
+        Returns:
+            bool: True if the journal was rewritten
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            live = sum(len(users) for users in self._rows.values())
+            if self._lines <= live:
+                return False
+            self._rewrite()
+            return True
+
+    def _rewrite(self) -> None:
+        records = [
+            {"day": day, "username": username, **counters}
+            for day, users in sorted(self._rows.items())
+            for username, counters in users.items()
+        ]
+        self.journal.rewrite(records)
+        self._lines = len(records)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the rollups from the session files and archived sessions.
+
+        Append-only (``.jsonl``) logs are attributed by record timestamps; JSON
+        files only carry their last-saved time, so all of their activity is
+        attributed to that day.
+
+        Returns:
+            int: Number of sessions scanned
+        """
+        from .files import iter_session_files, load_session
+        from .session_log import read_records
+
+        with self._lock, self.journal.lock():
+            self._loaded = True
+            self._rows.clear()
+            count = 0
+            for filename in iter_session_files(self.log_dir):
+                if filename.endswith(".jsonl"):
+                    self._rebuild_log(read_records(os.path.join(self.log_dir, filename)))
+                else:
+                    data = load_session(filename, self.log_dir)
+                    if not data or not data.get("chat_history"):
+                        continue
+                    self._rebuild_session(data)
+                count += 1
+            for data, records in get_archive(self.log_dir).iter_sessions():
+                if records is not None:
+                    self._rebuild_log(records)
+                elif data.get("chat_history"):
+                    self._rebuild_session(data)
+                count += 1
+            self._rewrite()
+            return count
+
+    def _rebuild_session(self, data: dict) -> None:
+        pos, neg = count_feedback(data["chat_history"])
+        self._apply({
+            "day": data["timestamp"][:10], "username": data["username"], "sessions": 1,
+            "messages": len(data["chat_history"]), "positive": pos, "negative": neg,
+        })
+
+    def _rebuild_log(self, records: list) -> None:
+        username, roles, ratings = None, {}, {}
+        for record in records:
+            kind = record.get("type")
+            if kind == "session":
+                username = record["username"]
+                self._apply({"day": record["timestamp"][:10], "username": username, "sessions": 1})
+            elif kind == "message" and username is not None:
+                roles[record["index"]] = record["role"]
+                self._apply({"day": record["timestamp"][:10], "username": username, "messages": 1})
+                if "feedback" in record:
+                    ratings[record["index"]] = (record["timestamp"][:10], record["feedback"])
+            elif kind == "feedback" and username is not None:
+                ratings[record["index"]] = (record["timestamp"][:10], record["value"])
+        for index, (day, value) in ratings.items():
+            if roles.get(index) == "assistant" and value in (0, 1):
+                self._apply({"day": day, "username": username, "positive": int(value == 1), "negative": int(value == 0)})
+
+
+_rollups = {}
+_rollups_lock = threading.Lock()
+
+
+def get_rollups(log_dir: str) -> UsageRollups:
+    """
+    Get the process-wide usage rollups for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        UsageRollups: Shared rollups instance
+    """
+    key = os.path.abspath(log_dir)
+    with _rollups_lock:
+        if key not in _rollups:
+            _rollups[key] = UsageRollups(log_dir)
+        return _rollups[key]
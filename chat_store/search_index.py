@@ -0,0 +1,362 @@
+"""
+Full-text search index for the file-backed store.
+
+An inverted index maps every term to the messages containing it, so a query
+intersects a few posting sets instead of reading session files. The index is
+kept in a journal next to the session manifest: each save appends one record
+with the terms of the messages added since the session was last indexed plus
+the session's current feedback, so saving a turn indexes only that turn.
+Compaction rewrites the journal with one record per session.
+
+A record looks like::
+
+    {"session_id": ..., "username": ..., "timestamp": ..., "start": 4,
+     "messages": 6, "terms": {"shipment": [4], "delayed": [4, 5]},
+     "feedback": {"5": 1}}
+
+``start`` is the first message index the record covers; a record with
+``start`` 0 replaces everything previously indexed for the session.
+"""
+
+import itertools
+import os
+import re
+import threading
+from datetime import date
+
+from .archive import get_archive
+from .journal import Journal
+from .manifest import INDEX_DIR_NAME
+
+# Renamed whenever tokenize() changes, so an index of other terms is rebuilt on first use.
+SEARCH_FILENAME = "search-v2.jsonl"
+
+# Compact once the journal holds this many lines beyond one per session.
+COMPACT_SLACK = 1000
+
+# Postings store (document, message) pairs as one integer: doc * MESSAGE_SLOTS + index.
+MESSAGE_SLOTS = 1 << 20
+
+# Runs of letters and digits, split at underscores like the SQLite FTS5 tokenizer.
+_TERM = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lowercase search terms: runs of letters and digits.
+
+    Single characters are kept, so a query for "shipment 3" only matches
+    messages that also mention 3.
+
+    Args:
+        text (str): Message or query text
+
+    Returns:
+        list: Terms in order of appearance (with repeats)
+    """
+    return _TERM.findall(text.lower())
+
+
+def message_terms(chat_history: list, start: int) -> dict:
+    """
+    Build the term -> message indices map for part of a conversation.
+
+    Args:
+        chat_history (list): Messages of the session
+        start (int): Index of the first message to include
+
+    Returns:
+        dict: Message indices containing each term
+    """
+    terms = {}
+    for index in range(start, len(chat_history)):
+        for term in set(tokenize(chat_history[index]["message"])):
+            terms.setdefault(term, []).append(index)
+    return terms
+
+
+def feedback_map(chat_history: list) -> dict:
+    """
+    Collect the feedback given on a conversation's assistant messages.
+
+    Args:
+        chat_history (list): Messages of the session
+
+    Returns:
+        dict: Feedback value keyed by message index (as a string, as in JSON)
+    """
+    return {
+        str(i): msg["feedback"]
+        for i, msg in enumerate(chat_history)
+        if msg.get("role") == "assistant" and msg.get("feedback") is not None
+    }
+
+
+class SearchIndex:
+    """
+    Incrementally maintained inverted index over session messages.
+
+    Args:
+        log_dir (str): Chat log directory the index describes
+    """
+
+    def __init__(self, log_dir: str) -> None:
+        self.log_dir = log_dir
+        self.journal = Journal(os.path.join(log_dir, INDEX_DIR_NAME, SEARCH_FILENAME))
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._docs = {}
+        self._doc_sessions = {}
+        self._next_doc = 0
+        self._lines = 0
+        self._loaded = False
+
+    # --- In-memory index maintenance ---
+    def _clear(self) -> None:
+        self._postings.clear()
+        self._docs.clear()
+        self._doc_sessions.clear()
+        self._next_doc = 0
+        self._lines = 0
+
+    def _drop(self, doc: dict) -> None:
+        base = doc["doc"] * MESSAGE_SLOTS
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.difference_update(range(base, base + doc["messages"]))
+            if not postings:
+                del self._postings[term]
+        del self._doc_sessions[doc["doc"]]
+
+    def _apply(self, record: dict) -> None:
+        session_id = record["session_id"]
+        doc = self._docs.get(session_id)
+        if doc is not None and record.get("start", 0) == 0:
+            self._drop(doc)
+            doc = None
+        if doc is None:
+            doc = {"doc": self._next_doc, "terms": set(), "messages": 0}
+            self._next_doc += 1
+            self._docs[session_id] = doc
+            self._doc_sessions[doc["doc"]] = session_id
+        base = doc["doc"] * MESSAGE_SLOTS
+        for term, indices in record.get("terms", {}).items():
+            self._postings.setdefault(term, set()).update(base + i for i in indices)
+            doc["terms"].add(term)
+        doc["username"] = record["username"]
+        doc["timestamp"] = record["timestamp"]
+        doc["messages"] = max(doc["messages"], record.get("messages", 0))
+        doc["feedback"] = {int(i): value for i, value in record.get("feedback", {}).items()}
+        self._lines += 1
+
+    def refresh(self) -> None:
+        """
+        Pick up records appended since the last refresh, by this or any other process.
+
+        The index is rebuilt from the session files the first time it is used
+        if no journal exists yet.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if not os.path.exists(self.journal.path):
+                    self.rebuild()
+                    return
+            records, reset = self.journal.read_new()
+            if reset:
+                self._clear()
+            for record in records:
+                self._apply(record)
+
+    # --- Writes ---
+    def update(self, username: str, session_id: str, chat_history: list, timestamp: str) -> None:
+        """
+        Index the messages of a session added since it was last indexed.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Session identifier
+            chat_history (list): Messages of the session
+            timestamp (str): ISO timestamp of the save
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            doc = self._docs.get(session_id)
+            indexed = doc["messages"] if doc else 0
+            # A shorter history than indexed means the session was replaced: reindex it.
+            start = indexed if indexed <= len(chat_history) else 0
+            record = {
+                "session_id": session_id,
+                "username": username,
+                "timestamp": timestamp,
+                "start": start,
+                "messages": len(chat_history),
+                "terms": message_terms(chat_history, start),
+                "feedback": feedback_map(chat_history),
+            }
+            self.journal.append([record])
+            self.refresh()
+            if self._lines > len(self._docs) + COMPACT_SLACK:
+                self._rewrite()
+
+    def compact(self) -> bool:
+        """
+        Rewrite the journal with one record per session if it has grown.
+
+        Returns:
+            bool: True if the journal was rewritten
+        """
+        with self._lock, self.journal.lock():
+            self.refresh()
+            if self._lines <= len(self._docs):
+                return False
+            self._rewrite()
+            return True
+
+    def _rewrite(self) -> None:
+        terms_by_doc = {}
+        for term, postings in self._postings.items():
+            for key in postings:
+                doc_terms = terms_by_doc.setdefault(key // MESSAGE_SLOTS, {})
+                doc_terms.setdefault(term, []).append(key % MESSAGE_SLOTS)
+        records = []
+        for session_id, doc in self._docs.items():
+            records.append({
+                "session_id": session_id,
+                "username": doc["username"],
+                "timestamp": doc["timestamp"],
+                "start": 0,
+                "messages": doc["messages"],
+                "terms": {term: sorted(indices) for term, indices in terms_by_doc.get(doc["doc"], {}).items()},
+                "feedback": {str(i): value for i, value in doc["feedback"].items()},
+            })
+        self._clear()
+        self.journal.rewrite(records)
+        for record in records:
+            self._apply(record)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the index by reading every session file and archived session.
+
+        Returns:
+            int: Number of sessions indexed
+        """
+        from .files import iter_session_files, load_session
+
+        with self._lock, self.journal.lock():
+            self._loaded = True
+            self._clear()
+            hot = (load_session(filename, self.log_dir) for filename in iter_session_files(self.log_dir))
+            archived = (data for data, _ in get_archive(self.log_dir).iter_sessions())
+            for data in itertools.chain(hot, archived):
+                if not data or not data.get("chat_history"):
+                    continue
+                history = data["chat_history"]
+                self._apply({
+                    "session_id": data["session_id"],
+                    "username": data["username"],
+                    "timestamp": data.get("timestamp", ""),
+                    "start": 0,
+                    "messages": len(history),
+                    "terms": message_terms(history, 0),
+                    "feedback": feedback_map(history),
+                })
+            self._rewrite()
+            return len(self._docs)
+
+    # --- Queries ---
+    def search(self, query: str, username: str = None, start: date = None, end: date = None,
+               feedback=None, limit: int = 50) -> list:
+        """
+        Find messages containing every term of a query.
+
+        Args:
+            query (str): Free-text query; an empty query matches every message
+                with the requested feedback (and nothing without a feedback filter)
+            username (str): Only include sessions of this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+            feedback: Only include messages with this feedback value (1 or 0)
+            limit (int): Maximum number of hits
+
+        Returns:
+            list: Hits as dictionaries with session_id, username, timestamp,
+                index and feedback, newest session first
+        """
+        terms = set(tokenize(query))
+        lo = start.isoformat() if start else ""
+        hi = end.isoformat() + "T~" if end else "~"
+        with self._lock:
+            self.refresh()
+            if terms:
+                postings = sorted((self._postings.get(term, set()) for term in terms), key=len)
+                keys = set(postings[0]).intersection(*postings[1:])
+            elif feedback is not None:
+                keys = {
+                    doc["doc"] * MESSAGE_SLOTS + index
+                    for doc in self._docs.values()
+                    for index, value in doc["feedback"].items()
+                    if value == feedback
+                }
+            else:
+                return []
+            hits = []
+            for key in keys:
+                session_id = self._doc_sessions[key // MESSAGE_SLOTS]
+                doc = self._docs[session_id]
+                index = key % MESSAGE_SLOTS
+                if username is not None and doc["username"] != username:
+                    continue
+                if not lo <= doc["timestamp"] < hi:
+                    continue
+                value = doc["feedback"].get(index)
+                if feedback is not None and value != feedback:
+                    continue
+                hits.append({
+                    "session_id": session_id,
+                    "username": doc["username"],
+                    "timestamp": doc["timestamp"],
+                    "index": index,
+                    "feedback": value,
+                })
+        hits.sort(key=lambda h: (h["timestamp"], -h["index"]), reverse=True)
+        return hits[:limit]
+
+    def stats(self) -> dict:
+        """
+        Get the size of the index.
+
+        Returns:
+            dict: Number of indexed sessions, distinct terms and postings
+        """
+        with self._lock:
+            self.refresh()
+            return {
+                "sessions": len(self._docs),
+                "terms": len(self._postings),
+                "postings": sum(len(p) for p in self._postings.values()),
+            }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(log_dir: str) -> SearchIndex:
+    """
+    Get the process-wide search index for a log directory.
+
+    Args:
+        log_dir (str): Chat log directory
+
+    Returns:
+        SearchIndex: Shared index instance
+    """
+    key = os.path.abspath(log_dir)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = SearchIndex(log_dir)
+        return _indexes[key]
@@ -0,0 +1,306 @@
+"""
+Append-only JSON Lines session logs.
+
+In this format a session file (``chat_{username}_{session_id}.jsonl``) is a
+sequence of records instead of one JSON document:
+
+- ``{"type": "session", ...}``: header with the username and session id
+- ``{"type": "message", "index": i, "role": ..., "message": ...}``: one chat
+  message, with its ``feedback`` and response ``latency_ms`` if known
+- ``{"type": "feedback", "index": i, "value": v}``: thumbs feedback on message ``i``
+
+Every record carries a ``timestamp``. Saving a turn appends only the new
+records, and the session is rebuilt by replaying the file. Compaction folds
+feedback events into their messages and rewrites the file atomically.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from .journal import atomic_write
+
+# Compact a log after this many appends if it holds feedback events to fold in.
+COMPACT_EVERY = 256
+
+
+def message_records(chat_history: list, start: int, timestamp: str) -> list:
+    """
+    Build message records for part of a conversation.
+
+    Args:
+        chat_history (list): Messages of the session
+        start (int): Index of the first message to include
+        timestamp (str): ISO timestamp stamped on records of messages without one
+
+    Returns:
+        list: One message record per message from ``start`` onwards
+    """
+    records = []
+    for index in range(start, len(chat_history)):
+        msg = chat_history[index]
+        record = {"type": "message", "index": index, "role": msg["role"], "message": msg["message"],
+                  "timestamp": msg.get("timestamp") or timestamp}
+        if msg.get("feedback") is not None:
+            record["feedback"] = msg["feedback"]
+        if msg.get("latency_ms") is not None:
+            record["latency_ms"] = msg["latency_ms"]
+        records.append(record)
+    return records
+
+
+def snapshot_records(username: str, session_id: str, chat_history: list, timestamp: str) -> list:
+    """
+    Build the compacted record list for a whole session.
+
+    Args:
+        username (str): User who owns the session
+        session_id (str): Unique session identifier
+        chat_history (list): Messages of the session
+        timestamp (str): ISO timestamp stamped on each record
+
+    Returns:
+        list: Header record followed by one record per message
+    """
+    header = {"type": "session", "username": username, "session_id": session_id, "timestamp": timestamp}
+    return [header] + message_records(chat_history, 0, timestamp)
+
+
+def append_records(filepath: str, records: list) -> None:
+    """
+    Append records to a session log.
+
+    Args:
+        filepath (str): Path of the ``.jsonl`` session file
+        records (list): Records to append
+    """
+    payload = "".join(json.dumps(r) + "\n" for r in records)
+    with open(filepath, "a") as f:
+        f.write(payload)
+
+
+def read_records(filepath: str) -> list:
+    """
+    Read all complete records of a session log.
+
+    A trailing line without a newline (a write in progress) is ignored.
+
+    Args:
+        filepath (str): Path of the ``.jsonl`` session file
+
+    Returns:
+        list: Records in file order
+    """
+    with open(filepath, "r") as f:
+        return parse_records(f.read())
+
+
+def parse_records(text: str) -> list:
+    """
+    Parse the complete records of session log text.
+
+    Args:
+        text (str): Contents of a ``.jsonl`` session file
+
+    Returns:
+        list: Records in file order; a trailing line without a newline and
+            lines that are not valid JSON are skipped
+    """
+    records = []
+    for line in text[: text.rfind("\n") + 1].splitlines():
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def replay(records: list) -> dict:
+    """
+    Rebuild session data from its records.
+
+    Args:
+        records (list): Records of a session log, in file order
+
+    Returns:
+        dict: Session data in the same shape as a JSON session file, or None
+            if the records hold no session header
+    """
+    data = None
+    history = []
+    for record in records:
+        kind = record.get("type")
+        if kind == "session":
+            data = {"username": record["username"], "session_id": record["session_id"], "timestamp": record["timestamp"]}
+        elif kind == "message":
+            msg = {"role": record["role"], "message": record["message"], "timestamp": record["timestamp"]}
+            if "feedback" in record:
+                msg["feedback"] = record["feedback"]
+            if "latency_ms" in record:
+                msg["latency_ms"] = record["latency_ms"]
+            index = record["index"]
+            if index < len(history):
+                history[index] = msg
+            else:
+                history.append(msg)
+        elif kind == "feedback" and record["index"] < len(history):
+            history[record["index"]]["feedback"] = record["value"]
+        if data is not None and "timestamp" in record:
+            data["timestamp"] = record["timestamp"]
+    if data is None:
+        return None
+    data["chat_history"] = history
+    return data
+
+
+def load_log(filepath: str) -> dict:
+    """
+    Load a session log by replaying it.
+
+    Args:
+        filepath (str): Path of the ``.jsonl`` session file
+
+    Returns:
+        dict: Session data, or None if the log has no header yet
+    """
+    return replay(read_records(filepath))
+
+
+def write_snapshot(filepath: str, records: list) -> None:
+    """
+    Atomically replace a session log with the given records.
+
+    Args:
+        filepath (str): Path of the ``.jsonl`` session file
+        records (list): Complete record list for the session
+    """
+    atomic_write(filepath, "".join(json.dumps(r) + "\n" for r in records))
+
+
+def compact_log(filepath: str) -> int:
+    """
+    Compact a session log: fold feedback events into their message records.
+
+    Message records keep their original timestamps; the header takes the
+    timestamp of the latest record.
+
+    Args:
+        filepath (str): Path of the ``.jsonl`` session file
+
+    Returns:
+        int: Number of records in the compacted log
+    """
+    header, messages = None, []
+    for record in read_records(filepath):
+        kind = record.get("type")
+        if kind == "session":
+            header = dict(record)
+        elif kind == "message":
+            if record["index"] < len(messages):
+                messages[record["index"]] = dict(record)
+            else:
+                messages.append(dict(record))
+        elif kind == "feedback" and record["index"] < len(messages):
+            messages[record["index"]]["feedback"] = record["value"]
+        if header is not None and "timestamp" in record:
+            header["timestamp"] = record["timestamp"]
+    if header is None:
+        return 0
+    records = [header] + messages
+    write_snapshot(filepath, records)
+    return len(records)
+
+
+def _file_stat(filepath: str) -> tuple:
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size
+
+
+class SessionLogWriter:
+    """
+    Appends the difference between a conversation and what is already on disk.
+
+    The writer remembers, per log file, how many messages were persisted and
+    their feedback values, so each save appends only new messages and
+    feedback changes. Unknown files, and files another process has written
+    to since (a different inode or size), are replayed to seed that state.
+    """
+
+    def __init__(self) -> None:
+        self._persisted = {}
+        self._lock = threading.Lock()
+
+    def _state(self, filepath: str) -> dict:
+        state = self._persisted.get(filepath)
+        if state is None or state["stat"] != _file_stat(filepath):
+            # Unknown, or written by another process since our last save: replay it.
+            data = load_log(filepath) if os.path.exists(filepath) else None
+            history = data["chat_history"] if data else []
+            state = {
+                "header": data is not None,
+                "feedback": [msg.get("feedback") for msg in history],
+                "records": len(read_records(filepath)) if data else 0,
+                "appended": 0,
+                "stat": _file_stat(filepath),
+            }
+            self._persisted[filepath] = state
+        return state
+
+    def save(self, filepath: str, username: str, session_id: str, chat_history: list) -> int:
+        """
+        Append the records needed to bring a session log up to date.
+
+        Args:
+            filepath (str): Path of the ``.jsonl`` session file
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            chat_history (list): Current messages of the session
+
+        Returns:
+            int: Number of records appended
+        """
+        with self._lock:
+            state = self._state(filepath)
+            timestamp = datetime.now().isoformat()
+            feedback = state["feedback"]
+            if not state["header"] or len(chat_history) < len(feedback):
+                # New log, or the conversation no longer matches what is on disk.
+                records = snapshot_records(username, session_id, chat_history, timestamp)
+                write_snapshot(filepath, records)
+                state.update(header=True, feedback=[m.get("feedback") for m in chat_history], records=len(records), appended=0)
+                state["stat"] = _file_stat(filepath)
+                return len(records)
+
+            records = []
+            for index, old in enumerate(feedback):
+                new = chat_history[index].get("feedback")
+                if new != old:
+                    records.append({"type": "feedback", "index": index, "value": new, "timestamp": timestamp})
+                    feedback[index] = new
+            records.extend(message_records(chat_history, len(feedback), timestamp))
+            feedback.extend(msg.get("feedback") for msg in chat_history[len(feedback):])
+            if not records:
+                return 0
+            append_records(filepath, records)
+            state["records"] += len(records)
+            state["appended"] += len(records)
+            if state["appended"] >= COMPACT_EVERY and state["records"] > len(feedback) + 1:
+                state["records"] = compact_log(filepath)
+                state["appended"] = 0
+            state["stat"] = _file_stat(filepath)
+            return len(records)
+
+    def forget(self, filepath: str) -> None:
+        """
+        Drop the remembered state for a log file.
+
+        Args:
+            filepath (str): Path of the ``.jsonl`` session file
+        """
+        with self._lock:
+            self._persisted.pop(filepath, None)
@@ -0,0 +1,629 @@
+"""
+SQLite-backed chat store.
+
+All sessions live in one database file opened in WAL mode, so readers never
+block the writer. Listings and aggregates are answered from indexes:
+
+- ``sessions(username, timestamp)`` for per-user listings
+- ``sessions(timestamp)`` for date-range listings
+- ``messages(session_id, idx)`` (primary key) for loading a session
+- a partial index on ``messages(session_id)`` covering rated messages only,
+  for recounting feedback
+
+Feedback counts are materialized in ``session_feedback`` (per session) and
+``feedback_totals`` (overall). Every write adjusts them by the change it makes,
+inside the same transaction, so the admin summary reads counters instead of
+aggregating messages. Usage rollups per (day, username) in ``usage_rollups``
+are maintained the same way for the Admin Dashboard. Message text is indexed
+in the ``messages_fts`` FTS5 table for full-text search; only messages added
+by a write are inserted into it. The dashboard's per-message analytics frame is
+read straight from ``messages``.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from .counters import count_feedback
+from .files import first_user_message
+from .rollups import ROLLUP_FIELDS, sum_rollups
+from .search_index import tokenize
+from .store import ChatStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    created TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    messages INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_ts ON sessions(username, timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_ts ON sessions(timestamp);
+
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    message TEXT NOT NULL,
+    feedback INTEGER,
+    timestamp TEXT NOT NULL,
+    latency_ms REAL,
+    PRIMARY KEY (session_id, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_messages_rated ON messages(session_id, feedback)
+    WHERE feedback IS NOT NULL AND role = 'assistant';
+
+CREATE TABLE IF NOT EXISTS session_feedback (
+    session_id TEXT PRIMARY KEY,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_session_feedback_negative ON session_feedback(negative, session_id)
+    WHERE negative > 0;
+
+CREATE TABLE IF NOT EXISTS feedback_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS usage_rollups (
+    day TEXT NOT NULL,
+    username TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, username)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    message, session_id UNINDEXED, idx UNINDEXED
+);
+"""
+
+REBUILD_ROLLUPS_SQL = """
+DELETE FROM usage_rollups;
+INSERT INTO usage_rollups (day, username, sessions)
+SELECT substr(created, 1, 10), username, COUNT(*) FROM sessions GROUP BY 1, 2;
+INSERT INTO usage_rollups (day, username, messages, positive, negative)
+SELECT substr(m.timestamp, 1, 10), s.username, COUNT(*),
+       SUM(m.role = 'assistant' AND m.feedback = 1), SUM(m.role = 'assistant' AND m.feedback = 0)
+FROM messages m JOIN sessions s ON s.session_id = m.session_id
+WHERE true
+GROUP BY 1, 2
+ON CONFLICT(day, username) DO UPDATE SET
+    messages = excluded.messages, positive = excluded.positive, negative = excluded.negative;
+"""
+
+RECOUNT_SQL = """
+SELECT session_id, SUM(feedback = 1) AS positive, SUM(feedback = 0) AS negative
+FROM messages
+WHERE feedback IS NOT NULL AND role = 'assistant'
+GROUP BY session_id
+"""
+
+
+class SqliteChatStore(ChatStore):
+    """
+    Chat store over a SQLite database.
+
+    Each thread gets its own connection; Streamlit runs every browser session
+    in its own script thread.
+
+    Args:
+        db_path (str): Path of the database file
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "latency_ms" not in columns:
+                # Database created before response latency was recorded.
+                conn.execute("ALTER TABLE messages ADD COLUMN latency_ms REAL")
+            # Duplicate of idx_sessions_user_ts, which SQLite also scans backwards.
+            conn.execute("DROP INDEX IF EXISTS idx_sessions_user_ts_desc")
+        if self._connect().execute("SELECT 1 FROM feedback_totals").fetchone() is None:
+            # New database, or one created before the counters existed.
+            self.rebuild_feedback_counters()
+            self.rebuild_rollups()
+        conn = self._connect()
+        indexed = conn.execute("SELECT 1 FROM messages_fts LIMIT 1").fetchone() is not None
+        if not indexed and conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone() is not None:
+            # Database created before full-text search existed.
+            self.rebuild_search_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Writes ---
+    @staticmethod
+    def _bump_feedback(conn: sqlite3.Connection, session_id: str, positive: int, negative: int) -> None:
+        if not positive and not negative:
+            return
+        conn.execute(
+            """
+            INSERT INTO session_feedback (session_id, positive, negative) VALUES (?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                positive = session_feedback.positive + excluded.positive,
+                negative = session_feedback.negative + excluded.negative
+            """,
+            (session_id, positive, negative),
+        )
+        conn.execute(
+            "UPDATE feedback_totals SET positive = positive + ?, negative = negative + ? WHERE id = 1",
+            (positive, negative),
+        )
+
+    @staticmethod
+    def _bump_usage(conn: sqlite3.Connection, day: str, username: str, **deltas) -> None:
+        values = [deltas.get(field, 0) for field in ROLLUP_FIELDS]
+        if not any(values):
+            return
+        conn.execute(
+            """
+            INSERT INTO usage_rollups (day, username, sessions, messages, positive, negative)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(day, username) DO UPDATE SET
+                sessions = usage_rollups.sessions + excluded.sessions,
+                messages = usage_rollups.messages + excluded.messages,
+                positive = usage_rollups.positive + excluded.positive,
+                negative = usage_rollups.negative + excluded.negative
+            """,
+            (day, username, *values),
+        )
+
+    def _write_session(self, conn: sqlite3.Connection, username: str, session_id: str, chat_history: list,
+                       timestamp: str, message_timestamps: list = None) -> None:
+        row = conn.execute(
+            "SELECT positive, negative FROM session_feedback WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        old_pos, old_neg = (row["positive"], row["negative"]) if row else (0, 0)
+        pos, neg = count_feedback(chat_history)
+        self._bump_feedback(conn, session_id, pos - old_pos, neg - old_neg)
+        row = conn.execute("SELECT messages FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        old_messages = row["messages"] if row else 0
+        self._bump_usage(
+            conn, timestamp[:10], username,
+            sessions=int(row is None),
+            messages=len(chat_history) - old_messages,
+            positive=pos - old_pos,
+            negative=neg - old_neg,
+        )
+        conn.execute(
+            """
+            INSERT INTO sessions (session_id, username, created, timestamp, preview, messages)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                timestamp = excluded.timestamp,
+                preview = excluded.preview,
+                messages = excluded.messages
+            """,
+            (session_id, username, message_timestamps[0] if message_timestamps else timestamp, timestamp,
+             first_user_message(chat_history), len(chat_history)),
+        )
+        rows = [
+            (session_id, i, msg["role"], msg["message"], msg.get("feedback"),
+             msg.get("timestamp") or (message_timestamps[i] if message_timestamps else timestamp),
+             msg.get("latency_ms"))
+            for i, msg in enumerate(chat_history)
+        ]
+        conn.executemany(
+            """
+            INSERT INTO messages (session_id, idx, role, message, feedback, timestamp, latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(session_id, idx) DO UPDATE SET feedback = excluded.feedback
+            WHERE messages.feedback IS NOT excluded.feedback
+            """,
+            rows,
+        )
+        conn.execute("DELETE FROM messages WHERE session_id = ? AND idx >= ?", (session_id, len(chat_history)))
+        if len(chat_history) < old_messages:
+            conn.execute("DELETE FROM messages_fts WHERE session_id = ? AND idx >= ?", (session_id, len(chat_history)))
+        conn.executemany(
+            "INSERT INTO messages_fts (message, session_id, idx) VALUES (?, ?, ?)",
+            [(chat_history[i]["message"], session_id, i) for i in range(old_messages, len(chat_history))],
+        )
+
+    def save_session(self, username: str, session_id: str, chat_history: list) -> dict:
+        timestamp = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            # Read the old counts in the write transaction so no concurrent change is lost.
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_session(conn, username, session_id, chat_history, timestamp)
+        return self._entry(conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone())
+
+    def append_message(self, username: str, session_id: str, message: dict) -> int:
+        timestamp = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            # Take the next index in the write transaction so concurrent appends do not collide.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT messages FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            index = row["messages"] if row else 0
+            preview = message["message"] if message["role"] == "user" else "No message"
+            conn.execute(
+                """
+                INSERT INTO sessions (session_id, username, created, timestamp, preview, messages)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    timestamp = excluded.timestamp,
+                    messages = sessions.messages + 1,
+                    preview = CASE WHEN sessions.preview = 'No message' THEN excluded.preview ELSE sessions.preview END
+                """,
+                (session_id, username, timestamp, timestamp, preview),
+            )
+            conn.execute(
+                """
+                INSERT INTO messages (session_id, idx, role, message, feedback, timestamp, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (session_id, index, message["role"], message["message"], message.get("feedback"),
+                 message.get("timestamp") or timestamp, message.get("latency_ms")),
+            )
+            conn.execute(
+                "INSERT INTO messages_fts (message, session_id, idx) VALUES (?, ?, ?)",
+                (message["message"], session_id, index),
+            )
+            pos = int(message["role"] == "assistant" and message.get("feedback") == 1)
+            neg = int(message["role"] == "assistant" and message.get("feedback") == 0)
+            self._bump_feedback(conn, session_id, pos, neg)
+            self._bump_usage(conn, timestamp[:10], username, sessions=int(row is None), messages=1,
+                             positive=pos, negative=neg)
+        return index
+
+    def set_feedback(self, username: str, session_id: str, index: int, value) -> None:
+        timestamp = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            # Read the old feedback in the write transaction so the counters stay exact.
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT role, feedback FROM messages WHERE session_id = ? AND idx = ?", (session_id, index)
+            ).fetchone()
+            if row is None:
+                return
+            conn.execute(
+                "UPDATE messages SET feedback = ? WHERE session_id = ? AND idx = ?",
+                (value, session_id, index),
+            )
+            if row["role"] == "assistant":
+                old = row["feedback"]
+                pos, neg = (value == 1) - (old == 1), (value == 0) - (old == 0)
+                self._bump_feedback(conn, session_id, pos, neg)
+                self._bump_usage(conn, timestamp[:10], username, positive=pos, negative=neg)
+            conn.execute("UPDATE sessions SET timestamp = ? WHERE session_id = ?", (timestamp, session_id))
+
+    def save_session_tail(self, username: str, session_id: str, offset: int, messages: list) -> dict:
+        if offset == 0:
+            return self.save_session(username, session_id, messages)
+        timestamp = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            # Read the stored prefix in the write transaction so no concurrent change is lost.
+            conn.execute("BEGIN IMMEDIATE")
+            stored = self._read_messages(conn, session_id, 0, offset)
+            if len(stored) < offset:
+                raise ValueError(f"Session {session_id} has {len(stored)} stored messages, cannot save from {offset}")
+            self._write_session(conn, username, session_id, stored + list(messages), timestamp)
+        return self._entry(conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone())
+
+    def import_session(self, data: dict, message_timestamps: list = None) -> None:
+        """
+        Insert or replace a session keeping its original timestamps.
+
+        Args:
+            data (dict): Session data in the JSON session file shape
+            message_timestamps (list): Optional per-message timestamps
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write_session(conn, data["username"], data["session_id"], data["chat_history"],
+                                data.get("timestamp") or datetime.now().isoformat(), message_timestamps)
+
+    # --- Reads ---
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> dict:
+        return {
+            "username": row["username"],
+            "session_id": row["session_id"],
+            "timestamp": row["timestamp"],
+            "preview": row["preview"],
+            "messages": row["messages"],
+        }
+
+    @staticmethod
+    def _read_messages(conn: sqlite3.Connection, session_id: str, start: int = 0, end: int = None) -> list:
+        chat_history = []
+        for msg in conn.execute(
+            """
+            SELECT role, message, feedback, timestamp, latency_ms FROM messages
+            WHERE session_id = ? AND idx >= ? AND idx < ? ORDER BY idx
+            """,
+            (session_id, start, end if end is not None else 2 ** 62),
+        ):
+            item = {"role": msg["role"], "message": msg["message"], "timestamp": msg["timestamp"]}
+            if msg["feedback"] is not None:
+                item["feedback"] = msg["feedback"]
+            if msg["latency_ms"] is not None:
+                item["latency_ms"] = msg["latency_ms"]
+            chat_history.append(item)
+        return chat_history
+
+    def load_session(self, session_id: str) -> dict:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "username": row["username"],
+            "session_id": row["session_id"],
+            "timestamp": row["timestamp"],
+            "chat_history": self._read_messages(conn, session_id),
+        }
+
+    def load_messages(self, session_id: str, start: int = 0, end: int = None) -> tuple:
+        conn = self._connect()
+        row = conn.execute("SELECT messages FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return [], 0
+        # Resolve the range like a list slice, then read only the rows in it.
+        start, end, _ = slice(start, end).indices(row["messages"])
+        return self._read_messages(conn, session_id, start, end), row["messages"]
+
+    def list_sessions(self, username: str = None, start: date = None, end: date = None) -> list:
+        clauses, params = [], []
+        if username is not None:
+            clauses.append("username = ?")
+            params.append(username)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            # Timestamps are ISO strings; anything on the end day sorts below "<end>T~".
+            clauses.append("timestamp < ?")
+            params.append(end.isoformat() + "T~")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(f"SELECT * FROM sessions {where} ORDER BY timestamp DESC", params)
+        return [self._entry(row) for row in rows]
+
+    def feedback_summary(self) -> tuple:
+        conn = self._connect()
+        totals = conn.execute("SELECT positive, negative FROM feedback_totals WHERE id = 1").fetchone()
+        overall = {"positive": totals["positive"], "negative": totals["negative"]}
+        sessionwise = {}
+        for row in conn.execute(
+            """
+            SELECT s.session_id, s.username, s.timestamp, s.preview,
+                   COALESCE(f.positive, 0) AS positive, COALESCE(f.negative, 0) AS negative
+            FROM sessions s
+            LEFT JOIN session_feedback f ON f.session_id = s.session_id
+            ORDER BY s.timestamp DESC
+            """
+        ):
+            sessionwise[row["session_id"]] = {
+                "username": row["username"],
+                "timestamp": row["timestamp"],
+                "positive": row["positive"],
+                "negative": row["negative"],
+                "preview": row["preview"],
+            }
+        return overall, sessionwise
+
+    def feedback_totals(self) -> dict:
+        totals = self._connect().execute("SELECT positive, negative FROM feedback_totals WHERE id = 1").fetchone()
+        return {"positive": totals["positive"], "negative": totals["negative"]}
+
+    def browse_sessions(self, username: str = None, start: date = None, end: date = None,
+                        negative_only: bool = False, sort: str = "date", offset: int = 0,
+                        limit: int = 20) -> tuple:
+        order = {
+            "date": "s.timestamp DESC",
+            "user": "s.username, s.timestamp DESC",
+            "negative": "negative DESC, s.timestamp DESC",
+        }.get(sort)
+        if order is None:
+            raise ValueError(f"Unknown session sort: {sort!r}")
+        clauses, params = [], []
+        if username is not None:
+            clauses.append("s.username = ?")
+            params.append(username)
+        if start is not None:
+            clauses.append("s.timestamp >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("s.timestamp < ?")
+            params.append(end.isoformat() + "T~")
+        if negative_only:
+            clauses.append("f.negative > 0")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        source = "FROM sessions s LEFT JOIN session_feedback f ON f.session_id = s.session_id"
+        conn = self._connect()
+        # The feedback join is only needed to count when filtering on it.
+        count_source = source if negative_only else "FROM sessions s"
+        total = conn.execute(f"SELECT COUNT(*) {count_source} {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"""
+            SELECT s.*, COALESCE(f.positive, 0) AS positive, COALESCE(f.negative, 0) AS negative
+            {source} {where}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit, offset],
+        )
+        return [dict(self._entry(row), positive=row["positive"], negative=row["negative"]) for row in rows], total
+
+    def recount_feedback(self) -> tuple:
+        overall = {"positive": 0, "negative": 0}
+        sessions = {}
+        for row in self._connect().execute(RECOUNT_SQL):
+            overall["positive"] += row["positive"]
+            overall["negative"] += row["negative"]
+            sessions[row["session_id"]] = {"positive": row["positive"], "negative": row["negative"]}
+        return overall, sessions
+
+    def rebuild_feedback_counters(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM session_feedback")
+            conn.execute(f"INSERT INTO session_feedback (session_id, positive, negative) {RECOUNT_SQL}")
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO feedback_totals (id, positive, negative)
+                SELECT 1, COALESCE(SUM(positive), 0), COALESCE(SUM(negative), 0) FROM session_feedback
+                """
+            )
+
+    def usage(self, start: date = None, end: date = None) -> tuple:
+        rows = {}
+        query = "SELECT * FROM usage_rollups WHERE day >= ? AND day <= ?"
+        params = (start.isoformat() if start else "", end.isoformat() if end else "9999-12-31")
+        for row in self._connect().execute(query, params):
+            rows.setdefault(row["day"], {})[row["username"]] = {field: row[field] for field in ROLLUP_FIELDS}
+        return sum_rollups(rows)
+
+    def rebuild_rollups(self) -> None:
+        conn = self._connect()
+        with conn:
+            for statement in REBUILD_ROLLUPS_SQL.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    def search(self, query: str, username: str = None, start: date = None, end: date = None,
+               feedback=None, limit: int = 50) -> list:
+        terms = sorted(set(tokenize(query)))
+        clauses, params = [], []
+        if terms:
+            source = "messages_fts f JOIN messages m ON m.session_id = f.session_id AND m.idx = f.idx"
+            clauses.append("messages_fts MATCH ?")
+            params.append(" AND ".join(f'"{term}"' for term in terms))
+        elif feedback is not None:
+            source = "messages m"
+        else:
+            return []
+        if username is not None:
+            clauses.append("s.username = ?")
+            params.append(username)
+        if start is not None:
+            clauses.append("s.timestamp >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("s.timestamp < ?")
+            params.append(end.isoformat() + "T~")
+        if feedback is not None:
+            clauses.append("m.role = 'assistant' AND m.feedback = ?")
+            params.append(feedback)
+        rows = self._connect().execute(
+            f"""
+            SELECT m.session_id, m.idx, m.role, m.message, m.feedback, s.username, s.timestamp
+            FROM {source} JOIN sessions s ON s.session_id = m.session_id
+            WHERE {' AND '.join(clauses)}
+            ORDER BY s.timestamp DESC, m.idx
+            LIMIT ?
+            """,
+            (*params, limit),
+        )
+        return [
+            {
+                "session_id": row["session_id"],
+                "username": row["username"],
+                "timestamp": row["timestamp"],
+                "index": row["idx"],
+                "role": row["role"],
+                "message": row["message"],
+                "feedback": row["feedback"],
+            }
+            for row in rows
+        ]
+
+    def rebuild_search_index(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM messages_fts")
+            conn.execute("INSERT INTO messages_fts (message, session_id, idx) SELECT message, session_id, idx FROM messages")
+
+    def message_frame(self, start: date = None, end: date = None):
+        import pandas as pd
+
+        from .analytics import typed_frame
+
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("m.timestamp >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("m.timestamp < ?")
+            params.append(end.isoformat() + "T~")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        frame = pd.read_sql_query(
+            f"""
+            SELECT s.username, m.session_id, m.idx AS "index", m.timestamp, m.role,
+                   length(m.message) AS length, m.feedback, m.latency_ms
+            FROM messages m JOIN sessions s ON s.session_id = m.session_id
+            {where}
+            """,
+            self._connect(),
+            params=params,
+        )
+        return typed_frame(frame)
+
+    def rebuild_analytics(self) -> None:
+        # message_frame() reads the messages table itself; there is nothing to rebuild.
+        pass
+
+    def compact(self) -> None:
+        conn = self._connect()
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        conn.execute("PRAGMA optimize")
+
+
+def migrate_from_files(log_dir: str, db_path: str) -> int:
+    """
+    Copy every session file in a log directory into a SQLite store.
+
+    Re-running the migration is safe: sessions are upserted by id.
+
+    Args:
+        log_dir (str): Chat log directory holding JSON or JSONL session files
+        db_path (str): Path of the target database file
+
+    Returns:
+        int: Number of sessions migrated
+    """
+    from .files import iter_session_files, load_session
+    from .session_log import read_records
+
+    store = SqliteChatStore(db_path)
+    count = 0
+    for filename in iter_session_files(log_dir):
+        data = load_session(filename, log_dir)
+        if not data or not data.get("chat_history"):
+            continue
+        message_timestamps = None
+        if filename.endswith(".jsonl"):
+            stamps = {}
+            for record in read_records(os.path.join(log_dir, filename)):
+                if record.get("type") == "message":
+                    stamps[record["index"]] = record["timestamp"]
+            message_timestamps = [stamps.get(i, data["timestamp"]) for i in range(len(data["chat_history"]))]
+        store.import_session(data, message_timestamps)
+        count += 1
+    # Imported sessions are attributed to their save day; recompute from message timestamps.
+    store.rebuild_rollups()
+    return count
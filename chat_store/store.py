@@ -0,0 +1,401 @@
+"""
+Storage backend interface for chat sessions.
+
+Every persistence operation the app performs goes through a ``ChatStore``:
+saving a session, appending a message, recording feedback, listing session
+previews by user or date range, and aggregating feedback. ``get_store()``
+returns the process-wide store selected by ``CHAT_STORE_BACKEND``:
+
+- ``files`` (default): session files in ``CHAT_LOG_DIR`` plus the manifest
+- ``sqlite``: a single SQLite database at ``CHAT_DB_PATH``
+
+The shared store is compacted every ``CHAT_COMPACT_INTERVAL`` seconds by a
+background thread (0 disables it). With ``CHAT_ARCHIVE_AFTER_DAYS`` set, the
+same thread moves sessions not saved for that many days to the cold archive.
+"""
+
+import logging
+import os
+import threading
+from datetime import date, timedelta
+
+from .files import CHAT_LOG_DIR
+
+CHAT_STORE_BACKEND = os.environ.get("CHAT_STORE_BACKEND", "files")
+CHAT_DB_PATH = os.environ.get("CHAT_DB_PATH", os.path.join(CHAT_LOG_DIR, "chat.db"))
+CHAT_COMPACT_INTERVAL = float(os.environ.get("CHAT_COMPACT_INTERVAL", "300"))
+CHAT_ARCHIVE_AFTER_DAYS = int(os.environ.get("CHAT_ARCHIVE_AFTER_DAYS", "0"))
+
+# Orders accepted by ChatStore.browse_sessions()
+SESSION_SORTS = ("date", "user", "negative")
+
+logger = logging.getLogger(__name__)
+
+
+class ChatStore:
+    """
+    Base class for chat session storage backends.
+
+    Session metadata entries returned by ``list_sessions()`` are dictionaries
+    with the keys ``username``, ``session_id``, ``timestamp``, ``preview`` and
+    ``messages``. Session data returned by ``load_session()`` has the same
+    shape as a JSON session file.
+
+    Attributes:
+        supports_archive (bool): Whether ``archive_sessions()`` moves sessions
+            to cold storage; stores without one archive nothing
+    """
+
+    supports_archive = False
+
+    def save_session(self, username: str, session_id: str, chat_history: list) -> dict:
+        """
+        Persist the current state of a session.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            chat_history (list): Messages of the session
+
+        Returns:
+            dict: Metadata entry of the saved session
+        """
+        raise NotImplementedError
+
+    def append_message(self, username: str, session_id: str, message: dict) -> int:
+        """
+        Append one message to a session, creating the session if needed.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            message (dict): Message with "role" and "message" keys
+
+        Returns:
+            int: Index of the appended message
+        """
+        data = self.load_session(session_id)
+        chat_history = data["chat_history"] if data else []
+        chat_history.append(message)
+        self.save_session(username, session_id, chat_history)
+        return len(chat_history) - 1
+
+    def set_feedback(self, username: str, session_id: str, index: int, value) -> None:
+        """
+        Record thumbs feedback on a message.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            index (int): Index of the message in the session
+            value: Feedback value (1 positive, 0 negative, None cleared)
+        """
+        data = self.load_session(session_id)
+        if data is None or index >= len(data["chat_history"]):
+            return
+        data["chat_history"][index]["feedback"] = value
+        self.save_session(username, session_id, data["chat_history"])
+
+    def save_session_tail(self, username: str, session_id: str, offset: int, messages: list) -> dict:
+        """
+        Persist the messages of a session from an index on.
+
+        Messages before ``offset`` are kept as stored, so a caller that only
+        holds the recent part of a conversation can save it.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            offset (int): Index of the first of ``messages`` in the session
+            messages (list): Messages of the session from ``offset`` on
+
+        Returns:
+            dict: Metadata entry of the saved session
+        """
+        if offset == 0:
+            return self.save_session(username, session_id, messages)
+        data = self.load_session(session_id)
+        stored = data["chat_history"] if data else []
+        if len(stored) < offset:
+            raise ValueError(f"Session {session_id} has {len(stored)} stored messages, cannot save from {offset}")
+        return self.save_session(username, session_id, stored[:offset] + list(messages))
+
+    def load_messages(self, session_id: str, start: int = 0, end: int = None) -> tuple:
+        """
+        Load a range of a session's messages.
+
+        Args:
+            session_id (str): Unique session identifier
+            start (int): Index of the first message; negative counts from the end
+            end (int): Index after the last message (None for the end)
+
+        Returns:
+            tuple: (messages, total) with the messages in the range and the
+                number of messages in the session; ([], 0) if it does not exist
+        """
+        data = self.load_session(session_id)
+        if data is None:
+            return [], 0
+        chat_history = data["chat_history"]
+        return chat_history[start:end], len(chat_history)
+
+    def load_session(self, session_id: str) -> dict:
+        """
+        Load a complete session.
+
+        Args:
+            session_id (str): Unique session identifier
+
+        Returns:
+            dict: Session data, or None if the session does not exist
+        """
+        raise NotImplementedError
+
+    def list_sessions(self, username: str = None, start: date = None, end: date = None) -> list:
+        """
+        List session metadata, newest first.
+
+        Args:
+            username (str): Only include sessions for this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+
+        Returns:
+            list: Session metadata entries
+        """
+        raise NotImplementedError
+
+    def feedback_summary(self) -> tuple:
+        """
+        Get overall and session-wise feedback counts on assistant messages.
+
+        Returns:
+            tuple: (overall_stats, sessionwise_stats)
+                - overall_stats: Dict with total positive/negative feedback counts
+                - sessionwise_stats: Dict keyed by session id with username,
+                  timestamp, preview and positive/negative counts
+        """
+        raise NotImplementedError
+
+    def feedback_totals(self) -> dict:
+        """
+        Get the overall feedback counts without listing any session.
+
+        Returns:
+            dict: Total positive/negative feedback counts
+        """
+        raise NotImplementedError
+
+    def browse_sessions(self, username: str = None, start: date = None, end: date = None,
+                        negative_only: bool = False, sort: str = "date", offset: int = 0,
+                        limit: int = 20) -> tuple:
+        """
+        Get one page of sessions with their feedback counts, filtered and sorted by the store.
+
+        Only the requested page is built, so a browser over thousands of
+        sessions sends a handful of rows to the UI.
+
+        Args:
+            username (str): Only include sessions of this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+            negative_only (bool): Only include sessions with negative feedback
+            sort (str): "date" (newest first), "user" (by username, then
+                newest first) or "negative" (most negative feedback first,
+                then newest first)
+            offset (int): Number of matching sessions to skip
+            limit (int): Maximum number of sessions to return
+
+        Returns:
+            tuple: (rows, total)
+                - rows: Session metadata entries with "positive" and "negative" counts
+                - total: Number of sessions matching the filters
+        """
+        raise NotImplementedError
+
+    def recount_feedback(self) -> tuple:
+        """
+        Count feedback from scratch, bypassing any materialized counters.
+
+        Returns:
+            tuple: (overall_stats, sessionwise_counts)
+                - overall_stats: Dict with total positive/negative feedback counts
+                - sessionwise_counts: Positive/negative counts keyed by session id
+        """
+        raise NotImplementedError
+
+    def rebuild_feedback_counters(self) -> None:
+        """Replace the materialized feedback counters with a full recount."""
+        raise NotImplementedError
+
+    def verify_feedback(self) -> list:
+        """
+        Compare the materialized feedback counters against a full recount.
+
+        Returns:
+            list: (key, stored, recounted) tuples for every mismatch, where key
+                is "overall" or a session id; empty when the counters are exact
+        """
+        overall, sessionwise = self.feedback_summary()
+        expected_overall, expected = self.recount_feedback()
+        mismatches = []
+        if overall != expected_overall:
+            mismatches.append(("overall", overall, expected_overall))
+        zero = {"positive": 0, "negative": 0}
+        for session_id in set(sessionwise) | set(expected):
+            info = sessionwise.get(session_id, zero)
+            stored = {"positive": info["positive"], "negative": info["negative"]}
+            recounted = expected.get(session_id, zero)
+            if stored != recounted:
+                mismatches.append((session_id, stored, recounted))
+        return mismatches
+
+    def usage(self, start: date = None, end: date = None) -> tuple:
+        """
+        Get pre-aggregated usage over a date range.
+
+        Counters are "sessions" (sessions started), "messages" (messages
+        written), "positive" and "negative" (feedback given).
+
+        Args:
+            start (date): First day to include (inclusive)
+            end (date): Last day to include (inclusive)
+
+        Returns:
+            tuple: (by_day, by_user)
+                - by_day: Counters keyed by ISO day
+                - by_user: Counters keyed by username
+        """
+        raise NotImplementedError
+
+    def rebuild_rollups(self) -> None:
+        """Rebuild the usage rollups from the stored sessions."""
+        raise NotImplementedError
+
+    def search(self, query: str, username: str = None, start: date = None, end: date = None,
+               feedback=None, limit: int = 50) -> list:
+        """
+        Full-text search over user and assistant messages.
+
+        A message matches if it contains every term of the query.
+
+        Args:
+            query (str): Free-text query; an empty query matches every message
+                with the requested feedback (and nothing without a feedback filter)
+            username (str): Only include sessions of this user
+            start (date): Only include sessions last saved on or after this day
+            end (date): Only include sessions last saved on or before this day
+            feedback: Only include messages with this feedback value (1 or 0)
+            limit (int): Maximum number of hits
+
+        Returns:
+            list: Hits, newest session first, as dictionaries with the keys
+                ``session_id``, ``username``, ``timestamp``, ``index``,
+                ``role``, ``message`` and ``feedback``
+        """
+        raise NotImplementedError
+
+    def rebuild_search_index(self) -> None:
+        """Rebuild the full-text search index from the stored sessions."""
+        raise NotImplementedError
+
+    def message_frame(self, start: date = None, end: date = None):
+        """
+        Get one row per message as a DataFrame for vectorized analytics.
+
+        Args:
+            start (date): Only include messages sent on or after this day
+            end (date): Only include messages sent on or before this day
+
+        Returns:
+            pandas.DataFrame: Columns username, session_id, index, timestamp,
+                role, length, feedback and latency_ms (see ``analytics``)
+        """
+        raise NotImplementedError
+
+    def rebuild_analytics(self) -> None:
+        """Rebuild the message table behind ``message_frame()`` from the stored sessions."""
+        raise NotImplementedError
+
+    def archive_sessions(self, before: date) -> int:
+        """
+        Move sessions last saved before a day to compressed cold storage.
+
+        Archived sessions no longer appear in ``list_sessions()`` but can still
+        be loaded, searched and summarized. Stores without cold storage
+        (``supports_archive`` False) keep every session where it is.
+
+        Args:
+            before (date): Sessions last saved before this day are archived
+
+        Returns:
+            int: Number of sessions archived
+        """
+        return 0
+
+    def compact(self) -> None:
+        """Compact derived data; called periodically from a background thread."""
+
+
+def start_background_compaction(store: ChatStore, interval: float, archive_after_days: int = 0) -> threading.Event:
+    """
+    Compact a store every ``interval`` seconds on a daemon thread.
+
+    Args:
+        store (ChatStore): Store to compact
+        interval (float): Seconds between compactions
+        archive_after_days (int): If positive, also archive sessions not saved
+            for this many days
+
+    Returns:
+        threading.Event: Set it to stop the thread
+    """
+    stop = threading.Event()
+    archive = archive_after_days > 0 and store.supports_archive
+    if archive_after_days > 0 and not archive:
+        logger.warning("%s does not support archiving; CHAT_ARCHIVE_AFTER_DAYS is ignored", type(store).__name__)
+
+    def run() -> None:
+        while not stop.wait(interval):
+            # Each step runs on its own, so a failing archive does not stop compaction.
+            if archive:
+                try:
+                    store.archive_sessions(date.today() - timedelta(days=archive_after_days))
+                except Exception:
+                    logger.exception("Background archiving failed")
+            try:
+                store.compact()
+            except Exception:
+                logger.exception("Background compaction failed")
+
+    threading.Thread(target=run, name="chat-store-compactor", daemon=True).start()
+    return stop
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ChatStore:
+    """
+    Get the process-wide chat store selected by CHAT_STORE_BACKEND.
+
+    Returns:
+        ChatStore: Shared store instance
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if CHAT_STORE_BACKEND == "sqlite":
+                from .sqlite_store import SqliteChatStore
+
+                _store = SqliteChatStore(CHAT_DB_PATH)
+            elif CHAT_STORE_BACKEND == "files":
+                from .file_store import FileChatStore
+
+                _store = FileChatStore(CHAT_LOG_DIR)
+            else:
+                raise ValueError(f"Unknown CHAT_STORE_BACKEND: {CHAT_STORE_BACKEND!r}")
+            if CHAT_COMPACT_INTERVAL > 0:
+                start_background_compaction(_store, CHAT_COMPACT_INTERVAL, CHAT_ARCHIVE_AFTER_DAYS)
+        return _store
@@ -0,0 +1,167 @@
+"""
+Write-behind persistence for chat sessions.
+
+``WriteBehindQueue.submit()`` hands a snapshot of a session to a background
+writer thread and returns immediately, so disk latency never blocks the
+Streamlit script. Updates to a session that is still waiting to be written
+replace the pending snapshot instead of queueing another write, which
+coalesces bursts (a message followed by rapid feedback clicks) into one save.
+A snapshot may hold only the recent part of a session (see ``offset``); it
+is then merged with the pending one so no message is dropped.
+The queue is flushed when the process exits.
+
+Set ``CHAT_WRITE_BEHIND=0`` to write synchronously instead.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from .store import ChatStore, get_store
+
+CHAT_WRITE_BEHIND = os.environ.get("CHAT_WRITE_BEHIND", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Background writer with a bounded queue of sessions to save.
+
+    Args:
+        store (ChatStore): Store the sessions are saved to
+        max_pending (int): Maximum number of distinct sessions waiting to be
+            written; ``submit()`` blocks when the queue is full
+        enabled (bool): When False, ``submit()`` saves synchronously
+    """
+
+    def __init__(self, store: ChatStore, max_pending: int = 1024, enabled: bool = True) -> None:
+        self.store = store
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=256)
+        self.submitted = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.errors = 0
+        self._thread = None
+        if enabled:
+            self._thread = threading.Thread(target=self._run, name="chat-store-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, username: str, session_id: str, chat_history: list, offset: int = 0) -> None:
+        """
+        Schedule a session to be saved.
+
+        Args:
+            username (str): User who owns the session
+            session_id (str): Unique session identifier
+            chat_history (list): Messages of the session from ``offset`` on;
+                copied, so the caller may keep mutating its list
+            offset (int): Index of the first of ``chat_history`` in the session;
+                earlier messages are kept as stored
+        """
+        snapshot = [dict(msg) for msg in chat_history]
+        if not self.enabled:
+            self._save(username, session_id, offset, snapshot)
+            return
+        with self._lock:
+            self.submitted += 1
+            pending = self._pending.get(session_id)
+            if pending is not None and pending[1] < offset:
+                # The pending snapshot holds messages this one no longer does.
+                snapshot = pending[2][:offset - pending[1]] + snapshot
+                offset = pending[1]
+            self._pending[session_id] = (username, offset, snapshot)
+            if pending is not None:
+                self.coalesced += 1
+                return
+        self._queue.put(session_id)
+
+    def _run(self) -> None:
+        while True:
+            session_id = self._queue.get()
+            try:
+                if session_id is _STOP:
+                    return
+                with self._lock:
+                    item = self._pending.pop(session_id, None)
+                if item is not None:
+                    self._save(item[0], session_id, item[1], item[2])
+            finally:
+                self._queue.task_done()
+
+    def _save(self, username: str, session_id: str, offset: int, chat_history: list) -> None:
+        started = time.perf_counter()
+        try:
+            if offset:
+                self.store.save_session_tail(username, session_id, offset, chat_history)
+            else:
+                self.store.save_session(username, session_id, chat_history)
+        except Exception:
+            self.errors += 1
+            logger.exception("Failed to save chat session %s", session_id)
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+            self.writes += 1
+
+    def flush(self) -> None:
+        """Block until every submitted session has been written."""
+        if self.enabled:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self.flush()
+            self._queue.put(_STOP)
+            self._thread.join(timeout=10)
+
+    def stats(self) -> dict:
+        """
+        Get queue and latency metrics.
+
+        Returns:
+            dict: queue_depth, submitted, coalesced, writes, errors and write
+                latency (last/avg/p95/max, in milliseconds) over recent writes
+        """
+        latencies = sorted(self._latencies)
+        ms = [value * 1000 for value in latencies]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "writes": self.writes,
+            "errors": self.errors,
+            "last_ms": self._latencies[-1] * 1000 if self._latencies else 0.0,
+            "avg_ms": sum(ms) / len(ms) if ms else 0.0,
+            "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))] if ms else 0.0,
+            "max_ms": ms[-1] if ms else 0.0,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteBehindQueue:
+    """
+    Get the process-wide write-behind queue for the shared store.
+
+    Returns:
+        WriteBehindQueue: Shared writer, flushed at interpreter exit
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(get_store(), enabled=CHAT_WRITE_BEHIND)
+            atexit.register(_writer.close)
+        return _writer
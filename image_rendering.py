@@ -1,14 +1,208 @@
 import streamlit as st
+import os
 import time
-import base64
-from PIL import Image
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-# Convert image to base64
-def image_to_base64(img):
+# PIL is imported inside the functions that use it, so the page renders before any
+# upload without loading it.
+
+# Images are scaled down to this width on the server: about twice the centered
+# layout's content column, so they stay sharp on high-density screens, and
+# below the width at which st.image would resize them again on every rerun.
+DISPLAY_WIDTH = 1400
+
+# Formats st.image serves byte for byte; anything else would be re-encoded on every rerun.
+SERVED_FORMATS = ("JPEG", "PNG")
+ENCODE_OPTIONS = {"JPEG": {"quality": 85, "optimize": True}, "PNG": {"optimize": True}}
+
+# Widths of the previews streamed in before the full image, smallest first.
+PREVIEW_WIDTHS = (48, 192, 640)
+PREVIEW_QUALITY = 70
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+EXIF_ORIENTATION = 0x0112
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def process_image(digest: str, _data: bytes, max_width: int = DISPLAY_WIDTH) -> tuple:
+    """
+    Prepare uploaded image bytes for display, cached by content hash.
+
+    JPEG and PNG images no wider than ``max_width`` are passed through
+    untouched, so an already-compressed photo is never re-encoded. Wider
+    images are downscaled, and WebP images (which st.image cannot serve as
+    they are) are converted once, keeping lossy images lossy: JPEG unless the
+    image is a PNG or has transparency.
+
+    Args:
+        digest (str): SHA-256 of the image bytes, the cache key
+        _data (bytes): Uploaded image bytes (not hashed by the cache)
+        max_width (int): Widest image to send to the browser, in pixels
+
+    Returns:
+        tuple: (image_bytes, format, (width, height)) with format "JPEG" or "PNG"
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(BytesIO(_data))
+    if img.format in SERVED_FORMATS and img.width <= max_width:
+        return _data, img.format, img.size
+    has_alpha = img.mode in ("RGBA", "LA", "P") or "transparency" in img.info
+    fmt = "PNG" if img.format == "PNG" or has_alpha else "JPEG"
+    if img.format == "JPEG":
+        # Let the decoder downscale by a power of two (no larger than needed) while it reads.
+        img.draft("RGB", (max_width, max_width * img.height // img.width))
+    # Re-encoding drops the EXIF orientation tag, so apply it to the pixels first.
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_width, max_width * 100), Image.Resampling.LANCZOS)
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
     buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+    img.save(buffered, format=fmt, **ENCODE_OPTIONS[fmt])
+    return buffered.getvalue(), fmt, img.size
+
+
+@st.cache_resource
+def get_render_pool() -> ThreadPoolExecutor:
+    """
+    Get the worker pool that renders image stages, shared by all sessions.
+
+    Returns:
+        ThreadPoolExecutor: Process-wide render pool
+    """
+    return ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+
+
+def display_width(data: bytes, max_width: int = DISPLAY_WIDTH) -> int:
+    """
+    Get the width the full image will be shown at, from the image header only.
+
+    Args:
+        data (bytes): Uploaded image bytes
+        max_width (int): Widest image to send to the browser, in pixels
+
+    Returns:
+        int: Width in pixels, after applying the EXIF orientation
+    """
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+        width = height
+    return min(width, max_width)
+
+
+def render_preview(data: bytes, width: int, cancel: threading.Event) -> tuple:
+    """
+    Render a low-resolution preview of an image, on a render pool worker.
+
+    JPEG images are decoded straight at a reduced scale, so the smallest
+    preview of even a large photo takes a few milliseconds.
+
+    Args:
+        data (bytes): Uploaded image bytes
+        width (int): Preview width in pixels
+        cancel (threading.Event): Set when the preview is no longer wanted
+
+    Returns:
+        tuple: (image_bytes, format, width), or None if cancelled
+    """
+    from PIL import Image, ImageOps
+
+    if cancel.is_set():
+        return None
+    img = Image.open(BytesIO(data))
+    has_alpha = img.mode in ("RGBA", "LA", "P") or "transparency" in img.info
+    if img.format == "JPEG":
+        img.draft("RGB", (width, width * img.height // img.width))
+    img = ImageOps.exif_transpose(img)
+    if cancel.is_set():
+        return None
+    img.thumbnail((width, width * 100), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    buffered = BytesIO()
+    if has_alpha:
+        img.convert("RGBA").save(buffered, format="PNG")
+        return buffered.getvalue(), "PNG", img.width
+    img.convert("RGB").save(buffered, format="JPEG", quality=PREVIEW_QUALITY)
+    return buffered.getvalue(), "JPEG", img.width
+
+
+def _in_script_context(ctx, func, *args):
+    # Attach the session's run context so st.cache_data works without warnings on the worker.
+    add_script_run_ctx(ctx=ctx)
+    return func(*args)
+
+
+def show_frame(frame, key: str, image_bytes: bytes, image_format: str, width: int) -> None:
+    """
+    Replace the contents of the image placeholder with one rendering stage.
+
+    Args:
+        frame: st.empty() placeholder holding the image
+        key (str): Container key, styled by the CSS below
+        image_bytes (bytes): Encoded image
+        image_format (str): "JPEG" or "PNG"
+        width (int): Display width in pixels
+    """
+    with frame.container(key=key):
+        st.image(image_bytes, width=width, output_format=image_format)
+
+
+def render_progressively(frame, status, digest: str, data: bytes) -> tuple:
+    """
+    Stream increasing-resolution previews into a placeholder until the full image is ready.
+
+    The previews and the full image are rendered concurrently on the render
+    pool, and every preview sharper than the one on screen is shown as soon
+    as it finishes. Uploading another file stops this script run at the next
+    frame; the previews not started yet are then cancelled and the running
+    ones stop at their next check.
+
+    Args:
+        frame: st.empty() placeholder for the image
+        status: st.empty() placeholder for the progress text
+        digest (str): SHA-256 of the image bytes
+        data (bytes): Uploaded image bytes
+
+    Returns:
+        tuple: (image_bytes, format, (width, height)) of the full image
+    """
+    status.markdown('<div class="loading-text">🧠 Generating image with AI...</div>', unsafe_allow_html=True)
+    cancel = threading.Event()
+    width = display_width(data)
+    pool = get_render_pool()
+    started = time.perf_counter()
+    previews = [pool.submit(render_preview, data, w, cancel) for w in PREVIEW_WIDTHS if w < width]
+    final = pool.submit(_in_script_context, get_script_run_ctx(), process_image, digest, data)
+    shown = 0
+    try:
+        for future in as_completed(previews + [final]):
+            if future is final:
+                break
+            preview = future.result()
+            if preview is None or preview[2] <= shown:
+                continue
+            preview_bytes, preview_format, shown = preview
+            show_frame(frame, f"render-preview-{shown}", preview_bytes, preview_format, width)
+            status.markdown(
+                f'<div class="loading-text">🧠 Generating image with AI... '
+                f'{shown} px preview after {(time.perf_counter() - started) * 1000:.0f} ms</div>',
+                unsafe_allow_html=True,
+            )
+        image_bytes, image_format, size = final.result()
+    finally:
+        cancel.set()
+        for future in previews:
+            future.cancel()
+    show_frame(frame, "render-final", image_bytes, image_format, size[0])
+    status.empty()
+    return image_bytes, image_format, size
+
 
 # Custom CSS for "AI-style rendering"
 css = """
@@ -20,31 +214,26 @@ css = """
     justify-content: center;
 }
 
-.ai-image {
-    animation: aiReveal 4s ease-in-out forwards;
+[data-testid="stImage"] img {
     max-width: 100%;
     border-radius: 16px;
     box-shadow: 0 4px 20px rgba(0,0,0,0.3);
-    opacity: 0;
-    filter: grayscale(100%) blur(10px) brightness(0.7);
-    transform: scale(1.1);
+}
+
+[class*="st-key-render-preview"] img {
+    filter: grayscale(60%) blur(6px) brightness(0.85);
+}
+
+.st-key-render-final img {
+    animation: aiReveal 0.8s ease-out;
 }
 
 @keyframes aiReveal {
     0% {
-        opacity: 0;
-        filter: grayscale(100%) blur(10px) brightness(0.7);
-        transform: scale(1.1);
-    }
-    50% {
-        opacity: 0.5;
-        filter: grayscale(50%) blur(4px) brightness(0.85);
-        transform: scale(1.03);
+        filter: grayscale(60%) blur(6px) brightness(0.85);
     }
     100% {
-        opacity: 1;
         filter: grayscale(0%) blur(0) brightness(1);
-        transform: scale(1);
     }
 }
 
@@ -67,29 +256,21 @@ css = """
 # Upload image
 st.set_page_config(layout="centered")
 st.title("🤖 AI Rendering Simulation")
-uploaded_file = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg"])
+uploaded_file = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg", "webp"])
 
 if uploaded_file:
-    img = Image.open(uploaded_file)
-    img_base64 = image_to_base64(img)
-
-    # Show loading message
-    loading_placeholder = st.empty()
-    loading_placeholder.markdown('<div class="loading-text">🧠 Generating image with AI...</div>', unsafe_allow_html=True)
-    
-    # Simulate generation delay
-    time.sleep(3)
-
-    # Clear loading
-    loading_placeholder.empty()
+    data = uploaded_file.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
 
-    # Inject CSS + image with animation
+    # Inject CSS; images are served as media files instead of inline data URIs
     st.markdown(css, unsafe_allow_html=True)
-    st.markdown(
-        f"""
-        <div class="ai-container">
-            <img class="ai-image" src="data:image/png;base64,{img_base64}" />
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+    frame = st.empty()
+    status = st.empty()
+    if st.session_state.get("rendered_image") == digest:
+        # Reruns with the same image render straight from the cache.
+        image_bytes, image_format, size = process_image(digest, data)
+        show_frame(frame, "render-final", image_bytes, image_format, size[0])
+    else:
+        image_bytes, image_format, size = render_progressively(frame, status, digest, data)
+        st.session_state.rendered_image = digest
+    st.caption(f"{size[0]} x {size[1]} px · {len(image_bytes) / 1024:.0f} KiB sent ({len(data) / 1024:.0f} KiB uploaded)")
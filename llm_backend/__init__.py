@@ -0,0 +1,77 @@
+"""
+Pluggable response backends for the SCM Chatbot.
+
+``get_runner()`` builds the backend selected by environment variables and
+wraps it in a ``BackendRunner``:
+
+- CHAT_BACKEND: "echo" (default, offline) or "http"
+- CHAT_BACKEND_URL: server root for the http backend (default http://127.0.0.1:8765)
+- CHAT_BACKEND_TIMEOUT: seconds allowed for a whole response (default 60)
+
+The Streamlit app caches the runner with ``st.cache_resource`` so every
+session shares one event loop and one connection pool. Complete responses are
+cached process-wide by ``get_response_cache()`` (see ``cache``). The
+conversation sent with a prompt is assembled within a token budget by
+``get_context_builder()`` (see ``context``).
+"""
+
+import os
+
+from .base import ChatBackend, EchoBackend
+from .cache import ResponseCache, cache_key, get_response_cache
+from .context import ContextBuilder, PromptContext, RollingSummary, WhitespaceTokenizer, get_context_builder
+from .runner import BackendRunner, BackendTimeout
+
+CHAT_BACKEND = os.environ.get("CHAT_BACKEND", "echo")
+CHAT_BACKEND_URL = os.environ.get("CHAT_BACKEND_URL", "http://127.0.0.1:8765")
+CHAT_BACKEND_TIMEOUT = float(os.environ.get("CHAT_BACKEND_TIMEOUT", "60"))
+
+
+def make_backend(kind: str = CHAT_BACKEND) -> ChatBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        kind (str): "echo" or "http"
+
+    Returns:
+        ChatBackend: The backend
+    """
+    if kind == "echo":
+        return EchoBackend()
+    if kind == "http":
+        from .http_backend import HTTPStreamingBackend
+
+        return HTTPStreamingBackend(CHAT_BACKEND_URL, timeout=CHAT_BACKEND_TIMEOUT)
+    raise ValueError(f"Unknown CHAT_BACKEND: {kind!r}")
+
+
+def get_runner(kind: str = CHAT_BACKEND) -> BackendRunner:
+    """
+    Create a runner for the configured backend.
+
+    Args:
+        kind (str): "echo" or "http"
+
+    Returns:
+        BackendRunner: Runner with its own event loop thread
+    """
+    return BackendRunner(make_backend(kind), timeout=CHAT_BACKEND_TIMEOUT)
+
+
+__all__ = [
+    "BackendRunner",
+    "BackendTimeout",
+    "ChatBackend",
+    "ContextBuilder",
+    "EchoBackend",
+    "PromptContext",
+    "ResponseCache",
+    "RollingSummary",
+    "WhitespaceTokenizer",
+    "cache_key",
+    "get_context_builder",
+    "get_response_cache",
+    "get_runner",
+    "make_backend",
+]
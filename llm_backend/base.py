@@ -0,0 +1,61 @@
+"""
+Backend interface for generating assistant responses.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+from streaming import CHAT_STREAM_DELAY, word_chunks
+
+
+class ChatBackend:
+    """
+    Base class for response generators.
+
+    Backends are asynchronous: ``astream()`` is an async generator of text
+    chunks and runs on the shared backend event loop (see ``runner``).
+    ``uses_context`` tells whether a reply depends on the context messages;
+    if not, cached replies are keyed on the prompt alone (see ``cache``).
+    """
+
+    name = "base"
+    uses_context = True
+
+    async def astream(self, prompt: str, context: list = None) -> AsyncIterator[str]:
+        """
+        Stream the response to a prompt.
+
+        Args:
+            prompt (str): The user's input message
+            context (list): Optional earlier messages ({"role", "message"} dicts)
+
+        Yields:
+            str: Chunks of the response
+        """
+        raise NotImplementedError
+        yield  # pragma: no cover - marks this as an async generator
+
+    async def aclose(self) -> None:
+        """Release connections and other resources held by the backend."""
+
+
+class EchoBackend(ChatBackend):
+    """
+    Offline stand-in that echoes the prompt back.
+
+    Args:
+        delay (float): Seconds to wait between word chunks
+    """
+
+    name = "echo"
+    uses_context = False
+
+    def __init__(self, delay: float = CHAT_STREAM_DELAY) -> None:
+        self.delay = delay
+
+    async def astream(self, prompt: str, context: list = None) -> AsyncIterator[str]:
+        response = f'You said, "{prompt}" ...interesting.'
+        for chunk in word_chunks(response, delay=0):
+            yield chunk
+            if self.delay:
+                await asyncio.sleep(self.delay)
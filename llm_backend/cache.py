@@ -0,0 +1,226 @@
+"""
+Process-wide LRU + TTL cache of complete assistant responses.
+
+Repeated questions ("where is order X", "lead time for Y") are answered from
+the cache instead of running a full generation. Keys combine the backend
+name, the normalized prompt and, for backends whose replies depend on the
+conversation (``ChatBackend.uses_context``), a digest of the context
+messages. Such a key is only reused for the same question at the same point
+of a conversation, in practice as the first message of a session, so those
+backends trade most repeat hits for replies that stay correct in context;
+``benchmarks/bench_cache.py`` measures the hit rate of both keys. Cached
+answers are replayed as word chunks through the same streaming path, so the
+UI behaves the same on a hit.
+
+Settings (environment variables):
+- CHAT_CACHE_SIZE: maximum number of cached responses (default 512, 0 disables)
+- CHAT_CACHE_TTL: seconds a response stays valid (default 3600)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator
+
+from streaming import word_chunks
+
+CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_TTL = float(os.environ.get("CHAT_CACHE_TTL", "3600"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so trivially different phrasings share a cache entry.
+
+    Lowercases, collapses whitespace and drops trailing punctuation.
+
+    Args:
+        prompt (str): The user's input message
+
+    Returns:
+        str: Normalized prompt
+    """
+    return _WHITESPACE.sub(" ", prompt.lower()).strip().rstrip("?!. ")
+
+
+def cache_key(backend: str, prompt: str, context: list = None) -> str:
+    """
+    Build the cache key for a request.
+
+    Args:
+        backend (str): Backend name
+        prompt (str): The user's input message
+        context (list): Context messages sent with the prompt, or None for
+            a backend whose replies do not depend on them
+
+    Returns:
+        str: Cache key
+    """
+    key = f"{backend}|{normalize_prompt(prompt)}"
+    if context:
+        digest = hashlib.sha1(json.dumps(context, sort_keys=True).encode()).hexdigest()
+        key = f"{key}|{digest}"
+    return key
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    Args:
+        max_entries (int): Maximum number of entries (0 disables caching)
+        ttl (float): Seconds an entry stays valid
+    """
+
+    def __init__(self, max_entries: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> str:
+        """
+        Look up a response.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str: The cached response, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a response, evicting the least recently used entries if full.
+
+        Args:
+            key (str): Cache key
+            response (str): Complete response text
+        """
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {"response": response, "created": now, "expires": now + self.ttl, "hits": 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """
+        Flush every entry.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: size, max_entries, ttl, hits, misses, evictions, expirations
+                and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def entries(self) -> list:
+        """
+        List live entries, most recently used first.
+
+        Returns:
+            list: Dicts with key, response, age (s), expires_in (s) and hits
+        """
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "key": key,
+                    "response": entry["response"],
+                    "age": now - entry["created"],
+                    "expires_in": entry["expires"] - now,
+                    "hits": entry["hits"],
+                }
+                for key, entry in reversed(self._entries.items())
+                if entry["expires"] > now
+            ]
+
+    def stream(self, key: str, produce: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Stream a response, from the cache on a hit or from ``produce`` on a miss.
+
+        A produced response is cached only if it streams to completion.
+
+        Args:
+            key (str): Cache key
+            produce (Callable): Returns the backend chunk iterator on a miss
+
+        Yields:
+            str: Chunks of the response
+        """
+        cached = self.get(key)
+        if cached is not None:
+            yield from word_chunks(cached, delay=0)
+            return
+        parts = []
+        for chunk in produce():
+            parts.append(chunk)
+            yield chunk
+        self.put(key, "".join(parts))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache.
+
+    Returns:
+        ResponseCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,331 @@
+"""
+Token-budgeted conversation context for backend requests.
+
+Sending the whole conversation with every prompt makes latency and cost grow
+with the length of a session. ``ContextBuilder.build()`` instead sends the
+most recent turns that fit in a token budget, preceded by a rolling summary
+of the older ones. Messages no longer resident in memory are read back from
+the store when the budget reaches them, so the window is sized by the budget
+alone. The summary lives in a ``RollingSummary`` kept per chat session and is
+extended incrementally: each message is folded in once, when it falls out of
+the verbatim window, and never re-read afterwards.
+
+Token counts come from a pluggable tokenizer, anything with a
+``count(text) -> int`` method. ``WhitespaceTokenizer`` is a local stand-in
+that needs no model files; plug in the serving model's tokenizer for exact
+budgets. The default summarizer is extractive (the first words of each
+message), so no model call is needed to maintain it.
+
+Settings (environment variables):
+- CHAT_CONTEXT_TOKENS: token budget of a request, prompt included (default 2048)
+- CHAT_SUMMARY_TOKENS: token budget of the rolling summary (default 256)
+"""
+
+import os
+import re
+import threading
+from collections import deque
+
+CHAT_CONTEXT_TOKENS = int(os.environ.get("CHAT_CONTEXT_TOKENS", "2048"))
+CHAT_SUMMARY_TOKENS = int(os.environ.get("CHAT_SUMMARY_TOKENS", "256"))
+
+# Words kept from each message by the extractive summarizer
+SUMMARY_WORDS = 24
+
+# Tokens charged per message for its role and separators, as chat formats do
+MESSAGE_OVERHEAD = 4
+
+# Messages read per load() call when the window reaches past the resident ones
+LOAD_CHUNK = 32
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+SUMMARY_OMITTED = "(earlier turns omitted)"
+
+
+class WhitespaceTokenizer:
+    """
+    Counts whitespace-separated words and punctuation runs as tokens.
+
+    A local stand-in for a model tokenizer: close enough to size a budget
+    and deterministic, with no model files to load.
+    """
+
+    name = "whitespace"
+    _TOKEN = re.compile(r"\w+|[^\w\s]+")
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text.
+
+        Args:
+            text (str): Text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        return len(self._TOKEN.findall(text))
+
+
+def extractive_summary(messages: list, words: int = SUMMARY_WORDS) -> list:
+    """
+    Summarize messages as one short line each.
+
+    Args:
+        messages (list): Messages with "role" and "message" keys
+        words (int): Words kept from each message
+
+    Returns:
+        list: Summary lines, oldest first
+    """
+    lines = []
+    for msg in messages:
+        text = msg["message"].split()
+        line = " ".join(text[:words]) + (" ..." if len(text) > words else "")
+        lines.append(f"{msg['role']}: {line}")
+    return lines
+
+
+class RollingSummary:
+    """
+    Summary of the start of a conversation, extended as it grows.
+
+    Attributes:
+        session_id (str): Session the summary belongs to
+        upto (int): Number of leading messages folded into the summary
+        lines (deque): Summary lines, oldest first
+        tokens (int): Tokens of the lines
+        dropped (int): Lines dropped to stay within the summary budget
+        window (dict): (message, tokens) of the messages from ``upto`` on seen
+            by the last build, keyed by index, so they are not read back or
+            counted again
+    """
+
+    __slots__ = ("session_id", "upto", "lines", "tokens", "dropped", "window")
+
+    def __init__(self, session_id: str = None) -> None:
+        self.session_id = session_id
+        self.upto = 0
+        self.lines = deque()
+        self.tokens = 0
+        self.dropped = 0
+        self.window = {}
+
+    def text(self) -> str:
+        """Get the summary message text, or an empty string if nothing is summarized."""
+        if not self.lines:
+            return ""
+        head = [SUMMARY_HEADER, SUMMARY_OMITTED] if self.dropped else [SUMMARY_HEADER]
+        return "\n".join(head + [line for line, _ in self.lines])
+
+
+class PromptContext:
+    """
+    Context assembled for one request and its size.
+
+    Attributes:
+        messages (list): Context messages to send with the prompt, oldest first;
+            a leading "system" message carries the summary of older turns
+        prompt_tokens (int): Tokens of the prompt
+        context_tokens (int): Tokens of the context messages
+        verbatim (int): Number of recent messages sent verbatim
+        summarized (int): Number of older messages covered by the summary
+        budget (int): Token budget the context was built for
+    """
+
+    __slots__ = ("messages", "prompt_tokens", "context_tokens", "verbatim", "summarized", "budget")
+
+    def __init__(self, messages: list, prompt_tokens: int, context_tokens: int, verbatim: int, summarized: int,
+                 budget: int) -> None:
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.context_tokens = context_tokens
+        self.verbatim = verbatim
+        self.summarized = summarized
+        self.budget = budget
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens of the whole request, prompt included."""
+        return self.prompt_tokens + self.context_tokens
+
+    def as_dict(self) -> dict:
+        """Get the sizes as a dictionary, e.g. for the session state."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "context_tokens": self.context_tokens,
+            "total_tokens": self.total_tokens,
+            "verbatim": self.verbatim,
+            "summarized": self.summarized,
+            "budget": self.budget,
+        }
+
+
+class ContextBuilder:
+    """
+    Selects the context of a request within a token budget.
+
+    Args:
+        tokenizer: Object with a ``count(text) -> int`` method
+            (default ``WhitespaceTokenizer``)
+        budget (int): Token budget of a request, prompt included
+        summary_budget (int): Token budget of the rolling summary
+        summarize (callable): Turns a list of messages into summary lines
+            (default ``extractive_summary``)
+    """
+
+    def __init__(self, tokenizer=None, budget: int = CHAT_CONTEXT_TOKENS,
+                 summary_budget: int = CHAT_SUMMARY_TOKENS, summarize=extractive_summary) -> None:
+        self.tokenizer = tokenizer or WhitespaceTokenizer()
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarize = summarize
+        # What the summary lines may use, leaving room for the header and marker
+        self._lines_budget = summary_budget - self.tokenizer.count(f"{SUMMARY_HEADER}\n{SUMMARY_OMITTED}")
+        self._sizes = deque(maxlen=256)
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def message_tokens(self, message: dict) -> int:
+        """
+        Count the tokens a message takes in a request.
+
+        Args:
+            message (dict): Message with "role" and "message" keys
+
+        Returns:
+            int: Tokens of the text plus the per-message overhead
+        """
+        return self.tokenizer.count(message["message"]) + MESSAGE_OVERHEAD
+
+    def _fold(self, summary: RollingSummary, messages: list) -> None:
+        for line in self.summarize(messages):
+            tokens = self.tokenizer.count(line)
+            summary.lines.append((line, tokens))
+            summary.tokens += tokens
+        while summary.tokens > self._lines_budget and summary.lines:
+            _, tokens = summary.lines.popleft()
+            summary.tokens -= tokens
+            summary.dropped += 1
+
+    def _message(self, history, summary: RollingSummary, index: int, floor: int, load) -> tuple:
+        entry = summary.window.get(index)
+        if entry is not None:
+            return entry
+        if index >= getattr(history, "start", 0):
+            msg = history[index]
+            entry = summary.window[index] = (msg, self.message_tokens(msg))
+            return entry
+        # Not resident: read a chunk ending here, since older messages are likely needed next.
+        first = max(floor, index + 1 - LOAD_CHUNK)
+        for offset, msg in enumerate(load(first, index + 1)):
+            summary.window.setdefault(first + offset, (msg, self.message_tokens(msg)))
+        return summary.window.get(index)
+
+    def build(self, history, prompt: str, summary: RollingSummary, load=None) -> PromptContext:
+        """
+        Assemble the context for a prompt.
+
+        Recent messages are taken newest first while they fit in what the
+        budget leaves after the prompt and the summary, and the window
+        starts on a user message. Messages that are not resident are read
+        with ``load`` when the window reaches them. Older messages not yet
+        in the summary are folded into it, so each message is summarized
+        once per session.
+
+        Args:
+            history: Conversation before the prompt: a list of messages or a
+                ``ChatHistory``, whose messages before ``start`` are not resident
+            prompt (str): The user's input message
+            summary (RollingSummary): Summary of the session, updated in place
+            load (callable): ``load(start, end)`` returns non-resident messages;
+                without it they are neither sent nor summarized
+
+        Returns:
+            PromptContext: Context messages and token counts
+        """
+        prompt_tokens = self.tokenizer.count(prompt) + MESSAGE_OVERHEAD
+        available = self.budget - prompt_tokens
+        resident = getattr(history, "start", 0)
+        end = len(history)
+        floor = summary.upto if load is not None else max(summary.upto, resident)
+        window = summary.window
+        reserve = self.summary_budget + MESSAGE_OVERHEAD
+        reserved = floor > 0
+        if reserved:
+            # Part of the conversation is (or will be) summarized: keep room for the summary.
+            available -= reserve
+        boundary, used = end, 0
+        while boundary > floor:
+            entry = self._message(history, summary, boundary - 1, floor, load)
+            if entry is None or used + entry[1] > available:
+                break
+            boundary -= 1
+            used += entry[1]
+        if not reserved and boundary > floor:
+            # Not everything fits verbatim after all: make room for the summary.
+            available -= reserve
+            while boundary < end and used > available:
+                used -= window[boundary][1]
+                boundary += 1
+        while boundary < end and window[boundary][0]["role"] != "user":
+            # Do not open the window on an answer whose question is left out.
+            used -= window[boundary][1]
+            boundary += 1
+        if boundary > summary.upto:
+            missing = [i for i in range(summary.upto, min(boundary, resident)) if i not in window]
+            if missing and load is not None:
+                for offset, msg in enumerate(load(missing[0], missing[-1] + 1)):
+                    window.setdefault(missing[0] + offset, (msg, None))
+            self._fold(summary, [window[i][0] if i in window else history[i]
+                                 for i in range(summary.upto, boundary) if i in window or i >= resident])
+            summary.upto = boundary
+        for index in [i for i in window if i < summary.upto or i >= end]:
+            del window[index]
+        messages = [{"role": window[i][0]["role"], "message": window[i][0]["message"]} for i in range(boundary, end)]
+        context_tokens = used
+        text = summary.text()
+        if text:
+            messages.insert(0, {"role": "system", "message": text})
+            context_tokens += self.tokenizer.count(messages[0]["message"]) + MESSAGE_OVERHEAD
+        context = PromptContext(messages, prompt_tokens, context_tokens, end - boundary, summary.upto, self.budget)
+        with self._lock:
+            self.builds += 1
+            self._sizes.append(context.total_tokens)
+        return context
+
+    def stats(self) -> dict:
+        """
+        Get prompt size metrics over recent builds.
+
+        Returns:
+            dict: builds, budget and request size in tokens (last/avg/p95/max)
+        """
+        with self._lock:
+            sizes = list(self._sizes)
+        ordered = sorted(sizes)
+        return {
+            "builds": self.builds,
+            "budget": self.budget,
+            "last_tokens": sizes[-1] if sizes else 0,
+            "avg_tokens": sum(sizes) / len(sizes) if sizes else 0.0,
+            "p95_tokens": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0,
+            "max_tokens": ordered[-1] if ordered else 0,
+        }
+
+
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_context_builder() -> ContextBuilder:
+    """
+    Get the process-wide context builder.
+
+    Returns:
+        ContextBuilder: Shared builder with the configured budgets
+    """
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            _builder = ContextBuilder()
+        return _builder
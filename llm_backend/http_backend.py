@@ -0,0 +1,68 @@
+"""
+HTTP streaming backend for a model-serving endpoint.
+
+The endpoint receives ``POST {"prompt": ..., "messages": [...]}`` and answers
+with Server-Sent Events: one ``data: {"delta": "..."}`` line per chunk and a
+final ``data: [DONE]``. ``mock_server`` implements the same protocol.
+"""
+
+import json
+from typing import AsyncIterator
+
+import httpx
+
+from .base import ChatBackend
+
+
+class HTTPStreamingBackend(ChatBackend):
+    """
+    Streams responses from an SSE endpoint over pooled keep-alive connections.
+
+    The ``httpx.AsyncClient`` (and its connection pool) is created on first use
+    inside the backend event loop and then shared by every request.
+
+    Args:
+        base_url (str): Server root, e.g. "http://127.0.0.1:8765"
+        path (str): Streaming endpoint path
+        timeout (float): Connect/read/write timeout in seconds
+        max_connections (int): Size of the connection pool
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, path: str = "/v1/chat/stream", timeout: float = 30.0,
+                 max_connections: int = 20) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def astream(self, prompt: str, context: list = None) -> AsyncIterator[str]:
+        payload = {"prompt": prompt, "messages": context or []}
+        async with self._get_client().stream("POST", self.path, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data).get("delta", "")
+                if delta:
+                    yield delta
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
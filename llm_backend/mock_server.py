@@ -0,0 +1,159 @@
+"""
+Local stand-in for a streaming model server.
+
+Implements the protocol expected by ``HTTPStreamingBackend`` with nothing but
+the standard library, so the whole UI -> backend path can run offline:
+
+    python -m llm_backend.mock_server --port 8765 --delay 0.02
+    CHAT_BACKEND=http CHAT_BACKEND_URL=http://127.0.0.1:8765 streamlit run main.py
+
+Connections are kept alive between requests, and responses are sent with
+chunked transfer encoding as Server-Sent Events.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+
+from streaming import word_chunks
+
+
+def mock_reply(prompt: str, messages: list) -> str:
+    """
+    Build the canned reply for a request.
+
+    Args:
+        prompt (str): The user's input message
+        messages (list): Context messages sent with the request
+
+    Returns:
+        str: Reply text
+    """
+    return f'You said, "{prompt}" ...interesting. (mock server, {len(messages)} context messages)'
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", "0")))
+    return method, path, headers, body
+
+
+async def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+    await writer.drain()
+
+
+def make_handler(delay: float):
+    """
+    Create a connection handler that streams replies with the given pacing.
+
+    Args:
+        delay (float): Seconds to wait between chunks
+
+    Returns:
+        Callable: Handler for ``asyncio.start_server``
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if method != "POST" or path != "/v1/chat/stream":
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                    await writer.drain()
+                    continue
+                payload = json.loads(body or b"{}")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/event-stream\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
+                    b"Connection: keep-alive\r\n\r\n"
+                )
+                for chunk in word_chunks(mock_reply(payload.get("prompt", ""), payload.get("messages", [])), delay=0):
+                    await _write_chunk(writer, f"data: {json.dumps({'delta': chunk})}\n\n".encode())
+                    if delay:
+                        await asyncio.sleep(delay)
+                await _write_chunk(writer, b"data: [DONE]\n\n")
+                await _write_chunk(writer, b"")
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host: str, port: int, delay: float) -> None:
+    """
+    Run the mock server until cancelled.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind
+        delay (float): Seconds to wait between chunks
+    """
+    server = await asyncio.start_server(make_handler(delay), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> tuple:
+    """
+    Start the mock server on a background thread, e.g. for offline checks.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+        delay (float): Seconds to wait between chunks
+
+    Returns:
+        tuple: (base_url, stop) where stop() shuts the server down
+    """
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    holder = {}
+
+    async def start() -> None:
+        holder["server"] = await asyncio.start_server(make_handler(delay), host, port)
+        ready.set()
+
+    thread = threading.Thread(target=loop.run_forever, name="mock-llm-server", daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(start(), loop)
+    ready.wait(timeout=5)
+    bound_port = holder["server"].sockets[0].getsockname()[1]
+
+    def stop() -> None:
+        holder["server"].close()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return f"http://{host}:{bound_port}", stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock streaming model server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.02, help="Seconds between chunks (default: %(default)s)")
+    args = parser.parse_args()
+    print(f"Mock model server listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.delay))
+    except KeyboardInterrupt:
+        pass
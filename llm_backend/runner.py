@@ -0,0 +1,91 @@
+"""
+Bridge between the synchronous Streamlit script thread and async backends.
+
+A ``BackendRunner`` owns one asyncio event loop on a daemon thread. Every
+Streamlit session submits its streams to that loop, so backends can share a
+single pooled HTTP client. ``stream()`` exposes a stream as a plain iterator;
+closing the iterator early (Streamlit stops the script when the user
+navigates away or reruns) cancels the request on the loop.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import Iterator
+
+from .base import ChatBackend
+
+_DONE = object()
+
+
+class BackendTimeout(TimeoutError):
+    """Raised when a backend stream exceeds its time limit."""
+
+
+class BackendRunner:
+    """
+    Runs a backend's async streams on a dedicated event loop thread.
+
+    Args:
+        backend (ChatBackend): Backend to run
+        timeout (float): Maximum seconds for a whole response
+    """
+
+    def __init__(self, backend: ChatBackend, timeout: float = 60.0) -> None:
+        self.backend = backend
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chat-backend-loop", daemon=True)
+        self._thread.start()
+
+    async def _pump(self, prompt: str, context: list, out: queue.Queue) -> None:
+        async def produce() -> None:
+            async for chunk in self.backend.astream(prompt, context):
+                out.put(chunk)
+
+        try:
+            await asyncio.wait_for(produce(), self.timeout)
+        except asyncio.TimeoutError:
+            out.put(BackendTimeout(f"{self.backend.name} backend did not finish within {self.timeout}s"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            out.put(exc)
+        finally:
+            out.put(_DONE)
+
+    def stream(self, prompt: str, context: list = None) -> Iterator[str]:
+        """
+        Stream a response synchronously.
+
+        Args:
+            prompt (str): The user's input message
+            context (list): Optional earlier messages
+
+        Yields:
+            str: Chunks of the response
+
+        Raises:
+            BackendTimeout: If the response takes longer than ``timeout``
+        """
+        out = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(prompt, context, out), self._loop)
+        try:
+            while True:
+                try:
+                    item = out.get(timeout=self.timeout + 5)
+                except queue.Empty:
+                    raise BackendTimeout(f"{self.backend.name} backend stopped responding")
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # No-op when finished; cancels the request when the consumer stops early.
+            future.cancel()
+
+    def close(self) -> None:
+        """Close the backend and stop the event loop."""
+        asyncio.run_coroutine_threadsafe(self.backend.aclose(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
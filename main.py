@@ -13,212 +13,579 @@ import streamlit as st
 import uuid
 import json
 import os
-from datetime import datetime, timedelta
 import time
+from datetime import datetime, timedelta
 from collections import defaultdict
 
+from app_config import SESSION_PAGE_SIZE, get_storage, get_users
+from chat_history import CHAT_RESIDENT_MESSAGES, ChatHistory
+from chat_store.counters import count_feedback
+from llm_backend import (
+    BackendRunner,
+    PromptContext,
+    RollingSummary,
+    cache_key,
+    get_context_builder,
+    get_response_cache,
+    get_runner,
+)
+from perf import get_recorder, span, timed
+from streaming import StreamStats, coalesce
+
+RERUN_STARTED = time.perf_counter()
 st.set_page_config(page_title="SCM Chatbot")
 
-# --- Simulated Assistant Response Stream ---
-def chat_stream(prompt: str) -> str:
+# --- Assistant Response Stream ---
+@st.cache_resource
+def get_chat_backend() -> BackendRunner:
+    """
+    Get the response backend shared by every session.
+    
+    The runner owns one event loop and, for the http backend, one pooled
+    keep-alive connection set. CHAT_BACKEND selects the backend.
+    
+    Returns:
+        BackendRunner: Shared backend runner
+    """
+    return get_runner()
+
+@timed("stream")
+def chat_stream(prompt: str, stats: StreamStats = None, context: list = None) -> str:
     """
-    Simulate a streaming chat response.
+    Stream the assistant's response from the configured backend.
+    
+    Repeated prompts are replayed from the shared response cache, only with
+    the same context if the backend's replies depend on it. Stopping the iteration early (the user navigated away or
+    sent another message) cancels the backend request.
     
     Args:
         prompt (str): The user's input message
+        stats (StreamStats): Optional object that receives time-to-first-token
+            and total stream time
+        context (list): Earlier messages sent with the prompt (see build_prompt_context())
         
     Yields:
-        str: Characters of the response one at a time
+        str: Chunks of the response, coalesced into UI flushes
     """
-    response = f'You said, "{prompt}" ...interesting.'
-    for char in response:
-        yield char
-        time.sleep(0.02)
+    runner = get_chat_backend()
+    key_context = context if runner.backend.uses_context else None
+    chunks = get_response_cache().stream(
+        cache_key(runner.backend.name, prompt, key_context), lambda: runner.stream(prompt, context)
+    )
+    yield from coalesce(chunks, stats=stats)
+
+@timed("context_build")
+def build_prompt_context(prompt: str) -> PromptContext:
+    """
+    Assemble the conversation context sent with a prompt.
+    
+    Recent turns are sent verbatim within CHAT_CONTEXT_TOKENS; older ones
+    are covered by a rolling summary kept in the session state and extended
+    as the conversation grows, so each turn is summarized once. Call it
+    before the prompt is added to the chat history.
+    
+    Args:
+        prompt (str): The user's input message
+        
+    Returns:
+        PromptContext: Context messages and the prompt size in tokens
+    """
+    session_id = st.session_state.session_id
+    summary = st.session_state.get("context_summary")
+    if summary is None or summary.session_id != session_id:
+        summary = st.session_state.context_summary = RollingSummary(session_id)
+
+    def load(start: int, end: int) -> list:
+        # Messages no longer resident (see ChatHistory) are read back once, to send or summarize them.
+        WRITER.flush()
+        return STORE.load_messages(session_id, start, end)[0]
+
+    return get_context_builder().build(st.session_state.chat_history, prompt, summary, load=load)
 
 # --- Feedback persistence ---
 def save_feedback(index: int) -> None:
     """
     Save user feedback for a specific message.
     
+    Feedback on a message that is no longer resident (see ChatHistory) is
+    written to the store directly, after any pending save of the session.
+    
     Args:
         index (int): Index of the message in chat history
     """
-    st.session_state.chat_history[index]["feedback"] = st.session_state[f"feedback_{index}"]
-    save_chat_to_json()
+    value = st.session_state[f"feedback_{index}"]
+    history = st.session_state.chat_history
+    if index >= history.start:
+        history.set_feedback(index, value)
+        save_chat_to_json()
+    else:
+        WRITER.flush()
+        STORE.set_feedback(st.session_state.username, st.session_state.session_id, index, value)
 
 # --- Paths and User Config ---
-with open("users.json", "r") as f:
-    USERS = json.load(f)
+# Loaded once per process (see app_config); a rerun only looks them up.
+with span("load_users"):
+    USERS = get_users()
+
+with span("store.open"):
+    STORE, WRITER = get_storage()
 
-CHAT_LOG_DIR = "chat_logs"
-os.makedirs(CHAT_LOG_DIR, exist_ok=True)
+# Number of most recent messages rendered in the chat view; older ones are paged in on demand
+CHAT_WINDOW_SIZE = int(os.environ.get("CHAT_WINDOW_SIZE", "20"))
 
-# --- Save chat to JSON file ---
+# --- Save chat session ---
+@timed("store.queue_save")
 def save_chat_to_json() -> None:
     """
-    Save the current chat session to a JSON file.
+    Save the current chat session to the configured chat store.
     
-    The file is saved in the CHAT_LOG_DIR with format:
-    chat_{username}_{session_id}.json
+    The save is handed to the write-behind queue and happens off the UI
+    thread; repeated saves of a session that is still pending are coalesced.
+    Only the resident messages are sent; once they are queued, messages
+    older than the resident window are dropped from memory (see ChatHistory).
+    With the default file backend the session is saved in the CHAT_LOG_DIR
+    as YYYY/MM/DD/{username}/chat_{username}_{session_id}.json (or .jsonl)
+    and the session manifest is updated with its metadata.
     """
-    if st.session_state.get("username") and st.session_state.get("chat_history"):
-        filename = f"chat_{st.session_state.username}_{st.session_state.session_id}.json"
-        filepath = os.path.join(CHAT_LOG_DIR, filename)
-        data = {
-            "username": st.session_state.username,
-            "session_id": st.session_state.session_id,
-            "timestamp": datetime.now().isoformat(),
-            "chat_history": st.session_state.chat_history,
-        }
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=4)
+    history = st.session_state.get("chat_history")
+    if st.session_state.get("username") and history:
+        WRITER.submit(st.session_state.username, st.session_state.session_id, history.resident_messages(),
+                      offset=history.start)
+        history.spill()
 
 # --- Session Preview Loaders ---
+@timed("store.list_sessions")
 def get_all_session_previews() -> list:
     """
     Get previews of all chat sessions.
     
+    Previews are lightweight metadata records from the store's index,
+    newest first; no session is loaded. Use load_chat_session() to open one.
+    
     Returns:
         list: List of dictionaries containing session previews with keys:
             - username: User who created the session
             - session_id: Unique session identifier
+            - timestamp: When the session was last saved
             - preview: First user message in the session
-            - full_data: Complete session data
-            - filename: Name of the session file
-    """
-    previews = []
-    for filename in os.listdir(CHAT_LOG_DIR):
-        if filename.endswith(".json"):
-            filepath = os.path.join(CHAT_LOG_DIR, filename)
-            with open(filepath, "r") as f:
-                data = json.load(f)
-            if data["chat_history"]:
-                first_user_msg = next((msg["message"] for msg in data["chat_history"] if msg["role"] == "user"), "No message")
-                previews.append({
-                    "username": data["username"],
-                    "session_id": data["session_id"],
-                    "preview": first_user_msg,
-                    "full_data": data,
-                    "filename": filename
-                })
-    return previews
-
-def get_user_session_previews(username: str) -> list:
+            - messages: Number of messages in the session
+    """
+    return STORE.list_sessions()
+
+@timed("store.list_user_sessions")
+def get_user_session_previews(username: str, since=None) -> list:
     """
     Get previews of chat sessions for a specific user.
     
     Args:
         username (str): Username to filter sessions for
+        since (date): Only include sessions saved on or after this day
         
     Returns:
         list: List of session previews for the specified user
     """
-    return [s for s in get_all_session_previews() if s["username"] == username]
+    return STORE.list_sessions(username=username, start=since)
+
+@timed("store.load_session")
+def load_chat_session(session_id: str) -> None:
+    """
+    Load a stored session on demand and make it the active conversation.
+    
+    Only the most recent messages are kept in memory; earlier ones are read
+    back from the store when needed. The SQLite store reads just that range;
+    the file store parses the whole session file and returns its tail.
+    
+    Args:
+        session_id (str): Session to open
+    """
+    WRITER.flush()
+    messages, total = STORE.load_messages(session_id, -CHAT_RESIDENT_MESSAGES)
+    st.session_state.session_id = session_id
+    st.session_state.chat_history = ChatHistory(messages, offset=total - len(messages))
+
+# --- Sidebar Session List Cache ---
+def invalidate_session_list() -> None:
+    """
+    Mark the session lists shown in the sidebar as out of date.
+    
+    The next sidebar run reads them from the store again; until then every
+    rerun reuses the copy kept in the session state.
+    """
+    st.session_state.session_list_version = st.session_state.get("session_list_version", 0) + 1
+
+def cached_session_list(name: str, fetch, key=None):
+    """
+    Get a session list for the sidebar, reading the store only when it is stale.
+    
+    A list is stale after invalidate_session_list(), when the day changes
+    (the "Today" grouping moves) and when its key (e.g. the filters and page
+    it was fetched for) changes. Pending background saves are flushed before
+    a stale list is read, so it includes them.
+    
+    Args:
+        name (str): Name of the list in the per-session cache
+        fetch (callable): Reads the list from the store
+        key: What the list was fetched for; a different key fetches again
+        
+    Returns:
+        The cached or freshly fetched list
+    """
+    version = (st.session_state.get("session_list_version", 0), datetime.now().date(), key)
+    cache = st.session_state.setdefault("session_list_cache", {})
+    if name not in cache or cache[name][0] != version:
+        WRITER.flush()
+        cache[name] = (version, fetch())
+    return cache[name][1]
 
 # --- Feedback Summary Utilities ---
-def get_feedback_summaries() -> tuple:
+@timed("store.feedback_totals")
+def get_feedback_totals() -> dict:
     """
-    Get overall and session-wise feedback summaries.
+    Get the overall feedback counts.
+    
+    Counts come from the store's materialized feedback counters, so no
+    session is listed or loaded.
     
     Returns:
-        tuple: (overall_stats, sessionwise_stats)
-            - overall_stats: Dict with total positive/negative feedback counts
-            - sessionwise_stats: Dict with feedback stats per session
-    """
-    overall = {"positive": 0, "negative": 0}
-    sessionwise = {}
-    for filename in os.listdir(CHAT_LOG_DIR):
-        if filename.endswith(".json"):
-            filepath = os.path.join(CHAT_LOG_DIR, filename)
-            with open(filepath, "r") as f:
-                data = json.load(f)
-            pos, neg = 0, 0
-            for msg in data.get("chat_history", []):
-                if msg.get("role") == "assistant":
-                    if msg.get("feedback") == 1:
-                        pos += 1
-                    elif msg.get("feedback") == 0:
-                        neg += 1
-            overall["positive"] += pos
-            overall["negative"] += neg
-            sessionwise[data["session_id"]] = {
-                "username": data["username"],
-                "timestamp": data.get("timestamp", ""),
-                "positive": pos,
-                "negative": neg,
-                "preview": next((msg["message"] for msg in data["chat_history"] if msg["role"] == "user"), "No message"),
-                "full_data": data
-            }
-    return overall, sessionwise
+        dict: Total positive/negative feedback counts
+    """
+    return STORE.feedback_totals()
 
-# --- Sidebar: Admin Chat Sessions + Feedback Summary ---
-def render_sidebar_admin_feedback() -> tuple:
+@timed("store.browse_sessions")
+def browse_sessions(username: str, negative_only: bool, sort: str, page: int) -> tuple:
     """
-    Render the admin feedback section in the sidebar.
+    Get one page of the admin session browser from the store.
     
+    Args:
+        username (str): Only include sessions of this user (None for all)
+        negative_only (bool): Only include sessions with negative feedback
+        sort (str): "date", "user" or "negative"
+        page (int): Zero-based page number
+        
     Returns:
-        tuple: (overall_stats, sessionwise_stats) from get_feedback_summaries()
+        tuple: (rows, total) with the page's sessions and their feedback
+            counts, and the number of matching sessions
+    """
+    return STORE.browse_sessions(
+        username=username,
+        negative_only=negative_only,
+        sort=sort,
+        offset=page * SESSION_PAGE_SIZE,
+        limit=SESSION_PAGE_SIZE,
+    )
+
+# --- Conversation Search ---
+@timed("store.search")
+def search_conversations(query: str, username: str = None, start=None, end=None, feedback=None) -> list:
+    """
+    Search all chat sessions by message content.
+    
+    Queries are answered from the store's full-text index, which is updated
+    on every save; only sessions with hits are opened.
+    
+    Args:
+        query (str): Words that must all appear in a message
+        username (str): Only include sessions of this user
+        start (date): Only include sessions saved on or after this day
+        end (date): Only include sessions saved on or before this day
+        feedback: Only include messages with this feedback value (1 or 0)
+        
+    Returns:
+        list: Matching messages with session_id, username, timestamp, index,
+            role, message and feedback, newest session first
+    """
+    WRITER.flush()
+    return STORE.search(query, username=username, start=start, end=end, feedback=feedback)
+
+def open_search_result(session_id: str) -> None:
+    """
+    Show a session found by search in the admin feedback view.
+    
+    Args:
+        session_id (str): Session to show
+    """
+    st.session_state.selected_feedback_summary = session_id
+    # The session may be newer than the cached feedback summaries
+    invalidate_session_list()
+
+@st.fragment
+def render_admin_search() -> None:
+    """
+    Render the admin conversation search box, filters and results.
+    
+    A fragment: typing a query or changing a filter reruns only the search.
+    """
+    with st.expander("🔎 Search Conversations", expanded=bool(st.session_state.get("search_query"))):
+        query = st.text_input("Search messages", key="search_query", placeholder="e.g. shipment delayed")
+        col1, col2, col3 = st.columns(3)
+        username = col1.text_input("User", key="search_user").strip() or None
+        days = col2.selectbox("Saved within", ["Any time", "Last 7 days", "Last 30 days", "Last 90 days"], key="search_days")
+        feedback_label = col3.selectbox("Feedback", ["Any", "👍 Positive", "👎 Negative"], key="search_feedback")
+        start = None if days == "Any time" else datetime.now().date() - timedelta(days=int(days.split()[1]))
+        feedback = {"Any": None, "👍 Positive": 1, "👎 Negative": 0}[feedback_label]
+        if not query.strip() and feedback is None:
+            return
+        hits = search_conversations(query, username=username, start=start, feedback=feedback)
+        if not hits:
+            st.info("No matching messages.")
+            return
+        st.caption(f"{len(hits)} matching messages")
+        for n, hit in enumerate(hits):
+            rating = {1: " · 👍", 0: " · 👎"}.get(hit["feedback"], "")
+            st.markdown(f"**{hit['username']}** · {hit['timestamp'][:16].replace('T', ' ')} · {hit['role']}{rating}")
+            st.text(hit["message"][:200])
+            if st.button("Open session", key=f"search_open_{n}"):
+                open_search_result(hit["session_id"])
+                st.rerun()
+
+# --- Feedback Widget ---
+@st.fragment
+def render_feedback(index: int) -> None:
+    """
+    Render the thumbs widget of one resident assistant message.
+    
+    A fragment: rating a message reruns only this widget, which saves the
+    rating and disables itself.
+    
+    Args:
+        index (int): Index of the message in chat history
+    """
+    feedback_widget(index, st.session_state.chat_history.feedback(index))
+
+def feedback_widget(index: int, feedback) -> None:
+    """
+    Render the thumbs widget of an assistant message.
+    
+    Args:
+        index (int): Index of the message in chat history
+        feedback: Current feedback on the message (1, 0 or None)
+    """
+    st.session_state[f"feedback_{index}"] = feedback
+    st.feedback(
+        "thumbs",
+        key=f"feedback_{index}",
+        disabled=feedback is not None,
+        on_change=save_feedback,
+        args=[index],
+    )
+
+# --- Chat Window Paging ---
+def show_earlier_messages() -> None:
+    """
+    Extend the chat view window by one page of older messages.
+    """
+    st.session_state.history_window += CHAT_WINDOW_SIZE
+
+@st.fragment
+def render_earlier_messages(start: int, end: int) -> None:
+    """
+    Render messages that are no longer resident, read back from the store.
+    
+    A fragment: rating one of these messages saves it to the store and
+    reruns only this block, which reads the messages again.
+    
+    Args:
+        start (int): Index of the first message to render
+        end (int): Index after the last message to render
+    """
+    with span("store.load_messages"):
+        WRITER.flush()
+        messages, _ = STORE.load_messages(st.session_state.session_id, start, end)
+    for i, message in enumerate(messages, start):
+        with st.chat_message(message["role"]):
+            st.markdown(message["message"])
+            if message["role"] == "assistant":
+                feedback_widget(i, message.get("feedback"))
+
+# --- Sidebar: Admin Chat Sessions + Feedback Summary ---
+BROWSER_SORTS = {"Newest first": "date", "User": "user", "Most 👎 first": "negative"}
+
+def reset_browser_page() -> None:
+    """
+    Go back to the first page of the session browser after a filter change.
+    """
+    st.session_state.browser_page = 0
+
+def turn_browser_page(step: int) -> None:
+    """
+    Move the session browser by a number of pages.
+    
+    Args:
+        step (int): Pages to move, negative to go back
+    """
+    st.session_state.browser_page = max(0, st.session_state.get("browser_page", 0) + step)
+
+@st.fragment
+@timed("sidebar")
+def render_sidebar_admin_feedback() -> None:
+    """
+    Render the admin feedback section in the sidebar: a paginated session browser.
+    
+    Filtering (user, negative feedback only), sorting and paging happen in
+    the store (see ChatStore.browse_sessions()); only the current page of
+    SESSION_PAGE_SIZE sessions is fetched and rendered. A fragment, called
+    inside ``st.sidebar``: the page comes from the session's cached copy
+    (see cached_session_list()), so chatting or searching does not fetch it
+    again. Selecting a session reruns the app to show it; "Refresh" reads
+    the store again.
     """
-    st.sidebar.markdown("## 📝 Feedback Summary")
-    overall, sessionwise = get_feedback_summaries()
+    st.markdown("## 📝 Feedback Summary")
+    if st.button("🔄 Refresh", key="refresh_feedback_summary", help="Reload the session list"):
+        invalidate_session_list()
 
     # Overall feedback summary button
-    if st.sidebar.button("Overall Feedback Summary", key="overall_feedback"):
+    if st.button("Overall Feedback Summary", key="overall_feedback"):
         st.session_state.selected_feedback_summary = "overall"
+        st.rerun()
 
     # Session-wise feedback summary
-    st.sidebar.markdown("### Session-wise Feedback")
-    for session_id, info in sessionwise.items():
-        label = f"{info['username']} ({info['timestamp'][:10]})"
-        if st.sidebar.button(label, key=f"session_{session_id}", use_container_width=True):
-            st.session_state.selected_feedback_summary = session_id
-
-    return overall, sessionwise
+    st.markdown("### Session-wise Feedback")
+    username = st.text_input("User", key="browser_user", on_change=reset_browser_page).strip() or None
+    sort = BROWSER_SORTS[st.selectbox("Sort by", list(BROWSER_SORTS), key="browser_sort", on_change=reset_browser_page)]
+    negative_only = st.checkbox("Only sessions with 👎", key="browser_negative", on_change=reset_browser_page)
+    page = st.session_state.get("browser_page", 0)
+    rows, total = cached_session_list(
+        "session_browser",
+        lambda: browse_sessions(username, negative_only, sort, page),
+        key=(username, negative_only, sort, page),
+    )
+    pages = max(1, -(-total // SESSION_PAGE_SIZE))
+    if page >= pages:
+        # The list shrank (e.g. after a refresh) to fewer pages than before.
+        page = st.session_state.browser_page = pages - 1
+        rows, total = cached_session_list(
+            "session_browser",
+            lambda: browse_sessions(username, negative_only, sort, page),
+            key=(username, negative_only, sort, page),
+        )
+    for row in rows:
+        label = f"{row['username']} ({row['timestamp'][:10]})"
+        if row["negative"]:
+            label += f" · 👎 {row['negative']}"
+        if st.button(label, key=f"session_{row['session_id']}", help=row["preview"][:80], use_container_width=True):
+            st.session_state.selected_feedback_summary = row["session_id"]
+            st.rerun()
+    col1, col2 = st.columns(2)
+    col1.button("◀ Prev", key="browser_prev", on_click=turn_browser_page, args=[-1], disabled=page == 0,
+                use_container_width=True)
+    col2.button("Next ▶", key="browser_next", on_click=turn_browser_page, args=[1], disabled=page >= pages - 1,
+                use_container_width=True)
+    st.caption(f"Page {page + 1} of {pages} · {total} sessions")
 
 # --- Sidebar: User Sessions (Today + Past 7 Days) ---
+@st.fragment
+@timed("sidebar")
 def render_sidebar_chat_history_users() -> None:
     """
     Render the user's chat history in the sidebar.
     
-    Shows today's sessions and sessions from the past 7 days.
+    Shows today's sessions and sessions from the past 7 days. A fragment,
+    called inside ``st.sidebar``: the list comes from the session's cached
+    copy (see cached_session_list()) and is only read again once the chat
+    pane invalidates it. Opening a session reruns the app to show it.
     """
-    st.sidebar.markdown("## 💬 Your Chat Sessions")
-    if st.sidebar.button("🆕 Start New Chat", help="Click to start a new chat session", use_container_width=True):
+    st.markdown("## 💬 Your Chat Sessions")
+    if st.button("🆕 Start New Chat", help="Click to start a new chat session", use_container_width=True):
         st.session_state.session_id = str(uuid.uuid4())
-        st.session_state.chat_history = []
+        st.session_state.chat_history = ChatHistory()
         st.rerun()
-    sessions = get_user_session_previews(st.session_state.username)
     today = datetime.now().date()
     past_7_days = today - timedelta(days=7)
+    sessions = cached_session_list(
+        "user_sessions", lambda: get_user_session_previews(st.session_state.username, since=past_7_days)
+    )
     today_sessions, recent_sessions = [], []
     for s in sessions:
-        session_time = datetime.fromisoformat(s["full_data"]["timestamp"]).date()
+        session_time = datetime.fromisoformat(s["timestamp"]).date()
         if session_time == today:
             today_sessions.append(s)
         elif session_time >= past_7_days:
             recent_sessions.append(s)
+    # The chat pane compares against this to tell when a save changed the list
+    st.session_state.listed_today = {s["session_id"] for s in today_sessions}
     if today_sessions:
-        st.sidebar.markdown("### 📅 Today")
+        st.markdown("### 📅 Today")
         for s in today_sessions:
             label = f"{s['preview'][:40]}"
-            if st.sidebar.button(label, key="today_" + s["session_id"], use_container_width=True):
-                st.session_state.session_id = s["session_id"]
-                st.session_state.chat_history = s["full_data"]["chat_history"]
+            if st.button(label, key="today_" + s["session_id"], use_container_width=True):
+                load_chat_session(s["session_id"])
                 st.rerun()
     if recent_sessions:
-        st.sidebar.markdown("### 🗓 Past 7 Days")
+        st.markdown("### 🗓 Past 7 Days")
         for s in recent_sessions:
             label = f"{s['preview'][:40]}"
-            if st.sidebar.button(label, key="past_" + s["session_id"], use_container_width=True):
-                st.session_state.session_id = s["session_id"]
-                st.session_state.chat_history = s["full_data"]["chat_history"]
+            if st.button(label, key="past_" + s["session_id"], use_container_width=True):
+                load_chat_session(s["session_id"])
                 st.rerun()
 
+# --- Chat Pane ---
+@st.fragment
+@timed("chat_pane")
+def render_chat_pane() -> None:
+    """
+    Render the conversation, the message input and the streamed reply.
+    
+    A fragment: sending a message or paging in earlier messages reruns only
+    the chat pane. When a save changes the user's session list (the first
+    message of a session, or the first one today) the list is invalidated
+    and the whole app reruns so the sidebar shows it.
+    """
+    # Render only the most recent messages; indices (and feedback keys) stay absolute
+    if st.session_state.get("history_window_session") != st.session_state.session_id:
+        st.session_state.history_window_session = st.session_state.session_id
+        st.session_state.history_window = CHAT_WINDOW_SIZE
+    history = st.session_state.chat_history
+    window_start = max(0, len(history) - st.session_state.history_window)
+    if window_start > 0:
+        st.button(
+            f"⬆️ Load earlier messages ({window_start} hidden)",
+            key="load_earlier_messages",
+            on_click=show_earlier_messages,
+            use_container_width=True,
+        )
+    if window_start < history.start:
+        render_earlier_messages(window_start, history.start)
+    with span("history_render"):
+        for i in range(max(window_start, history.start), len(history)):
+            message = history[i]
+            with st.chat_message(message["role"]):
+                st.markdown(message["message"])
+                if message["role"] == "assistant":
+                    render_feedback(i)
+    user_input = st.chat_input("Type your message here...")
+    if user_input:
+        prompt_context = build_prompt_context(user_input)
+        st.session_state.last_prompt_stats = prompt_context.as_dict()
+        history.append({"role": "user", "message": user_input, "timestamp": datetime.now().isoformat()})
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        with st.chat_message("assistant"):
+            with st.spinner("Generating response..."):
+                stream_stats = StreamStats()
+                try:
+                    response = st.write_stream(chat_stream(user_input, stream_stats, prompt_context.messages))
+                except Exception as exc:
+                    response = None
+                    st.error(f"The assistant could not respond: {exc}")
+        st.session_state.last_stream_stats = stream_stats.as_dict()
+        if stream_stats.ttft_ms is not None:
+            get_recorder().record("stream.first_token", stream_stats.ttft_ms / 1000)
+        if response is not None:
+            answer = {"role": "assistant", "message": response, "timestamp": datetime.now().isoformat()}
+            if stream_stats.total_ms is not None:
+                # Kept with the message for the dashboard's latency analytics.
+                answer["latency_ms"] = round(stream_stats.total_ms, 1)
+            render_feedback(history.append(answer))
+        save_chat_to_json()
+        if st.session_state.session_id not in st.session_state.get("listed_today", ()):
+            invalidate_session_list()
+            st.rerun()
+
 # --- Session State Defaults ---
 if "username" not in st.session_state:
     st.session_state.username = ""
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory()
 if "session_id" not in st.session_state:
     st.session_state.session_id = ""
 if "selected_feedback_summary" not in st.session_state:
@@ -237,7 +604,7 @@ if st.session_state.username == "":
             if username in USERS and USERS[username]["password"] == password:
                 st.session_state.username = username
                 st.session_state.session_id = str(uuid.uuid4())
-                st.session_state.chat_history = []
+                st.session_state.chat_history = ChatHistory()
                 st.rerun()
             else:
                 st.error("Invalid admin credentials.")
@@ -245,78 +612,73 @@ if st.session_state.username == "":
             if username and username.lower() != "admin":
                 st.session_state.username = username
                 st.session_state.session_id = str(uuid.uuid4())
-                st.session_state.chat_history = []
+                st.session_state.chat_history = ChatHistory()
                 st.rerun()
             else:
                 st.error("Invalid username.")
 
 # --- Sidebar & Logout ---
 if st.session_state.username:
-    if st.session_state.username == "admin":
-        overall_feedback, sessionwise_feedback = render_sidebar_admin_feedback()
-    else:
-        render_sidebar_chat_history_users()
-    st.sidebar.markdown("---")
     with st.sidebar:
+        if st.session_state.username == "admin":
+            render_sidebar_admin_feedback()
+        else:
+            render_sidebar_chat_history_users()
+        st.markdown("---")
         if st.button("Logout"):
             st.session_state.username = ""
             st.session_state.session_id = ""
-            st.session_state.chat_history = []
+            st.session_state.chat_history = ChatHistory()
             st.session_state.selected_feedback_summary = "overall"
+            st.session_state.pop("session_list_cache", None)
             st.rerun()
 
 # --- Admin Feedback Dashboard with Feedback Summary ---
 if st.session_state.username == "admin":
     st.title("🛠 Admin Feedback Dashboard")
+    render_admin_search()
 
     # Show feedback summary based on sidebar selection
     selected = st.session_state.get("selected_feedback_summary", "overall")
     if selected == "overall":
+        overall_feedback = cached_session_list("feedback_totals", get_feedback_totals)
         st.subheader("Overall Feedback Summary")
         st.metric("👍 Positive Feedback", overall_feedback["positive"])
         st.metric("👎 Negative Feedback", overall_feedback["negative"])
     else:
-        info = sessionwise_feedback[selected]
-        st.subheader(f"Session Feedback: {info['username']} ({info['timestamp'][:19]})")
-        st.metric("👍 Positive Feedback", info["positive"])
-        st.metric("👎 Negative Feedback", info["negative"])
-        st.markdown("### Chat with Feedback")
-        for i, msg in enumerate(info["full_data"]["chat_history"]):
-            with st.chat_message(msg["role"]):
-                st.markdown(msg["message"])
-                if msg["role"] == "assistant":
-                    feedback = msg.get("feedback", "No Feedback")
-                    st.caption(f"Feedback: {feedback}")
+        with span("store.load_session"):
+            WRITER.flush()
+            session_data = STORE.load_session(selected)
+        if session_data is None:
+            # Moved or rewritten by another replica since the list was read.
+            st.warning("This session is no longer available. Refresh the page to reload the list.")
+        else:
+            # Counted from the loaded session, so no summary of every session is needed.
+            positive, negative = count_feedback(session_data["chat_history"])
+            st.subheader(f"Session Feedback: {session_data['username']} ({session_data['timestamp'][:19]})")
+            st.metric("👍 Positive Feedback", positive)
+            st.metric("👎 Negative Feedback", negative)
+            st.markdown("### Chat with Feedback")
+            st.download_button(
+                "⬇️ Download session (JSON)",
+                json.dumps(session_data, indent=4),
+                file_name=f"chat_{session_data['username']}_{selected}.json",
+                mime="application/json",
+            )
+            with span("history_render"):
+                for i, msg in enumerate(session_data["chat_history"]):
+                    with st.chat_message(msg["role"]):
+                        st.markdown(msg["message"])
+                        if msg["role"] == "assistant":
+                            feedback = msg.get("feedback", "No Feedback")
+                            st.caption(f"Feedback: {feedback}")
 
 # --- Regular Chat View ---
 elif st.session_state.username:
     st.title("🤖 SCM Chatbot")
     st.success(f"Hello, {st.session_state.username} (Session ID: `{st.session_state.session_id}`)")
-    for i, message in enumerate(st.session_state.chat_history):
-        with st.chat_message(message["role"]):
-            st.markdown(message["message"])
-            if message["role"] == "assistant":
-                st.session_state[f"feedback_{i}"] = message.get("feedback")
-                st.feedback(
-                    "thumbs",
-                    key=f"feedback_{i}",
-                    disabled=message.get("feedback") is not None,
-                    on_change=save_feedback,
-                    args=[i],
-                )
-    user_input = st.chat_input("Type your message here...")
-    if user_input:
-        st.session_state.chat_history.append({"role": "user", "message": user_input})
-        with st.chat_message("user"):
-            st.markdown(user_input)
-        with st.chat_message("assistant"):
-            with st.spinner("Generating response..."):
-                response = st.write_stream(chat_stream(user_input))
-        st.session_state.chat_history.append({"role": "assistant", "message": response})
-        st.feedback(
-            "thumbs",
-            key=f"feedback_{len(st.session_state.chat_history) - 1}",
-            on_change=save_feedback,
-            args=[len(st.session_state.chat_history) - 1],
-        )
-        save_chat_to_json()
+    render_chat_pane()
+
+# --- Rerun timing ---
+get_recorder().record("rerun", time.perf_counter() - RERUN_STARTED)
+get_recorder().maybe_export()
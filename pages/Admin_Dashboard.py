@@ -1,8 +1,9 @@
 import streamlit as st
-import os
-import json
 from datetime import datetime, timedelta
-import pandas as pd
+
+from app_config import get_storage
+from chat_store.analytics import feedback_rate_by_day, latency_by_day, volume_by_hour, weekly_retention
+from llm_backend import get_response_cache
 
 st.set_page_config(page_title="Admin Dashboard", layout="wide")
 
@@ -11,50 +12,144 @@ if st.session_state.get("username") != "admin":
     st.error("You are not authorized to view this page.")
     st.stop()
 
+# The sections built on pandas and altair are drawn from the second run on. The first run
+# paints the metrics and placeholders, then load_deferred_sections() reruns the page once.
+PAINTED_KEY = "admin_dashboard_painted"
+DEFERRED_DELAY = 0.5  # seconds after the first paint
+DEFERRED_PLACEHOLDER = "⏳ Loading charts..."
+painted = st.session_state.get(PAINTED_KEY, False)
+if painted:
+    import pandas as pd
 
-CHAT_LOG_DIR = "chat_logs"
-os.makedirs(CHAT_LOG_DIR, exist_ok=True)
+STORE, WRITER = get_storage()
 
 st.title("📊 Admin Dashboard")
 st.markdown("### Overview of chatbot usage")
 
-# Collect usage data
-users = set()
-session_count = 0
-daily_counts = {}
-user_counts = {}
-
-for filename in os.listdir(CHAT_LOG_DIR):
-    if filename.endswith(".json"):
-        filepath = os.path.join(CHAT_LOG_DIR, filename)
-        with open(filepath, "r") as f:
-            data = json.load(f)
-
-        users.add(data["username"])
-        session_count += 1
+RANGE_OPTIONS = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "Last 365 days": 365, "Custom range": None}
+range_label = st.selectbox("Date range", list(RANGE_OPTIONS))
+today = datetime.now().date()
+if RANGE_OPTIONS[range_label] is None:
+    picked = st.date_input("Dates", (today - timedelta(days=29), today), max_value=today)
+    start_date, end_date = (picked[0], picked[-1]) if picked else (today, today)
+else:
+    start_date, end_date = today - timedelta(days=RANGE_OPTIONS[range_label] - 1), today
 
-        date_key = datetime.fromisoformat(data["timestamp"]).date()
-        daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
-        user_counts[data["username"]] = user_counts.get(data["username"], 0) + 1
+# Usage comes from the store's day x user rollups, not from the raw chat logs
+by_day, by_user = STORE.usage(start_date, end_date)
+totals = {field: sum(row[field] for row in by_user.values()) for field in ("sessions", "messages", "positive", "negative")}
 
 # Display metrics
-col1, col2 = st.columns(2)
-col1.metric("👤 Total Users", len(users))
-col2.metric("💬 Total Sessions", session_count)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("👤 Active Users", sum(1 for row in by_user.values() if row["sessions"] or row["messages"]))
+col2.metric("💬 Sessions", totals["sessions"])
+col3.metric("✉️ Messages", totals["messages"])
+col4.metric("👍 / 👎 Feedback", f"{totals['positive']} / {totals['negative']}")
 
-# Daily usage (past 7 days)
-st.subheader("📅 Daily Session Count (Last 7 Days)")
-today = datetime.now().date()
-past_7_days = [today - timedelta(days=i) for i in reversed(range(7))]
-daily_data = {
-    "Date": [d.strftime("%Y-%m-%d") for d in past_7_days],
-    "Sessions": [daily_counts.get(d, 0) for d in past_7_days]
-}
-df_daily = pd.DataFrame(daily_data)
-st.bar_chart(df_daily.set_index("Date"))
+# Daily usage
+st.subheader(f"📅 Daily Activity ({range_label})")
+if painted:
+    range_days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    empty = {"sessions": 0, "messages": 0}
+    df_daily = pd.DataFrame({
+        "Date": [d.strftime("%Y-%m-%d") for d in range_days],
+        "Sessions": [by_day.get(d.isoformat(), empty)["sessions"] for d in range_days],
+        "Messages": [by_day.get(d.isoformat(), empty)["messages"] for d in range_days],
+    })
+    st.bar_chart(df_daily.set_index("Date")[["Sessions"]])
+    st.line_chart(df_daily.set_index("Date")[["Messages"]])
+else:
+    st.caption(DEFERRED_PLACEHOLDER)
 
 # Top users
 st.subheader("🏆 Top Active Users")
-top_users_df = pd.DataFrame(list(user_counts.items()), columns=["Username", "Sessions"])
-top_users_df = top_users_df.sort_values(by="Sessions", ascending=False).reset_index(drop=True)
-st.table(top_users_df.head(10))
+if painted:
+    top_users_df = pd.DataFrame(
+        [(username, row["sessions"], row["messages"], row["positive"], row["negative"]) for username, row in by_user.items()],
+        columns=["Username", "Sessions", "Messages", "👍", "👎"],
+    )
+    top_users_df = top_users_df.sort_values(by=["Sessions", "Messages"], ascending=False).reset_index(drop=True)
+    st.table(top_users_df.head(10))
+else:
+    st.caption(DEFERRED_PLACEHOLDER)
+
+# Message analytics: vectorized groupbys over the store's one-row-per-message table
+st.subheader("📈 Message Analytics")
+messages_df = STORE.message_frame(start_date, end_date) if painted else None
+if messages_df is None:
+    st.caption(DEFERRED_PLACEHOLDER)
+elif messages_df.empty:
+    st.info("No messages in this date range.")
+else:
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**👍 Feedback rate by day**")
+        feedback_df = feedback_rate_by_day(messages_df)
+        feedback_df.index = feedback_df.index.strftime("%Y-%m-%d")
+        st.line_chart(feedback_df[["rate"]].rename(columns={"rate": "Positive Rate"}))
+    with col2:
+        st.markdown("**🕒 Message volume by hour**")
+        st.bar_chart(volume_by_hour(messages_df))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**⏱ Response latency by day (ms)**")
+        latency_df = latency_by_day(messages_df)
+        if latency_df.empty:
+            st.caption("No response latencies recorded in this date range.")
+        else:
+            latency_df.index = latency_df.index.strftime("%Y-%m-%d")
+            st.line_chart(latency_df.rename(columns={"p50_ms": "p50", "p95_ms": "p95"}))
+    with col2:
+        st.markdown("**🔁 Weekly user retention**")
+        retention_df = weekly_retention(messages_df)
+        retention_df.index = retention_df.index.strftime("%Y-%m-%d")
+        st.dataframe(retention_df.style.format("{:.0%}", na_rep=""), use_container_width=True)
+
+# Response cache
+st.subheader("🗄 Response Cache")
+cache = get_response_cache()
+cache_stats = cache.stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Entries", f"{cache_stats['size']} / {cache_stats['max_entries']}")
+col2.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+col3.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+col4.metric("Evictions / Expired", f"{cache_stats['evictions']} / {cache_stats['expirations']}")
+if st.button("Flush response cache"):
+    st.success(f"Removed {cache.clear()} cached responses.")
+cache_entries = cache.entries()
+if cache_entries and not painted:
+    st.caption(DEFERRED_PLACEHOLDER)
+elif cache_entries:
+    cache_df = pd.DataFrame(cache_entries)
+    cache_df["age"] = cache_df["age"].round(0)
+    cache_df["expires_in"] = cache_df["expires_in"].round(0)
+    st.dataframe(
+        cache_df.rename(columns={"key": "Key", "response": "Response", "age": "Age (s)",
+                                 "expires_in": "Expires In (s)", "hits": "Hits"}),
+        use_container_width=True,
+    )
+
+st.subheader("💾 Persistence Queue")
+writer_stats = WRITER.stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Queue Depth", writer_stats["queue_depth"])
+col2.metric("Writes / Coalesced", f"{writer_stats['writes']} / {writer_stats['coalesced']}")
+col3.metric("Write Latency (avg / p95)", f"{writer_stats['avg_ms']:.1f} / {writer_stats['p95_ms']:.1f} ms")
+col4.metric("Failed Writes", writer_stats["errors"])
+
+
+@st.fragment(run_every=DEFERRED_DELAY)
+def load_deferred_sections() -> None:
+    """
+    Rerun the page once its first run has painted, to draw the deferred sections.
+
+    The fragment only runs on the first run, so its timer fires once: the
+    rerun it starts no longer includes it.
+    """
+    if st.session_state.get(PAINTED_KEY):
+        st.rerun()
+
+
+if not painted:
+    load_deferred_sections()
+st.session_state[PAINTED_KEY] = True
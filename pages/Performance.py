@@ -0,0 +1,69 @@
+import streamlit as st
+
+from chat_store import get_writer
+from llm_backend import get_context_builder
+from perf import PERF_PROMETHEUS_FILE, get_recorder
+
+st.set_page_config(page_title="Performance", layout="wide")
+
+# Prevent non-admin users from accessing this page
+if st.session_state.get("username") != "admin":
+    st.error("You are not authorized to view this page.")
+    st.stop()
+
+# Imported past the access check, so sessions that are turned away never load pandas
+import pandas as pd
+
+st.title("⏱ Performance")
+st.markdown("### Hot-path timings of recent reruns (all sessions in this process)")
+
+recorder = get_recorder()
+rows = recorder.summary()
+
+if not rows:
+    st.info("No timings recorded yet. Use the chat to generate some.")
+else:
+    df = pd.DataFrame(rows).set_index("stage")
+    rerun = df.loc["rerun"] if "rerun" in df.index else None
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Reruns", int(rerun["count"]) if rerun is not None else 0)
+    col2.metric("Rerun p50", f"{rerun['p50_ms']:.1f} ms" if rerun is not None else "-")
+    col3.metric("Rerun p95", f"{rerun['p95_ms']:.1f} ms" if rerun is not None else "-")
+    col4.metric("Rerun p99", f"{rerun['p99_ms']:.1f} ms" if rerun is not None else "-")
+
+    st.subheader("p95 by Stage (ms)")
+    st.bar_chart(df["p95_ms"])
+
+    st.subheader("Stage Percentiles")
+    table = df[["count", "samples", "last_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]].round(2)
+    st.dataframe(
+        table.rename(columns={"count": "Calls", "samples": "Samples", "last_ms": "Last (ms)", "p50_ms": "p50 (ms)",
+                              "p95_ms": "p95 (ms)", "p99_ms": "p99 (ms)", "max_ms": "Max (ms)"}),
+        use_container_width=True,
+    )
+
+writer_stats = get_writer().stats()
+st.subheader("Background Writes")
+col1, col2, col3 = st.columns(3)
+col1.metric("Queue Depth", writer_stats["queue_depth"])
+col2.metric("Write p95", f"{writer_stats['p95_ms']:.1f} ms")
+col3.metric("Write Max", f"{writer_stats['max_ms']:.1f} ms")
+
+context_stats = get_context_builder().stats()
+st.subheader("Prompt Size")
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Requests", context_stats["builds"])
+col2.metric("Avg Tokens", f"{context_stats['avg_tokens']:.0f} / {context_stats['budget']}")
+col3.metric("p95 Tokens", context_stats["p95_tokens"])
+col4.metric("Max Tokens", context_stats["max_tokens"])
+
+st.subheader("Export")
+if PERF_PROMETHEUS_FILE:
+    st.caption(f"Prometheus metrics are written to `{PERF_PROMETHEUS_FILE}` on each rerun (throttled).")
+else:
+    st.caption("Set `PERF_PROMETHEUS_FILE` to export these timings for a Prometheus text-file collector.")
+st.download_button("Download Prometheus metrics", recorder.prometheus_text(), file_name="chatbot_perf.prom",
+                   mime="text/plain")
+if st.button("Reset timings"):
+    recorder.reset()
+    st.rerun()
@@ -0,0 +1,220 @@
+"""
+Lightweight timing spans for the app's hot paths.
+
+Code wraps a stage in ``span("stage")`` (or decorates a function with
+``timed("stage")``); each duration goes into a bounded per-stage ring buffer
+kept in process memory, so recording costs a ``perf_counter()`` pair and a
+deque append. ``summary()`` reports p50/p95/p99 per stage for the admin
+Performance page, and the samples can be exported in the Prometheus text
+format for a node-exporter style text-file collector.
+
+Settings (environment variables):
+- PERF_RING_SIZE: samples kept per stage (default 1024)
+- PERF_PROMETHEUS_FILE: if set, ``maybe_export()`` writes metrics to this file
+- PERF_EXPORT_INTERVAL: minimum seconds between exports (default 15)
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PERF_RING_SIZE = int(os.environ.get("PERF_RING_SIZE", "1024"))
+PERF_PROMETHEUS_FILE = os.environ.get("PERF_PROMETHEUS_FILE", "")
+PERF_EXPORT_INTERVAL = float(os.environ.get("PERF_EXPORT_INTERVAL", "15"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Nearest-rank percentile of pre-sorted values.
+
+    Args:
+        sorted_values (list): Values in ascending order
+        q (float): Quantile between 0 and 1
+
+    Returns:
+        float: The percentile, or 0.0 for no values
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class PerfRecorder:
+    """
+    Per-stage ring buffers of recent durations.
+
+    Args:
+        size (int): Samples kept per stage
+    """
+
+    def __init__(self, size: int = PERF_RING_SIZE) -> None:
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._totals = {}
+        self._last_export = 0.0
+
+    def record(self, stage: str, seconds: float) -> None:
+        """
+        Record one duration for a stage.
+
+        Args:
+            stage (str): Stage name, e.g. "sidebar" or "store.list_sessions"
+            seconds (float): Duration in seconds
+        """
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.size)
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage: str):
+        """
+        Time the enclosed block as one sample of a stage.
+
+        Args:
+            stage (str): Stage name
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def timed(self, stage: str):
+        """
+        Decorator recording every call of a function as a stage sample.
+
+        Generators are timed until they are exhausted or closed.
+
+        Args:
+            stage (str): Stage name
+        """
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                @functools.wraps(func)
+                def gen_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        yield from func(*args, **kwargs)
+                return gen_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self) -> list:
+        """
+        Summarize every stage over its buffered samples.
+
+        Returns:
+            list: One dictionary per stage with stage, count (all time),
+                samples (buffered), last_ms, p50_ms, p95_ms, p99_ms, max_ms
+                and total_s (all time), sorted by stage name
+        """
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self._samples.items()}
+            counts = dict(self._counts)
+            totals = dict(self._totals)
+        rows = []
+        for stage in sorted(snapshot):
+            samples = snapshot[stage]
+            ordered = sorted(samples)
+            rows.append({
+                "stage": stage,
+                "count": counts[stage],
+                "samples": len(samples),
+                "last_ms": samples[-1] * 1000,
+                "p50_ms": percentile(ordered, 0.5) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "total_s": totals[stage],
+            })
+        return rows
+
+    def reset(self) -> None:
+        """Drop every recorded sample."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+    def prometheus_text(self) -> str:
+        """
+        Render the recorded stages in the Prometheus text exposition format.
+
+        Returns:
+            str: A ``chatbot_stage_duration_seconds`` summary with quantiles
+                over the buffered samples and all-time count and sum
+        """
+        lines = [
+            "# HELP chatbot_stage_duration_seconds Duration of instrumented app stages.",
+            "# TYPE chatbot_stage_duration_seconds summary",
+        ]
+        for row in self.summary():
+            label = row["stage"].replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                value = row[f"p{int(q * 100)}_ms"] / 1000
+                lines.append(f'chatbot_stage_duration_seconds{{stage="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'chatbot_stage_duration_seconds_sum{{stage="{label}"}} {row["total_s"]:.6f}')
+            lines.append(f'chatbot_stage_duration_seconds_count{{stage="{label}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """
+        Write the Prometheus text format to a file, replacing it atomically.
+
+        Args:
+            path (str): Target file, e.g. in a node-exporter text-file directory
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        self._last_export = time.monotonic()
+
+    def maybe_export(self, path: str = PERF_PROMETHEUS_FILE, interval: float = PERF_EXPORT_INTERVAL) -> bool:
+        """
+        Export if a target file is configured and the last export is old enough.
+
+        Args:
+            path (str): Target file; nothing is written if empty
+            interval (float): Minimum seconds between exports
+
+        Returns:
+            bool: True if the file was written
+        """
+        if not path or time.monotonic() - self._last_export < interval:
+            return False
+        self.export(path)
+        return True
+
+
+_recorder = PerfRecorder()
+
+
+def get_recorder() -> PerfRecorder:
+    """
+    Get the process-wide recorder shared by every session.
+
+    Returns:
+        PerfRecorder: Shared recorder
+    """
+    return _recorder
+
+
+span = _recorder.span
+timed = _recorder.timed
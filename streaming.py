@@ -0,0 +1,134 @@
+"""
+Streaming helpers for assistant responses.
+
+Responses are streamed as word-sized chunks and coalesced into UI flushes on
+a time budget, so ``st.write_stream`` updates the page a few times per
+second instead of once per character. Each stream records its
+time-to-first-token and total time.
+
+Settings (environment variables):
+- CHAT_STREAM_DELAY: artificial delay per chunk in seconds for simulated
+  responses (default 0.05); set to 0 in production
+- CHAT_STREAM_FLUSH_INTERVAL: minimum seconds between UI flushes (default 0.05)
+"""
+
+import logging
+import os
+import re
+import time
+from typing import Iterable, Iterator
+
+CHAT_STREAM_DELAY = float(os.environ.get("CHAT_STREAM_DELAY", "0.05"))
+CHAT_STREAM_FLUSH_INTERVAL = float(os.environ.get("CHAT_STREAM_FLUSH_INTERVAL", "0.05"))
+
+logger = logging.getLogger(__name__)
+
+# A word plus the whitespace that follows it; leading whitespace stays with the first word.
+_WORD_CHUNK = re.compile(r"\s*\S+\s*")
+
+
+def word_chunks(text: str, delay: float = CHAT_STREAM_DELAY) -> Iterator[str]:
+    """
+    Split text into word-sized chunks, optionally pacing them.
+
+    Args:
+        text (str): Complete response text
+        delay (float): Seconds to sleep after each chunk (0 for none)
+
+    Yields:
+        str: Chunks that concatenate back to ``text``
+    """
+    for match in _WORD_CHUNK.finditer(text):
+        yield match.group()
+        if delay:
+            time.sleep(delay)
+
+
+class StreamStats:
+    """
+    Timing of one streamed response.
+
+    Attributes:
+        started (float): perf_counter() value when the stream was created
+        first_chunk_at (float): perf_counter() value of the first chunk, or None
+        finished_at (float): perf_counter() value when the stream ended, or None
+        chunks (int): Number of chunks received from the source
+        flushes (int): Number of flushes handed to the UI
+        chars (int): Number of characters streamed
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_chunk_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.flushes = 0
+        self.chars = 0
+
+    @property
+    def ttft_ms(self) -> float:
+        """Milliseconds from stream creation to the first chunk (None if no chunk yet)."""
+        if self.first_chunk_at is None:
+            return None
+        return (self.first_chunk_at - self.started) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        """Milliseconds from stream creation to its end (None while still streaming)."""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started) * 1000
+
+    def as_dict(self) -> dict:
+        """Return the stats as a plain dictionary."""
+        return {
+            "ttft_ms": self.ttft_ms,
+            "total_ms": self.total_ms,
+            "chunks": self.chunks,
+            "flushes": self.flushes,
+            "chars": self.chars,
+        }
+
+
+def coalesce(chunks: Iterable[str], flush_interval: float = CHAT_STREAM_FLUSH_INTERVAL,
+             stats: StreamStats = None) -> Iterator[str]:
+    """
+    Merge chunks into flushes at most every ``flush_interval`` seconds.
+
+    The first chunk is flushed immediately so time-to-first-token is not
+    delayed by the budget; whatever is buffered is flushed at the end.
+
+    Args:
+        chunks (Iterable[str]): Source chunks
+        flush_interval (float): Minimum seconds between flushes
+        stats (StreamStats): Optional stats object to fill in
+
+    Yields:
+        str: Coalesced text
+    """
+    stats = stats if stats is not None else StreamStats()
+    buffer = []
+    last_flush = None
+    try:
+        for chunk in chunks:
+            now = time.perf_counter()
+            if stats.first_chunk_at is None:
+                stats.first_chunk_at = now
+            stats.chunks += 1
+            stats.chars += len(chunk)
+            buffer.append(chunk)
+            if last_flush is None or now - last_flush >= flush_interval:
+                stats.flushes += 1
+                last_flush = now
+                yield "".join(buffer)
+                buffer.clear()
+        if buffer:
+            stats.flushes += 1
+            yield "".join(buffer)
+    finally:
+        stats.finished_at = time.perf_counter()
+        logger.info(
+            "Streamed %d chars in %d chunks / %d flushes (ttft %s ms, total %.1f ms)",
+            stats.chars, stats.chunks, stats.flushes,
+            f"{stats.ttft_ms:.1f}" if stats.ttft_ms is not None else "-", stats.total_ms,
+        )
@@ -5,33 +5,25 @@ import os
 import atexit
 from datetime import datetime
 
+from app_config import get_storage
+from chat_store import CHAT_LOG_DIR, iter_session_files
+
 st.set_page_config(page_title="Chatbot")
 
-# Directory to store chat logs
-CHAT_LOG_DIR = "chat_logs"
-os.makedirs(CHAT_LOG_DIR, exist_ok=True)
+# Directory to store chat logs, created once per process
+STORE, WRITER = get_storage()
 
 # Function to save chat to JSON file
 def save_chat_to_json():
     if st.session_state.get("username") and st.session_state.get("chat_history"):
-        filename = f"chat_{st.session_state.username}_{st.session_state.session_id}.json"
-        filepath = os.path.join(CHAT_LOG_DIR, filename)
-        data = {
-            "username": st.session_state.username,
-            "session_id": st.session_state.session_id,
-            "timestamp": datetime.now().isoformat(),
-            "chat_history": st.session_state.chat_history,
-        }
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=4)
-        print(f"Saved chat to {filepath}")
+        WRITER.submit(st.session_state.username, st.session_state.session_id, st.session_state.chat_history)
+        print(f"Queued chat session {st.session_state.session_id}")
 
 def find_chat_files():
-    """Find all chat JSON files in the chat log directory."""
+    """Find all chat session files in the chat log directory."""
     chat_files = []
-    for filename in os.listdir(CHAT_LOG_DIR):
-        # Ensure the file is for the current user
-        
+    # Only the current user's shards are listed
+    for filename in iter_session_files(CHAT_LOG_DIR, username=st.session_state.get("username") or None):
         chat_files.append(os.path.join(CHAT_LOG_DIR, filename))
     return chat_files
 